@@ -10,6 +10,14 @@ except ImportError:
     HAS_OLLAMA = False
     print("Ollama not found. Some features will be disabled.")
 
+def entity_json_schema(entities):
+    """JSON schema for an object holding each requested entity as a string or null"""
+    return {
+        "type": "object",
+        "properties": {entity: {"type": ["string", "null"]} for entity in entities},
+        "required": list(entities)
+    }
+
 class OllamaHandler:
     """Handler for Ollama model interactions"""
     
@@ -106,24 +114,18 @@ class OllamaHandler:
             For example: {{"entity1": "value1", "entity2": "value2"}}
             """
             
-            # Call Ollama
+            # Call Ollama, constraining the reply to the entity schema
             response = ollama.chat(
                 model=model,
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                format=entity_json_schema(entities)
             )
             
             if response and 'message' in response and 'content' in response['message']:
                 content = response['message']['content']
                 
-                # Try to extract JSON from the response
-                json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                else:
-                    json_str = content
-                    
                 try:
-                    extracted = json.loads(json_str)
+                    extracted = json.loads(content)
                     if isinstance(extracted, dict):
                         # Filter to only requested entities
                         return {k: v for k, v in extracted.items() if k in entities and v}
@@ -149,24 +151,18 @@ class OllamaHandler:
             For example: {{"entity1": "value1", "entity2": "value2"}}
             """
             
-            # Call Ollama
+            # Call Ollama, constraining the reply to the entity schema
             response = ollama.chat(
                 model="llama3",  # use default model
-                messages=[{"role": "user", "content": prompt}]
+                messages=[{"role": "user", "content": prompt}],
+                format=entity_json_schema(required_entities)
             )
             
             if response and 'message' in response and 'content' in response['message']:
                 content = response['message']['content']
                 
-                # Try to extract JSON from the response
-                json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                else:
-                    json_str = content
-                    
                 try:
-                    extracted = json.loads(json_str)
+                    extracted = json.loads(content)
                     if isinstance(extracted, dict):
                         # Return only valid entities
                         return {entity: value for entity, value in extracted.items() 
@@ -0,0 +1,49 @@
+"""
+Helpers shared by the benchmark scripts
+
+main.py.py is not importable by name, so it is loaded from its path here.
+"""
+
+import atexit
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_ivr():
+    """Import main.py.py as the module ``ivr`` and return it"""
+    if "ivr" in sys.modules:
+        return sys.modules["ivr"]
+
+    # Keep the server's on-disk state out of the working directory, unless the
+    # benchmark chose its own paths
+    workdir = tempfile.mkdtemp(prefix="ivr-bench-")
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    os.environ.setdefault("INTENT_CACHE_DB", "")
+    os.environ.setdefault("TTS_CACHE_DIR", os.path.join(workdir, "tts_cache"))
+    os.environ.setdefault("PROMPT_BUNDLE_PATH", os.path.join(workdir, "prompts.bundle"))
+    os.environ.setdefault("SESSION_DB", os.path.join(workdir, "sessions"))
+
+    # main.py.py imports whisper_worker from next to itself
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+    spec = importlib.util.spec_from_file_location("ivr", REPO_ROOT / "main.py.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["ivr"] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of a list of numbers (nearest rank)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
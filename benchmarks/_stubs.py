@@ -0,0 +1,198 @@
+"""
+Offline stand-ins for the Ollama and Octave TTS HTTP APIs and the message queue
+
+Each stub runs a server on a background thread. The API stubs answer with
+configurable latency, so the IVR server can be load-tested with no model
+servers or network access.
+"""
+
+import io
+import json
+import re
+import socket
+import struct
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keyword -> intent rules the stub LLM "extracts" with
+STUB_INTENTS = (
+    (("cancel", "reschedule"), "cancel_appointment"),
+    (("appointment", "schedule", "book"), "schedule_appointment"),
+    (("bill", "pay", "balance", "transfer", "money"), "billing_inquiry"),
+    (("hour", "open", "location", "address"), "location_hours"),
+    (("agent", "representative", "human", "person"), "speak_to_agent"),
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+    def do_GET(self):
+        self.send_body(b'{"status": "ok"}', "application/json")
+
+    def log_message(self, *args):
+        pass
+
+
+def stub_intent(prompt):
+    """Pick an intent for a prompt with the stub keyword rules"""
+    match = re.search(r"'(.*)'", prompt, re.DOTALL)
+    text = (match.group(1) if match else prompt).lower()
+    for keywords, intent in STUB_INTENTS:
+        if any(keyword in text for keyword in keywords):
+            return intent
+    return "general_inquiry"
+
+
+def start_server(handler_class):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_stub_ollama(latency=0.2, token_delay=0.01):
+    """Serve /api/health and /api/generate like a small local model would
+
+    Args:
+        latency: Seconds before the first token (model load plus prompt eval)
+        token_delay: Seconds between streamed tokens
+
+    Returns:
+        ThreadingHTTPServer: The running server; its API base URL is
+            http://127.0.0.1:<port>/api
+    """
+
+    class OllamaHandler(StubHandler):
+        def do_POST(self):
+            request = self.read_json()
+            reply = json.dumps({"intent": stub_intent(request.get("prompt", "")), "entities": {}, "confidence": 0.9})
+            if not request.get("format"):
+                reply += " I chose this intent because of the keywords in the request."
+            tokens = re.findall(r"\S+\s*", reply)
+            timings = {
+                "done": True,
+                "total_duration": int((latency + token_delay * len(tokens)) * 1e9),
+                "load_duration": 0,
+                "prompt_eval_count": 200,
+                "prompt_eval_duration": int(latency * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(token_delay * len(tokens) * 1e9),
+            }
+            time.sleep(latency)
+
+            if not request.get("stream", True):
+                time.sleep(token_delay * len(tokens))
+                self.send_body(json.dumps(dict(timings, response=reply)).encode(), "application/json")
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for token in tokens:
+                    self.write_chunk({"response": token, "done": False})
+                    time.sleep(token_delay)
+                self.write_chunk(dict(timings, response=""))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading once it had the intent
+                self.close_connection = True
+
+        def write_chunk(self, message):
+            line = (json.dumps(message) + "\n").encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+
+    return start_server(OllamaHandler)
+
+
+def start_stub_tts(latency=0.1, seconds_per_word=0.3):
+    """Serve the Octave TTS API, answering with silent 16 kHz WAV audio
+
+    Args:
+        latency: Seconds to "synthesize" each request
+        seconds_per_word: Length of the returned audio per word of text
+
+    Returns:
+        ThreadingHTTPServer: The running server; its TTS URL is
+            http://127.0.0.1:<port>/api/tts
+    """
+
+    class TTSHandler(StubHandler):
+        def do_POST(self):
+            request = self.read_json()
+            frames = int(16000 * seconds_per_word * max(1, len(request.get("text", "").split())))
+            buffer = io.BytesIO()
+            with wave.open(buffer, "wb") as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(16000)
+                wav_file.writeframes(b"\0\0" * frames)
+            time.sleep(latency)
+            self.send_body(buffer.getvalue(), "audio/wav")
+
+    return start_server(TTSHandler)
+
+
+def start_queue_broker(port=0):
+    """Relay Socket.IO message queue frames between server processes
+
+    The local stand-in for Redis pub/sub used by TCPQueueManager: every
+    length-prefixed frame a process sends is written to every connected
+    process, the sender included.
+
+    Returns:
+        socket.socket: The listening socket; connect to tcp://127.0.0.1:<port>
+    """
+    listener = socket.create_server(("127.0.0.1", port))
+    peers = {}
+    peers_lock = threading.Lock()
+
+    def relay(conn):
+        reader = conn.makefile("rb")
+        try:
+            while True:
+                header = reader.read(4)
+                if len(header) < 4:
+                    break
+                frame = header + reader.read(struct.unpack(">I", header)[0])
+                with peers_lock:
+                    targets = list(peers.items())
+                for peer, send_lock in targets:
+                    try:
+                        with send_lock:
+                            peer.sendall(frame)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        finally:
+            with peers_lock:
+                peers.pop(conn, None)
+            conn.close()
+
+    def accept():
+        while True:
+            conn, _ = listener.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with peers_lock:
+                peers[conn] = threading.Lock()
+            threading.Thread(target=relay, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener
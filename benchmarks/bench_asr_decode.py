@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Benchmark: temp-file round-trip vs in-memory decoding in front of Whisper
+
+The old transcribe_audio path wrote every payload to a NamedTemporaryFile and
+let faster-whisper read it back. The new path decodes the bytes in memory with
+decode_audio_bytes. Both are driven by 1, 8 and 32 concurrent callers.
+
+Usage:
+    python benchmarks/bench_asr_decode.py [--input clip.webm] [--requests 256] [--transcribe]
+
+Without --input a 3 second 16 kHz PCM WAV clip is synthesized. With
+--transcribe the decoded audio is also passed through the Whisper model, which
+measures the end-to-end transcribe_audio cost instead of decoding alone.
+"""
+
+import argparse
+import io
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from _ivr import load_ivr, percentile
+
+CONCURRENCY_LEVELS = (1, 8, 32)
+
+
+def synthetic_wav(seconds=3.0, sample_rate=16000):
+    """Build a PCM16 WAV clip containing a few tones and some noise"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + 0.1 * np.sin(2 * np.pi * 880 * t)
+    signal += 0.02 * np.random.default_rng(0).standard_normal(len(t))
+    pcm = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def tempfile_path(ivr, audio_bytes, model):
+    """The previous implementation: write to /tmp and decode from the path"""
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_file:
+        temp_file.write(audio_bytes)
+        temp_file.flush()
+        if model:
+            segments, _ = model.transcribe(temp_file.name, language="en")
+            return " ".join(segment.text for segment in segments)
+        return ivr.decode_audio(temp_file.name)
+
+
+def in_memory_path(ivr, audio_bytes, model):
+    """The new implementation: decode the bytes without touching disk"""
+    audio = ivr.decode_audio_bytes(audio_bytes)
+    if model:
+        segments, _ = model.transcribe(audio, language="en")
+        return " ".join(segment.text for segment in segments)
+    return audio
+
+
+def run(path, ivr, audio_bytes, model, concurrency, total_requests):
+    """Run total_requests calls with the given concurrency and collect timings"""
+    latencies = []
+
+    def one_call(_):
+        start = time.perf_counter()
+        path(ivr, audio_bytes, model)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_call, range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "throughput": total_requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="Encoded audio clip (WAV, WebM/Opus, MP3)")
+    parser.add_argument("--requests", type=int, default=256, help="Calls per concurrency level")
+    parser.add_argument("--transcribe", action="store_true", help="Include Whisper inference")
+    args = parser.parse_args()
+
+    ivr = load_ivr()
+    if ivr.decode_audio is None:
+        raise SystemExit("faster-whisper is required for this benchmark")
+
+    if args.input:
+        with open(args.input, "rb") as audio_file:
+            audio_bytes = audio_file.read()
+    else:
+        audio_bytes = synthetic_wav()
+
+    model = None
+    if args.transcribe:
+        model = ivr.WhisperModel(ivr.WHISPER_MODEL_SIZE, device="cpu", compute_type="int8")
+
+    print(f"Payload: {len(audio_bytes)} bytes, {args.requests} calls per level")
+    print(f"{'callers':>8} {'path':>10} {'calls/s':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for concurrency in CONCURRENCY_LEVELS:
+        for name, path in (("tempfile", tempfile_path), ("in-memory", in_memory_path)):
+            result = run(path, ivr, audio_bytes, model, concurrency, args.requests)
+            print(f"{concurrency:>8} {name:>10} {result['throughput']:>10.1f} "
+                  f"{result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Benchmark: per-call requests.post vs the pooled HTTPTransport
+
+The Octave TTS and Ollama clients used to call module-level requests.post,
+which opens a new TCP connection for every request. They now share pooled
+keep-alive sessions through HTTPTransport. Both are driven against a local
+HTTP/1.1 stub server with 1 and 8 concurrent callers.
+
+Usage:
+    python benchmarks/bench_http_transport.py [--requests 2000] [--payload 2048]
+
+The stub answers instantly, so the numbers are the client-side connection and
+request overhead alone; remote backends add the network round trips saved by
+keep-alive on top.
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from _ivr import load_ivr, percentile
+
+CONCURRENCY_LEVELS = (1, 8)
+
+
+def start_stub_server(payload_size):
+    """Serve a fixed body on every POST from a background thread"""
+    body = b"x" * payload_size
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without TCP_NODELAY a
+        # kept-alive connection stalls on delayed ACKs, as real servers avoid
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(post, url, concurrency, total_requests):
+    """Run total_requests POSTs with the given concurrency and collect timings"""
+    latencies = []
+    payload = {"text": "Thank you for calling.", "voice": "alloy", "format": "wav"}
+
+    def one_call(_):
+        start = time.perf_counter()
+        response = post(url, json=payload, timeout=5)
+        response.content
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one_call, range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "throughput": total_requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Calls per concurrency level")
+    parser.add_argument("--payload", type=int, default=2048, help="Response body size in bytes")
+    args = parser.parse_args()
+
+    ivr = load_ivr()
+    server = start_stub_server(args.payload)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/tts"
+
+    print(f"{args.requests} calls per level, {args.payload} byte responses")
+    print(f"{'callers':>8} {'client':>12} {'calls/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'conns':>7}")
+    for concurrency in CONCURRENCY_LEVELS:
+        transport = ivr.HTTPTransport("stub", pool_size=ivr.HTTP_POOL_SIZE)
+        clients = (
+            ("requests.post", requests.post, args.requests),
+            ("pooled", transport.post, None),
+        )
+        for name, post, connections in clients:
+            result = run(post, url, concurrency, args.requests)
+            if connections is None:
+                connections = transport.stats()["connections_opened"]
+            print(f"{concurrency:>8} {name:>12} {result['throughput']:>10.1f} "
+                  f"{result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f} {connections:>7}")
+        transport.close()
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
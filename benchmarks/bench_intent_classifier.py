@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Benchmark: embedding intent classifier vs keyword rules, offline
+
+Scores EmbeddingIntentClassifier and _rule_based_intent_extraction on a
+held-out set of labelled caller utterances that do not appear in
+INTENT_EXAMPLES. For the classifier, coverage is the share of utterances it
+resolves itself (the rest would go to Ollama) and accuracy is measured on
+those; the rules always answer.
+
+Usage:
+    python benchmarks/bench_intent_classifier.py [--model all-MiniLM-L6-v2] [--repeat 200]
+
+Without --model the hashed n-gram embedder is used. --min-score and
+--min-margin override the configured thresholds for tuning.
+"""
+
+import argparse
+import time
+
+from _ivr import load_ivr, percentile
+
+HELD_OUT = [
+    ("I need to book an appointment for next Tuesday", "schedule_appointment"),
+    ("can I come in sometime this week", "schedule_appointment"),
+    ("schedule a checkup", "schedule_appointment"),
+    ("I'd like to make a booking", "schedule_appointment"),
+    ("are there any open slots", "schedule_appointment"),
+    ("please book me an appointment", "schedule_appointment"),
+    ("I have to cancel", "cancel_appointment"),
+    ("I need to cancel tomorrow's appointment", "cancel_appointment"),
+    ("can we reschedule my visit", "cancel_appointment"),
+    ("I can't come to my appointment", "cancel_appointment"),
+    ("please cancel my reservation", "cancel_appointment"),
+    ("my bill looks wrong", "billing_inquiry"),
+    ("I'd like to pay my bill", "billing_inquiry"),
+    ("question about a charge on my statement", "billing_inquiry"),
+    ("how much do I owe", "billing_inquiry"),
+    ("I want my money back", "billing_inquiry"),
+    ("can I pay by credit card", "billing_inquiry"),
+    ("I forgot my password", "account_info"),
+    ("update the email on my account", "account_info"),
+    ("I moved and need to change my address", "account_info"),
+    ("check my account", "account_info"),
+    ("what time do you open", "location_hours"),
+    ("when do you close today", "location_hours"),
+    ("where is your office", "location_hours"),
+    ("are you open on sunday", "location_hours"),
+    ("what are your hours", "location_hours"),
+    ("what's the address", "location_hours"),
+    ("agent", "speak_to_agent"),
+    ("I want a real person", "speak_to_agent"),
+    ("let me speak to somebody", "speak_to_agent"),
+    ("can you transfer me to an operator", "speak_to_agent"),
+    ("put me through to a representative", "speak_to_agent"),
+    ("talk to customer service", "speak_to_agent"),
+    ("I've got a question", "general_inquiry"),
+    ("what do you do", "general_inquiry"),
+    ("I need help", "general_inquiry"),
+    ("what kind of services do you have", "general_inquiry"),
+]
+
+
+def timed(function, texts, repeat):
+    """Run function over texts repeat times; return results and per-call latencies"""
+    latencies = []
+    results = []
+    for iteration in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            result = function(text)
+            latencies.append(time.perf_counter() - start)
+            if iteration == 0:
+                results.append(result)
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="sentence-transformers model name")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the held-out set for timing")
+    parser.add_argument("--min-score", type=float, help="Override INTENT_MIN_SCORE")
+    parser.add_argument("--min-margin", type=float, help="Override INTENT_MIN_MARGIN")
+    parser.add_argument("--verbose", action="store_true", help="Print every misclassified or deferred utterance")
+    args = parser.parse_args()
+
+    ivr = load_ivr()
+    start = time.perf_counter()
+    classifier = ivr.EmbeddingIntentClassifier(
+        ivr.INTENT_EXAMPLES,
+        ivr.create_intent_embedder(args.model),
+        min_score=ivr.INTENT_MIN_SCORE if args.min_score is None else args.min_score,
+        min_margin=ivr.INTENT_MIN_MARGIN if args.min_margin is None else args.min_margin,
+    )
+    build_ms = (time.perf_counter() - start) * 1000
+
+    texts = [text for text, _ in HELD_OUT]
+    labels = [label for _, label in HELD_OUT]
+    rules = ivr.ollama_service._rule_based_intent_extraction
+
+    print(f"{len(HELD_OUT)} held-out utterances, {len(classifier.labels)} examples, "
+          f"{type(classifier.embedder).__name__}, built in {build_ms:.1f} ms")
+    print(f"{'tier':>10} {'coverage':>9} {'accuracy':>9} {'p50 ms':>8} {'p95 ms':>8}")
+
+    for name, function in (("embedding", classifier.classify), ("rules", rules)):
+        results, latencies = timed(function, texts, args.repeat)
+        answered = [(result["intent"], label, text) for result, label, text in zip(results, labels, texts) if result]
+        correct = sum(intent == label for intent, label, _ in answered)
+        coverage = len(answered) / len(HELD_OUT)
+        accuracy = correct / len(answered) if answered else 0.0
+        print(f"{name:>10} {coverage:>9.1%} {accuracy:>9.1%} "
+              f"{percentile(latencies, 50) * 1000:>8.3f} {percentile(latencies, 95) * 1000:>8.3f}")
+
+        if args.verbose:
+            for result, label, text in zip(results, labels, texts):
+                if not result or result["intent"] != label:
+                    print(f"    {text!r}: expected {label}, got {result['intent'] if result else 'deferred'}")
+
+
+if __name__ == "__main__":
+    main()
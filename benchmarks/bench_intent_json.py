@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Benchmark: free-form vs JSON-constrained intent generation against Ollama
+
+Sends every utterance of a fixed corpus (the held-out set from
+bench_intent_classifier.py) to a running Ollama server with the production
+intent prompt, once per output mode:
+
+    free    no format; parsed with json.loads, then the old regex fallback
+    json    "format": "json"
+    schema  "format": the intent JSON schema (Ollama 0.5+)
+
+and reports generated tokens (eval_count), latency, how many replies parsed
+with a single json.loads, how many needed the regex rescue, how many failed,
+and intent accuracy.
+
+Usage:
+    OLLAMA_API_URL=http://localhost:11434/api OLLAMA_MODEL=tinyllama \\
+        python benchmarks/bench_intent_json.py [--modes free json schema]
+"""
+
+import argparse
+import json
+import re
+import time
+
+import requests
+
+from _ivr import load_ivr, percentile
+from bench_intent_classifier import HELD_OUT
+
+
+def parse(text):
+    """Return (intent data, how it parsed)"""
+    try:
+        return json.loads(text), "direct"
+    except json.JSONDecodeError:
+        pass
+    match = re.search(r"({.*})", text, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(1)), "regex"
+        except json.JSONDecodeError:
+            pass
+    return None, "failed"
+
+
+def run_mode(ivr, session, output_format):
+    """Run the corpus once and collect per-utterance results"""
+    rows = []
+    for text, label in HELD_OUT:
+        payload = {
+            "model": ivr.OLLAMA_MODEL,
+            "prompt": ivr.INTENT_PROMPT_TEMPLATE.format(user_input=text),
+            "system": ivr.INTENT_SYSTEM_PROMPT,
+            "stream": False,
+            "keep_alive": ivr.OLLAMA_KEEP_ALIVE,
+            "options": {"temperature": 0.3, "num_predict": 1024},
+        }
+        if output_format:
+            payload["format"] = output_format
+
+        start = time.perf_counter()
+        response = session.post(f"{ivr.OLLAMA_API_URL}/generate", json=payload, timeout=120)
+        response.raise_for_status()
+        latency = time.perf_counter() - start
+
+        result = response.json()
+        intent_data, outcome = parse(result.get("response", ""))
+        intent = intent_data.get("intent") if isinstance(intent_data, dict) else None
+        rows.append({
+            "tokens": result.get("eval_count", 0),
+            "latency": latency,
+            "outcome": outcome,
+            "correct": intent == label,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["free", "json", "schema"], choices=["free", "json", "schema"])
+    args = parser.parse_args()
+
+    ivr = load_ivr()
+    formats = {"free": None, "json": "json", "schema": ivr.intent_json_schema(ivr.INTENT_NAMES)}
+    session = requests.Session()
+
+    if not ivr.ollama_service.is_available:
+        raise SystemExit(f"Ollama is not reachable at {ivr.OLLAMA_API_URL}")
+
+    # Load the model up front so load time does not land on the first mode
+    ivr.ollama_service.warm_up()
+
+    print(f"{len(HELD_OUT)} utterances, model {ivr.OLLAMA_MODEL}")
+    print(f"{'mode':>7} {'tokens':>8} {'tok/utt':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'direct':>7} {'regex':>6} {'failed':>7} {'accuracy':>9}")
+    for mode in args.modes:
+        rows = run_mode(ivr, session, formats[mode])
+        tokens = sum(row["tokens"] for row in rows)
+        latencies = [row["latency"] for row in rows]
+        outcomes = {name: sum(row["outcome"] == name for row in rows) for name in ("direct", "regex", "failed")}
+        accuracy = sum(row["correct"] for row in rows) / len(rows)
+        print(f"{mode:>7} {tokens:>8} {tokens / len(rows):>8.1f} "
+              f"{percentile(latencies, 50) * 1000:>8.0f} {percentile(latencies, 95) * 1000:>8.0f} "
+              f"{outcomes['direct']:>7} {outcomes['regex']:>6} {outcomes['failed']:>7} {accuracy:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
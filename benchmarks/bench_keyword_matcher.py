@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Benchmark: compiled keyword trie vs the legacy if/elif substring chain
+
+The old _rule_based_intent_extraction ran `any(word in user_input ...)` over
+each keyword list in turn, matching substrings inside other words. It is
+reproduced here as legacy_intent and compared with KeywordIntentMatcher on
+synthetic caller utterances built from INTENT_EXAMPLES plus filler words.
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py [--utterances 10000] [--show 10]
+
+Reports utterances/sec for each matcher, how often they agree, and a sample
+of the utterances where they differ.
+"""
+
+import argparse
+import random
+import time
+
+from _ivr import load_ivr
+
+FILLER = ["um", "so", "yeah", "hi", "display", "company", "today", "please", "the", "screen",
+          "hourly", "passport", "bookshelf", "spay", "personal", "closet", "reopen"]
+
+
+def legacy_intent(user_input):
+    """The pre-trie rule chain, kept for comparison"""
+    user_input = user_input.lower()
+    if any(word in user_input for word in ["schedule", "appointment", "book", "reserve"]):
+        return "schedule_appointment"
+    elif any(word in user_input for word in ["cancel", "reschedule"]):
+        return "cancel_appointment"
+    elif any(word in user_input for word in ["bill", "billing", "payment", "pay", "account"]):
+        return "billing_inquiry"
+    elif any(word in user_input for word in ["location", "address", "hour", "open", "close"]):
+        return "location_hours"
+    elif any(word in user_input for word in ["agent", "human", "person", "representative", "speak", "talk"]):
+        return "speak_to_agent"
+    return "general_inquiry"
+
+
+def synthetic_utterances(examples, count, seed=0):
+    """Example utterances with random filler words mixed in"""
+    rng = random.Random(seed)
+    sentences = [text for texts in examples.values() for text in texts]
+    utterances = []
+    for _ in range(count):
+        words = rng.choice(sentences).split()
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randint(0, len(words)), rng.choice(FILLER))
+        utterances.append(" ".join(words))
+    return utterances
+
+
+def throughput(function, utterances):
+    start = time.perf_counter()
+    results = [function(text) for text in utterances]
+    return results, len(utterances) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=10000, help="Number of synthetic utterances")
+    parser.add_argument("--show", type=int, default=10, help="Disagreements to print")
+    args = parser.parse_args()
+
+    ivr = load_ivr()
+    matcher = ivr.KeywordIntentMatcher(ivr.INTENT_KEYWORDS)
+    utterances = synthetic_utterances(ivr.INTENT_EXAMPLES, args.utterances)
+
+    def trie_intent(text):
+        return matcher.match(text)[0] or "general_inquiry"
+
+    legacy, legacy_rate = throughput(legacy_intent, utterances)
+    trie, trie_rate = throughput(trie_intent, utterances)
+
+    print(f"{args.utterances} utterances")
+    print(f"{'matcher':>8} {'utterances/s':>14}")
+    print(f"{'legacy':>8} {legacy_rate:>14,.0f}")
+    print(f"{'trie':>8} {trie_rate:>14,.0f}")
+
+    differences = [(text, old, new) for text, old, new in zip(utterances, legacy, trie) if old != new]
+    print(f"Agreement: {1 - len(differences) / len(utterances):.1%}")
+    for text, old, new in differences[:args.show]:
+        print(f"    {text!r}: legacy {old}, trie {new}")
+
+
+if __name__ == "__main__":
+    main()
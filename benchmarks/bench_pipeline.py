@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+Benchmark: end-of-speech to first audio for streamed voice turns, with and
+without pipelined intent classification
+
+Each caller streams one utterance in 100 ms chunks, with --word-time seconds
+per word and --silence seconds of trailing silence before voice_stream_end.
+Partial transcripts are decoded every STREAMING_ASR_STEP_MS as in the server.
+The script measures the time from voice_stream_end to the first response
+audio, which is the turn trace's first_audio mark. It runs with the pipeline
+off (transcribe, classify, respond, strictly in series) and on (guess the
+intent from stable partials and render its response early), each with an
+empty TTS cache.
+
+Whisper cannot be assumed here, so a scripted decoder stands in for it. Each
+decode takes --asr-latency seconds and returns the words spoken up to the end
+of the audio it was given. Ollama and Octave TTS are the stub servers.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--callers 20] [--tts-latency 0.4] [--asr-latency 0.15]
+
+Responses in the pre-rendered prompt bundle are instant either way. The
+pipeline only gains on responses that have to be synthesized, such as
+appointment confirmations naming a day.
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from _ivr import load_ivr, percentile
+from _stubs import start_stub_ollama, start_stub_tts
+
+# (dialogue stage the caller is at, what they say)
+UTTERANCES = [
+    (None, "book an appointment for friday"),
+    (None, "I'd like to schedule an appointment for tomorrow"),
+    ("appointment_date", "next thursday please"),
+    ("appointment_date", "monday"),
+    (None, "I have a question about my bill"),
+    (None, "what are your opening hours"),
+    (None, "can I speak to a person"),
+]
+
+CHUNK_SECONDS = 0.1
+
+
+def scripted_stream(ivr, words, word_time, asr_latency):
+    """A StreamingTranscription whose decodes replay words at word_time seconds each"""
+
+    class ScriptedStream(ivr.StreamingTranscription):
+        def is_ready(self):
+            return True
+
+        def _decode(self, window):
+            time.sleep(asr_latency)
+            heard = words[:int(len(window) / self.sample_rate / word_time)]
+            return [(0.0, len(window) / self.sample_rate, " ".join(heard))] if heard else []
+
+    return ScriptedStream(ivr.speech_recognition_service)
+
+
+def call(ivr, stage, text, args):
+    """Stream one utterance and return seconds from end of speech to first audio"""
+    session_id = str(uuid.uuid4())
+    sid = f"bench-{session_id}"
+    state = ivr.session_store.start(session_id)
+    state.stage = stage
+    ivr.session_store.save(state, turn=False)
+
+    words = text.split()
+    stream = scripted_stream(ivr, words, args.word_time, args.asr_latency)
+    chunk = bytes(2 * int(16000 * CHUNK_SECONDS))
+    for _ in range(int(round((len(words) * args.word_time + args.silence) / CHUNK_SECONDS))):
+        if stream.feed(chunk):
+            ivr.turn_executor.dispatch(ivr.partial_transcript_turn(stream, session_id, sid), counted=False)
+        time.sleep(CHUNK_SECONDS)
+
+    trace = ivr.admission.admit(ivr.turn_tracer.start_turn(session_id, "voice_stream"))
+    ivr.turn_executor.dispatch(ivr.voice_stream_turn(stream, session_id, sid, trace), trace).result(args.timeout)
+    return trace.marks.get("first_audio")
+
+
+def run(ivr, args, pipelined, workdir):
+    """Run every caller once; return {utterance: [latencies]} and the pipeline counters"""
+    ivr.tts_service.cache = ivr.TTSCache(os.path.join(workdir, f"tts-{pipelined}"), 32 * 1024 * 1024, 0)
+    ivr.intent_pipeline = ivr.IntentPipeline(
+        min_confidence=ivr.PIPELINE_TTS_CONFIDENCE,
+        idle=ivr.intent_pipeline.idle,
+        enabled=pipelined
+    )
+
+    results = {text: [] for _, text in UTTERANCES}
+    lock = threading.Lock()
+
+    def caller(index):
+        stage, text = UTTERANCES[index % len(UTTERANCES)]
+        latency = call(ivr, stage, text, args)
+        with lock:
+            results[text].append(latency)
+
+    threads = [threading.Thread(target=caller, args=(index,)) for index in range(args.callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, ivr.intent_pipeline.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=21, help="Concurrent callers per run")
+    parser.add_argument("--word-time", type=float, default=0.35, help="Seconds the caller takes per word")
+    parser.add_argument("--silence", type=float, default=0.6, help="Seconds of silence before the stream ends")
+    parser.add_argument("--asr-latency", type=float, default=0.15, help="Seconds per scripted decode")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub Ollama seconds to first token")
+    parser.add_argument("--tts-latency", type=float, default=0.4, help="Stub TTS seconds per request")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for any one turn")
+    args = parser.parse_args()
+
+    ollama = start_stub_ollama(latency=args.llm_latency)
+    tts = start_stub_tts(latency=args.tts_latency)
+    with tempfile.TemporaryDirectory(prefix="ivr-pipeline-") as workdir:
+        os.environ.update(
+            OLLAMA_API_URL=f"http://127.0.0.1:{ollama.server_port}/api",
+            OCTAVE_TTS_API_URL=f"http://127.0.0.1:{tts.server_port}/api/tts",
+            INTENT_CACHE_DB="",
+            TTS_CACHE_DIR=os.path.join(workdir, "tts_cache"),
+            PROMPT_BUNDLE_PATH=os.path.join(workdir, "prompts.bundle"),
+            TTS_SPECULATION="0",
+        )
+        ivr = load_ivr()
+        logging.getLogger("ivr").setLevel(logging.WARNING)
+
+        # Let the startup render of the prompt bundle finish first
+        deadline = time.monotonic() + args.timeout
+        while not all(ivr.tts_service.is_rendered(text) for text in ivr.static_prompts()):
+            if time.monotonic() > deadline:
+                raise RuntimeError("prompt bundle was not rendered in time")
+            time.sleep(0.2)
+
+        print(f"{args.callers} callers, {args.word_time:.2f}s per word, {args.silence:.1f}s trailing silence, "
+              f"decode {args.asr_latency * 1000:.0f}ms, stub TTS {args.tts_latency * 1000:.0f}ms per request")
+        for pipelined in (False, True):
+            results, counters = run(ivr, args, pipelined, workdir)
+            print(f"\n=== pipelined intent {'on' if pipelined else 'off'}")
+            print(f"{'utterance':>50} {'p50 ms':>8} {'max ms':>8}")
+            everything = []
+            for text, latencies in results.items():
+                latencies = [latency for latency in latencies if latency is not None]
+                everything.extend(latencies)
+                print(f"{text:>50} {percentile(latencies, 50) * 1000:>8.0f} {max(latencies, default=0) * 1000:>8.0f}")
+            print(f"{'all turns':>50} {percentile(everything, 50) * 1000:>8.0f} {max(everything, default=0) * 1000:>8.0f}"
+                  f"  (p95 {percentile(everything, 95) * 1000:.0f}ms)")
+            if pipelined:
+                print("Pipeline:", {key: counters[key] for key in ("guessed", "rendered", "confirmed", "cancelled", "unguessed")})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Benchmark: SessionStore at 100k concurrent calls
+
+Fills the store with one DialogueState per call, then measures the cost per
+call in memory, lookup and save rates from several threads at once, and how
+fast an expiry sweep drops abandoned calls. This runs for both the in-process
+backend and the SQLite backend that server processes share.
+
+Usage:
+    python benchmarks/bench_session_store.py [--sessions 100000] [--threads 8] [--shards 8]
+
+Memory is measured with tracemalloc on the memory backend only. The SQLite
+backend's data is on disk.
+"""
+
+import argparse
+import random
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+
+from _ivr import load_ivr
+
+
+def fill(store, session_ids):
+    start = time.perf_counter()
+    for session_id in session_ids:
+        state = store.start(session_id)
+        state.stage = "appointment_date"
+        state.slots = {"appointment_date": "2030-01-01"}
+        store.save(state)
+    return len(session_ids) / (time.perf_counter() - start)
+
+
+def concurrent_rate(function, session_ids, threads, operations):
+    """Calls per second of function(session_id) spread over several threads"""
+    per_thread = operations // threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            function(rng.choice(session_ids))
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def bench(ivr, backend, sessions, threads, shards, workdir):
+    session_ids = [str(uuid.uuid4()) for _ in range(sessions)]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = ivr.SessionStore(backend=backend, path=f"{workdir}/{backend}", shards=shards, ttl=3600, sweep_interval=0)
+    fill_rate = fill(store, session_ids)
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / sessions
+    tracemalloc.stop()
+
+    def turn(session_id):
+        state = store.get(session_id)
+        state.turns += 1
+        store.save(state, turn=False)
+
+    operations = min(sessions, 200000)
+    get_rate = concurrent_rate(store.get, session_ids, threads, operations)
+    turn_rate = concurrent_rate(turn, session_ids, threads, operations // 4)
+
+    # Age every call past the TTL and time one sweep
+    store.ttl = -1
+    start = time.perf_counter()
+    expired = store.expire()
+    sweep_rate = expired / (time.perf_counter() - start)
+
+    memory = f"{per_session:,.0f}" if backend == "memory" else "-"
+    print(f"{backend:>7} {fill_rate:>10,.0f} {get_rate:>10,.0f} {turn_rate:>12,.0f} {sweep_rate:>12,.0f} {memory:>10}")
+    return expired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100000, help="Concurrent calls held in the store")
+    parser.add_argument("--threads", type=int, default=8, help="Threads doing lookups at once")
+    parser.add_argument("--shards", type=int, default=8, help="Store shards")
+    parser.add_argument("--backends", default="memory,sqlite", help="Comma-separated backends to run")
+    args = parser.parse_args()
+
+    ivr = load_ivr()
+    print(f"{args.sessions:,} sessions, {args.threads} threads, {args.shards} shards")
+    print(f"{'backend':>7} {'starts/s':>10} {'gets/s':>10} {'get+save/s':>12} {'expired/s':>12} {'bytes/call':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in args.backends.split(","):
+            bench(ivr, backend, args.sessions, args.threads, args.shards, workdir)
+
+
+if __name__ == "__main__":
+    main()
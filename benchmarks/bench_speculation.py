@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Benchmark: speculative pre-synthesis of the appointment booking prompts
+
+Each caller asks for an appointment, listens for --think seconds, then picks
+a day from the menu or names a weekday. The booking confirmation names the
+date, so it is not in the pre-rendered prompt bundle. Without speculation it
+is synthesized while the caller waits; with speculation it is rendered while
+the caller listens to the date question.
+
+The script runs the same callers against a fresh server (empty TTS cache)
+with TTS_SPECULATION=0 and =1, using the stub Ollama and a stub TTS with
+--tts-latency per request. It reports the latency until the audio of the
+date turn is complete, and the server's speculation counters.
+
+Usage:
+    python benchmarks/bench_speculation.py [--sessions 30] [--think 3] [--tts-latency 0.5]
+"""
+
+import argparse
+import logging
+import random
+import tempfile
+
+import requests
+
+from _ivr import percentile
+from _stubs import start_stub_ollama, start_stub_tts
+from load_test import run_sessions
+from replay_calls import start_server
+
+DATE_ANSWERS = [
+    ("menu_selection", {"selection_id": "today"}),
+    ("menu_selection", {"selection_id": "tomorrow"}),
+    ("menu_selection", {"selection_id": "next_week"}),
+    ("text_input", {"text": "how about monday"}),
+    ("text_input", {"text": "wednesday please"}),
+    ("text_input", {"text": "friday"}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=30, help="Concurrent callers")
+    parser.add_argument("--think", type=float, default=3.0, help="Seconds a caller takes to answer a prompt")
+    parser.add_argument("--tts-latency", type=float, default=0.5, help="Stub TTS seconds per request")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for any one event")
+    args = parser.parse_args()
+    logging.getLogger("engineio.client").setLevel(logging.CRITICAL)
+
+    rng = random.Random(0)
+    scripts = [[("text_input", {"text": "I'd like to schedule an appointment"}), rng.choice(DATE_ANSWERS)]
+               for _ in range(args.sessions)]
+    ollama = start_stub_ollama()
+    tts = start_stub_tts(latency=args.tts_latency)
+
+    print(f"{args.sessions} callers, {args.think:.1f}s to answer, stub TTS {args.tts_latency * 1000:.0f}ms per request")
+    print(f"{'speculation':>11} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}  server counters")
+    for speculation in ("0", "1"):
+        with tempfile.TemporaryDirectory(prefix="ivr-speculation-") as workdir:
+            server, url = start_server(
+                f"http://127.0.0.1:{ollama.server_port}/api",
+                f"http://127.0.0.1:{tts.server_port}/api/tts",
+                workdir,
+                args.timeout,
+                extra_env={"TTS_SPECULATION": speculation},
+            )
+            try:
+                sessions, _ = run_sessions(url, scripts, args.timeout, think_time=args.think)
+                # The second turn of each call is the date answer
+                latencies = [session.audio_latencies[1] for session in sessions if len(session.audio_latencies) > 1]
+                counters = requests.get(f"{url}/health", timeout=5).json().get("speculation", {})
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+        summary = {key: counters.get(key) for key in ("rendered", "used", "late", "skipped_busy", "skipped_cap")}
+        print(f"{speculation:>11} {percentile(latencies, 50) * 1000:>8.0f} {percentile(latencies, 95) * 1000:>8.0f} "
+              f"{max(latencies, default=0) * 1000:>8.0f}  {summary}")
+
+
+if __name__ == "__main__":
+    main()
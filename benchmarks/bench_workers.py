@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Benchmark: throughput of 1..N server processes sharing a Socket.IO message queue
+
+For each worker count, starts the stub Ollama and Octave TTS servers, a
+stand-in message queue broker and that many main.py.py processes. The
+processes use SOCKETIO_MESSAGE_QUEUE=tcp://... and a shared SQLite session
+store. Callers replaying the recorded calls are spread round-robin over the
+workers and stay on the worker they first connected to, as they would behind
+a sticky load balancer (e.g. nginx ip_hash). The script reports turns/s and
+latency for each worker count.
+
+Before each run one client checks that an emit published to the queue
+reaches it through whichever worker it is connected to.
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1,2,4] [--sessions 200]
+    python benchmarks/bench_workers.py --serve 4     # run 4 workers until Ctrl-C
+
+Workers only scale to the cores available; each also loads its own Whisper
+model.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+import socketio
+
+from _stubs import start_queue_broker, start_stub_ollama, start_stub_tts
+from load_test import run_sessions, report
+from replay_calls import load_dialogues, start_server
+
+
+def start_workers(count, workdir, timeout):
+    """Start the stubs, the broker and count workers; return (processes, worker URLs, broker port)"""
+    ollama = start_stub_ollama()
+    tts = start_stub_tts()
+    broker = start_queue_broker()
+    broker_port = broker.getsockname()[1]
+    env = {
+        "SOCKETIO_MESSAGE_QUEUE": f"tcp://127.0.0.1:{broker_port}",
+        "SESSION_BACKEND": "sqlite",
+        "SESSION_DB": os.path.join(workdir, "sessions"),
+    }
+    processes, urls = [], []
+    for index in range(count):
+        process, url = start_server(
+            f"http://127.0.0.1:{ollama.server_port}/api",
+            f"http://127.0.0.1:{tts.server_port}/api/tts",
+            workdir,
+            timeout,
+            extra_env=env,
+            name=f"worker-{index}",
+        )
+        processes.append(process)
+        urls.append(url)
+    return processes, urls, broker_port
+
+
+def check_queue_delivery(url, broker_port, timeout=5):
+    """Publish an emit for one client straight to the broker and wait for it to arrive"""
+    received = threading.Event()
+    client = socketio.Client(reconnection=False)
+    client.on("ivr_response", lambda data: data.get("session_id") == "queue-check" and received.set())
+    client.connect(url, wait_timeout=timeout)
+    try:
+        message = {
+            "method": "emit", "event": "ivr_response", "data": [{"session_id": "queue-check"}],
+            "binary": False, "namespace": "/", "room": client.get_sid(), "skip_sid": None,
+            "callback": None, "host_id": "bench-workers",
+        }
+        frame = json.dumps({"channel": "flask-socketio", "message": message}).encode()
+        with socket.create_connection(("127.0.0.1", broker_port)) as sock:
+            sock.sendall(struct.pack(">I", len(frame)) + frame)
+            return received.wait(timeout)
+    finally:
+        client.disconnect()
+
+
+def stop_workers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to run")
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent caller sessions per run")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for any one event")
+    parser.add_argument("--serve", type=int, help="Just start this many workers and keep them running")
+    args = parser.parse_args()
+    logging.getLogger("engineio.client").setLevel(logging.CRITICAL)
+
+    dialogues = list(load_dialogues().values())
+    rng = random.Random(0)
+    scripts = [[rng.choice(alternatives) for alternatives in dialogues[index % len(dialogues)]]
+               for index in range(args.sessions)]
+
+    with tempfile.TemporaryDirectory(prefix="ivr-workers-") as workdir:
+        if args.serve:
+            processes, urls, broker_port = start_workers(args.serve, workdir, args.timeout)
+            print(f"Broker on tcp://127.0.0.1:{broker_port}; workers:", *urls, sep="\n    ")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                stop_workers(processes)
+            return
+
+        for count in [int(value) for value in args.workers.split(",")]:
+            processes, urls, broker_port = start_workers(count, workdir, args.timeout)
+            try:
+                delivered = all(check_queue_delivery(url, broker_port) for url in urls)
+                print(f"\n=== {count} worker(s); emits through the queue delivered: {delivered}")
+                # Caller i sticks to worker i mod N, as a sticky balancer would
+                sessions, elapsed = run_sessions(urls, scripts, args.timeout)
+                report(sessions, elapsed, urls[0])
+            finally:
+                stop_workers(processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+"""
+Load test: many concurrent Socket.IO caller sessions against a running server
+
+Each simulated caller connects, starts a session, waits for the welcome
+prompt, then takes a number of turns. Each turn sends a text utterance (or a
+recorded clip with --audio) and times two things: how long until the
+ivr_response arrives, and how long until the response's audio is complete.
+
+Usage:
+    python main.py.py                      # in another shell
+    python benchmarks/load_test.py [--url http://localhost:5000] [--sessions 200] [--turns 3]
+
+Run it once with TURN_EXECUTION=inline and once with the default async mode
+to compare. The server's /health "turns" block is printed at the end; it
+shows peak concurrent turns and the server's thread count.
+
+CallerSession, run_sessions and report are shared with replay_calls.py,
+which drives the same callers from the recorded call transcripts.
+"""
+
+import argparse
+import logging
+import random
+import threading
+import time
+import uuid
+
+import requests
+import socketio
+
+from _ivr import percentile
+
+UTTERANCES = [
+    "what are your opening hours",
+    "I want to speak to an agent",
+    "I have a question about my bill",
+    "I'd like to schedule an appointment",
+    "where are you located",
+    "can you help me",
+]
+
+
+class CallerSession:
+    """One simulated caller driving a Socket.IO session
+
+    The script is a list of (event, payload) turns, e.g.
+    ("text_input", {"text": "..."}) or ("menu_selection", {"selection_id": "billing"}).
+    The session id is added to each payload. A turn that fails is counted in
+    turn_errors and the caller moves on; a connection failure ends the session.
+    """
+
+    def __init__(self, url, script, timeout, binary_audio=False, think_time=0.0):
+        self.url = url
+        self.script = script
+        self.timeout = timeout
+        # Seconds a caller spends listening and answering before each turn
+        self.think_time = think_time
+        # The polling client handles each packet on its own thread, so under
+        # load a binary attachment can be decoded before its header and the
+        # turn stalls; base64 audio avoids that client-side race
+        self.binary_audio = binary_audio
+        self.session_id = str(uuid.uuid4())
+        self.response_latencies = []
+        self.audio_latencies = []
+        self.turn_errors = []
+        self.misrouted = 0
+        self.error = None
+
+        self.client = socketio.Client(reconnection=False)
+        self._response = threading.Event()
+        self._audio_done = threading.Event()
+        self.client.on("ivr_response", self._on_response)
+        self.client.on("ivr_audio_chunk", self._on_audio_chunk)
+        self.client.on("error", self._on_error)
+
+    def _on_response(self, data):
+        self._check_route(data)
+        self._response.set()
+        # Responses carrying their audio inline are complete on arrival
+        if data.get("audio") is not None:
+            self._audio_done.set()
+
+    def _on_audio_chunk(self, data):
+        self._check_route(data)
+        if data.get("final"):
+            self._audio_done.set()
+
+    def _check_route(self, data):
+        # Every reply must belong to this caller's session, whichever worker sent it
+        if data.get("session_id") != self.session_id:
+            self.misrouted += 1
+
+    def _on_error(self, data):
+        self.error = data.get("message", "error event")
+        self._response.set()
+        self._audio_done.set()
+
+    def _wait(self, event, what):
+        if not event.wait(self.timeout):
+            raise TimeoutError(f"no {what} within {self.timeout}s")
+        if self.error:
+            raise RuntimeError(self.error)
+
+    def run(self, start_barrier):
+        try:
+            self.client.connect(self.url, wait_timeout=self.timeout)
+            start_barrier.wait()
+
+            self._response.clear()
+            self._audio_done.clear()
+            self.client.emit("start_session", {"session_id": self.session_id, "binary_audio": self.binary_audio})
+            self._wait(self._response, "welcome")
+
+            for event, payload in self.script:
+                time.sleep(self.think_time)
+                self._response.clear()
+                self._audio_done.clear()
+                self.error = None
+                start = time.perf_counter()
+                self.client.emit(event, dict(payload, session_id=self.session_id))
+                try:
+                    self._wait(self._response, "ivr_response")
+                    self.response_latencies.append(time.perf_counter() - start)
+                    self._wait(self._audio_done, "response audio")
+                    self.audio_latencies.append(time.perf_counter() - start)
+                except (TimeoutError, RuntimeError) as e:
+                    self.turn_errors.append(f"{event}: {e}")
+                    if not self.client.connected:
+                        raise
+            self.error = None
+        except Exception as e:
+            self.error = self.error or str(e) or type(e).__name__
+        finally:
+            try:
+                self.client.disconnect()
+            except Exception:
+                pass
+
+
+def run_sessions(url, scripts, timeout, think_time=0.0):
+    """Run one caller per script concurrently and return (sessions, elapsed seconds)
+
+    url may be a list of server URLs; caller i then connects to url[i % len(url)].
+    """
+    urls = [url] if isinstance(url, str) else url
+    sessions = [CallerSession(urls[index % len(urls)], script, timeout, think_time=think_time)
+                for index, script in enumerate(scripts)]
+    # Hold every caller until all are connected so the turns really overlap
+    barrier = threading.Barrier(len(sessions) + 1)
+    threads = [threading.Thread(target=session.run, args=(barrier,), daemon=True) for session in sessions]
+    for thread in threads:
+        thread.start()
+
+    try:
+        barrier.wait(timeout=timeout)
+    except threading.BrokenBarrierError:
+        print("Not every session managed to connect")
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return sessions, time.perf_counter() - start
+
+
+def report(sessions, elapsed, url):
+    """Print throughput, latency percentiles and error rates for a finished run"""
+    failed = [session for session in sessions if session.error]
+    responses = [latency for session in sessions for latency in session.response_latencies]
+    audio_latencies = [latency for session in sessions for latency in session.audio_latencies]
+    turn_errors = [error for session in sessions for error in session.turn_errors]
+    turns = sum(len(session.script) for session in sessions)
+
+    print(f"{len(sessions)} sessions, {turns} turns in {elapsed:.1f}s, {len(failed)} sessions failed")
+    for error in sorted({session.error for session in failed})[:5]:
+        print(f"    {error}")
+    print(f"Turn errors: {len(turn_errors)}/{turns} ({len(turn_errors) / max(1, turns):.1%})")
+    for error in sorted(set(turn_errors))[:5]:
+        print(f"    {error}")
+    print(f"Misrouted events: {sum(session.misrouted for session in sessions)}")
+    print(f"Turns/s: {len(audio_latencies) / elapsed:.1f}")
+    print(f"{'latency':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, values in (("response", responses), ("audio", audio_latencies)):
+        print(f"{name:>10} {percentile(values, 50) * 1000:>8.0f} {percentile(values, 95) * 1000:>8.0f} "
+              f"{percentile(values, 99) * 1000:>8.0f} {max(values, default=0) * 1000:>8.0f}")
+
+    try:
+        health = requests.get(f"{url}/health", timeout=5).json()
+        print("Server turns:", health.get("turns"))
+        admission = health.get("admission") or {}
+        print("Server admission:", {key: admission.get(key) for key in ("admitted", "degraded", "shed", "shed_rate")})
+        print("Server latency:", health.get("latency"))
+    except requests.exceptions.RequestException:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:5000", help="Server URL")
+    parser.add_argument("--sessions", type=int, default=200, help="Concurrent caller sessions")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session")
+    parser.add_argument("--audio", help="Send this audio clip as voice_input instead of text")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for any one event")
+    args = parser.parse_args()
+    # The client logs every dropped polling connection; the report counts them
+    logging.getLogger("engineio.client").setLevel(logging.CRITICAL)
+
+    if args.audio:
+        with open(args.audio, "rb") as audio_file:
+            turn = ("voice_input", {"audio": audio_file.read()})
+        scripts = [[turn] * args.turns for _ in range(args.sessions)]
+    else:
+        scripts = [[("text_input", {"text": random.choice(UTTERANCES)}) for _ in range(args.turns)]
+                   for _ in range(args.sessions)]
+
+    sessions, elapsed = run_sessions(args.url, scripts, args.timeout)
+    report(sessions, elapsed, args.url)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+"""
+Replay the recorded calls in CALL TRANSCRIPTS/ against the IVR server, offline
+
+Each transcript is turned into a caller script: the choices a prompt offers
+("You can say 'Check my balance'...", "press 1", "Options: [Retry] [Help]")
+and the caller's recorded actions ("(User confirms)") become text_input,
+menu_selection or voice_input turns. The harness then starts stub Ollama and
+Octave TTS servers, launches main.py.py against them on a spare port, runs N
+concurrent callers cycling through the scripts and reports throughput,
+latency percentiles and error rates.
+
+Usage:
+    python benchmarks/replay_calls.py [--sessions 100] [--audio-dir clips/]
+    python benchmarks/replay_calls.py --url http://localhost:5000    # existing server
+    python benchmarks/replay_calls.py --llm-latency 1 --env TURN_LLM_WORKERS=4    # overload the LLM
+
+With --audio-dir, a turn whose text has a matching clip (named after the
+text, e.g. "check-my-balance.wav") is sent as voice_input instead. Whisper
+has to be able to load its model for those turns to succeed.
+"""
+
+import argparse
+import logging
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+
+from _ivr import REPO_ROOT
+from _stubs import start_stub_ollama, start_stub_tts
+from load_test import run_sessions, report
+
+TRANSCRIPT_DIR = REPO_ROOT / "CALL TRANSCRIPTS"
+
+# Same order as MAIN_MENU_OPTIONS in main.py.py, so "press N" picks option N
+MENU_SELECTIONS = ["customer_service", "appointments", "billing", "location", "agent"]
+
+# Prompts that ask an open question, and what a caller says back
+PROMPT_ANSWERS = (
+    (re.compile(r"(say|state) (the reason for your call|why you're calling)|advisor about|specific enquiry", re.I), [
+        "I have a question about my bill",
+        "I want to check my balance",
+        "I'd like to schedule an appointment",
+        "I need to speak to someone about my account",
+    ]),
+    (re.compile(r"account number", re.I), ["my account number is 12345678", "12345678"]),
+)
+
+QUOTED_CHOICE = re.compile(r"(?<!\w)['‘]([^'‘’]+)['’](?!\w)")
+BUTTONS = re.compile(r"\[([^\]]+)\]")
+PRESS = re.compile(r"press (\d)", re.I)
+USER_ACTION = re.compile(r"\(User (\w+)\s*(.*?)\)")
+
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def parse_transcript(text):
+    """Turn a call transcript into a caller script
+
+    Returns:
+        list: One list of alternative (event, payload) turns per caller turn
+    """
+    script = []
+    for line in text.splitlines():
+        line = line.strip()
+        action = USER_ACTION.search(line)
+        if action:
+            verb, rest = action.groups()
+            choice = QUOTED_CHOICE.search(rest)
+            if choice:
+                script.append([("text_input", {"text": choice.group(1)})])
+            elif verb == "confirms":
+                script.append([("text_input", {"text": "yes"})])
+            continue
+
+        if line.startswith(("Options:", "Button:")):
+            script.append([("text_input", {"text": button}) for button in BUTTONS.findall(line)])
+            continue
+
+        press = PRESS.search(line)
+        if press:
+            index = (int(press.group(1)) - 1) % len(MENU_SELECTIONS)
+            script.append([("menu_selection", {"selection_id": MENU_SELECTIONS[index]})])
+            continue
+
+        if re.search(r"\bsay\b", line, re.I):
+            choices = QUOTED_CHOICE.findall(line)
+            if choices:
+                script.append([("text_input", {"text": choice}) for choice in choices])
+                continue
+
+        for pattern, answers in PROMPT_ANSWERS:
+            if pattern.search(line):
+                script.append([("text_input", {"text": answer}) for answer in answers])
+                break
+    return script
+
+
+def load_dialogues(audio_dir=None):
+    """Parse every transcript, swapping in recorded clips where --audio-dir has one"""
+    clips = {}
+    if audio_dir:
+        clips = {path.stem: path for path in Path(audio_dir).iterdir() if path.is_file()}
+
+    dialogues = {}
+    for path in sorted(TRANSCRIPT_DIR.glob("*.txt")):
+        script = parse_transcript(path.read_text(encoding="utf-8"))
+        for alternatives in script:
+            for index, (event, payload) in enumerate(alternatives):
+                clip = clips.get(slug(payload.get("text", "")))
+                if event == "text_input" and clip:
+                    alternatives[index] = ("voice_input", {"audio": clip.read_bytes()})
+        if script:
+            dialogues[path.stem] = script
+    return dialogues
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(ollama_url, tts_url, workdir, timeout, extra_env=None, name="server"):
+    """Launch main.py.py against the stub backends and wait until it answers /health"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        OLLAMA_API_URL=ollama_url,
+        OCTAVE_TTS_API_URL=tts_url,
+        SERVER_HOST="127.0.0.1",
+        SERVER_PORT=str(port),
+        FLASK_DEBUG="0",
+        INTENT_CACHE_DB="",
+        TTS_CACHE_DIR=os.path.join(workdir, "tts_cache"),
+        PROMPT_BUNDLE_PATH=os.path.join(workdir, "prompts.bundle"),
+        **(extra_env or {}),
+    )
+    log = open(os.path.join(workdir, f"{name}.log"), "wb")
+    server = subprocess.Popen([sys.executable, str(REPO_ROOT / "main.py.py")], cwd=workdir, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}, see {log.name}")
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                return server, url
+        except requests.exceptions.RequestException:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"server did not come up within {timeout}s, see {log.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Replay against this running server instead of launching one")
+    parser.add_argument("--sessions", type=int, default=100, help="Concurrent caller sessions")
+    parser.add_argument("--audio-dir", help="Directory of recorded clips named after the turn text")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub Ollama seconds to first token")
+    parser.add_argument("--tts-latency", type=float, default=0.1, help="Stub TTS seconds per request")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for picking among a prompt's choices")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for any one event")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment for the launched server, e.g. TURN_LLM_WORKERS=4")
+    parser.add_argument("--show-scripts", action="store_true", help="Print the parsed caller scripts and exit")
+    args = parser.parse_args()
+    logging.getLogger("engineio.client").setLevel(logging.CRITICAL)
+
+    dialogues = load_dialogues(args.audio_dir)
+    if args.show_scripts:
+        for name, script in dialogues.items():
+            print(name)
+            for alternatives in script:
+                print("   ", " | ".join(f"{event} {payload.get('text') or payload.get('selection_id') or '<audio>'}"
+                                        for event, payload in alternatives))
+        return
+
+    rng = random.Random(args.seed)
+    names = list(dialogues)
+    scripts = [[rng.choice(alternatives) for alternatives in dialogues[names[index % len(names)]]]
+               for index in range(args.sessions)]
+
+    server = None
+    with tempfile.TemporaryDirectory(prefix="ivr-replay-") as workdir:
+        url = args.url
+        if not url:
+            ollama = start_stub_ollama(latency=args.llm_latency)
+            tts = start_stub_tts(latency=args.tts_latency)
+            server, url = start_server(
+                f"http://127.0.0.1:{ollama.server_port}/api",
+                f"http://127.0.0.1:{tts.server_port}/api/tts",
+                workdir,
+                args.timeout,
+                extra_env=dict(setting.split("=", 1) for setting in args.env),
+            )
+        try:
+            print(f"Replaying {', '.join(names)} with {args.sessions} callers against {url}")
+            sessions, elapsed = run_sessions(url, scripts, args.timeout)
+            report(sessions, elapsed, url)
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
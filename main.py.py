@@ -12,29 +12,67 @@ Requirements:
 
 import os
 import io
+import asyncio
+import bisect
+import functools
 import json
 import uuid
 import base64
+import hashlib
+import mmap
+import struct
+import queue
+import random
+import re
+import socket
+import sqlite3
+import subprocess
+import sys
 import logging
-import tempfile
+import wave
 import threading
+import time
+import zlib
+from urllib.parse import urlparse
+import multiprocessing
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 import requests
-from datetime import datetime
+import requests.adapters
+from datetime import date, datetime, timedelta
 from pathlib import Path
 import speech_recognition
 # Flask and extensions
-from flask import Flask, render_template_string, request, jsonify, session
+from flask import Flask, Response, render_template_string, request, jsonify, session
 from flask_socketio import SocketIO, emit
+from socketio import PubSubManager
 from dotenv import load_dotenv
 
 # Speech processing
 try:
-    from faster_whisper import WhisperModel
+    from faster_whisper import WhisperModel, decode_audio
 except ImportError:
     print("WARNING: faster-whisper not installed. Speech recognition will not work.")
     print("Install with: pip install faster-whisper")
     WhisperModel = None
+    decode_audio = None
+
+# Optional sentence embeddings for the intent classifier
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+# Whisper decoding, kept importable without the server for process replicas
+from whisper_worker import WHISPER_SAMPLE_RATE, load_whisper_model, transcribe_batch
+
+# Audio transcoding (installed along with faster-whisper)
+try:
+    import av
+except ImportError:
+    av = None
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -46,7 +84,9 @@ load_dotenv()
 # Create Flask application
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-please-change')
-socketio = SocketIO(app, cors_allowed_origins="*")
+
+# Monotonic time the server process started, for cold-start measurements
+SERVER_START_TIME = time.monotonic()
 
 # Global variables
 OLLAMA_API_URL = os.environ.get('OLLAMA_API_URL', 'http://localhost:11434/api')
@@ -55,40 +95,783 @@ WHISPER_MODEL_SIZE = os.environ.get('WHISPER_MODEL_SIZE', 'base')
 USE_CUDA = os.environ.get('USE_CUDA', '0') == '1'
 OCTAVE_TTS_API_URL = os.environ.get('OCTAVE_TTS_API_URL', 'http://localhost:8080/api/tts')
 OCTAVE_TTS_API_KEY = os.environ.get('OCTAVE_TTS_API_KEY', '')
+WHISPER_REPLICAS = int(os.environ.get('WHISPER_REPLICAS', '0')) or max(1, (os.cpu_count() or 1) // int(os.environ.get('WHISPER_THREADS_PER_REPLICA', '2')))
+ASR_WORKER_MODE = os.environ.get('ASR_WORKER_MODE', 'thread')
+ASR_QUEUE_SIZE = int(os.environ.get('ASR_QUEUE_SIZE', '64'))
+ASR_QUEUE_TIMEOUT = float(os.environ.get('ASR_QUEUE_TIMEOUT', '2'))
+ASR_BATCH_WINDOW_MS = float(os.environ.get('ASR_BATCH_WINDOW_MS', '10'))
+ASR_MAX_BATCH = int(os.environ.get('ASR_MAX_BATCH', '8'))
+ASR_EARLY_REQUEST_POLICY = os.environ.get('ASR_EARLY_REQUEST_POLICY', 'queue')
+ASR_READY_TIMEOUT = float(os.environ.get('ASR_READY_TIMEOUT', '30'))
+ASR_RESPAWN_BACKOFF = float(os.environ.get('ASR_RESPAWN_BACKOFF', '1'))
+ASR_RESPAWN_MAX_BACKOFF = float(os.environ.get('ASR_RESPAWN_MAX_BACKOFF', '60'))
+VAD_BACKEND = os.environ.get('VAD_BACKEND', 'energy')
+VAD_MIN_SILENCE_MS = int(os.environ.get('VAD_MIN_SILENCE_MS', '500'))
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', 'data/tts_cache')
+TTS_CACHE_MEMORY_MB = float(os.environ.get('TTS_CACHE_MEMORY_MB', '32'))
+TTS_CACHE_DISK_MB = float(os.environ.get('TTS_CACHE_DISK_MB', '512'))
+PROMPT_BUNDLE_PATH = os.environ.get('PROMPT_BUNDLE_PATH', 'data/prompts.bundle')
+PROMPT_RENDER_WORKERS = int(os.environ.get('PROMPT_RENDER_WORKERS', '8'))
+TTS_STREAMING = os.environ.get('TTS_STREAMING', '1') == '1'
+TTS_OPUS = os.environ.get('TTS_OPUS', '1') == '1'
+TTS_OPUS_BITRATE = int(os.environ.get('TTS_OPUS_BITRATE', '24000'))
+TTS_TRANSCODE_WORKERS = int(os.environ.get('TTS_TRANSCODE_WORKERS', '2'))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '16'))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '1'))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', '0.05'))
+OCTAVE_TTS_TIMEOUT = float(os.environ.get('OCTAVE_TTS_TIMEOUT', '5'))
+OLLAMA_TIMEOUT = float(os.environ.get('OLLAMA_TIMEOUT', '30'))
+OLLAMA_STREAMING = os.environ.get('OLLAMA_STREAMING', '1') == '1'
+OLLAMA_OUTPUT_FORMAT = os.environ.get('OLLAMA_OUTPUT_FORMAT', 'schema')
+OLLAMA_KEEP_ALIVE = os.environ.get('OLLAMA_KEEP_ALIVE', '30m')
+OLLAMA_WARMUP_UTTERANCE = os.environ.get('OLLAMA_WARMUP_UTTERANCE', 'hello')
+INTENT_CACHE_SIZE = int(os.environ.get('INTENT_CACHE_SIZE', '10000'))
+INTENT_CACHE_TTL = float(os.environ.get('INTENT_CACHE_TTL', '86400'))
+INTENT_CACHE_DB = os.environ.get('INTENT_CACHE_DB', 'data/intent_cache.db')
+INTENT_KEYWORDS_FILE = os.environ.get('INTENT_KEYWORDS_FILE', '')
+INTENT_CLASSIFIER = os.environ.get('INTENT_CLASSIFIER', '1') == '1'
+INTENT_EMBEDDING_MODEL = os.environ.get('INTENT_EMBEDDING_MODEL', '')
+INTENT_MIN_SCORE = float(os.environ.get('INTENT_MIN_SCORE', '0.35'))
+INTENT_MIN_MARGIN = float(os.environ.get('INTENT_MIN_MARGIN', '0.08'))
+TURN_EXECUTION = os.environ.get('TURN_EXECUTION', 'async')
+TURN_ASR_WORKERS = int(os.environ.get('TURN_ASR_WORKERS', '16'))
+TURN_LLM_WORKERS = int(os.environ.get('TURN_LLM_WORKERS', '32'))
+TURN_TTS_WORKERS = int(os.environ.get('TURN_TTS_WORKERS', '32'))
+TTS_STREAM_WORKERS = int(os.environ.get('TTS_STREAM_WORKERS', str(TURN_TTS_WORKERS)))
+SERVER_HOST = os.environ.get('SERVER_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('SERVER_PORT', '5000'))
+FLASK_DEBUG = os.environ.get('FLASK_DEBUG', '1') == '1'
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio')
+ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', '1') == '1'
+TURN_MAX_ACTIVE = int(os.environ.get('TURN_MAX_ACTIVE', '64'))
+TURN_SLO_SECONDS = float(os.environ.get('TURN_SLO_SECONDS', '3'))
+ADMISSION_PROBE_INTERVAL = float(os.environ.get('ADMISSION_PROBE_INTERVAL', '2'))
+ADMISSION_HALF_LIFE = float(os.environ.get('ADMISSION_HALF_LIFE', '10'))
+TURN_ASR_QUEUE = int(os.environ.get('TURN_ASR_QUEUE', '16'))
+TURN_LLM_QUEUE = int(os.environ.get('TURN_LLM_QUEUE', '32'))
+TURN_TTS_QUEUE = int(os.environ.get('TURN_TTS_QUEUE', '64'))
+TTS_SPECULATION = os.environ.get('TTS_SPECULATION', '1') == '1'
+TTS_SPECULATIVE_WORKERS = int(os.environ.get('TTS_SPECULATIVE_WORKERS', '2'))
+TTS_SPECULATIVE_MAX_PENDING = int(os.environ.get('TTS_SPECULATIVE_MAX_PENDING', '8'))
+TTS_SPECULATIVE_TTL = float(os.environ.get('TTS_SPECULATIVE_TTL', '120'))
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'memory')
+SESSION_DB = os.environ.get('SESSION_DB', 'data/sessions')
+SESSION_SHARDS = int(os.environ.get('SESSION_SHARDS', '8'))
+SESSION_TTL = float(os.environ.get('SESSION_TTL', '1800'))
+SESSION_SWEEP_INTERVAL = float(os.environ.get('SESSION_SWEEP_INTERVAL', '60'))
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', '0.1'))
+TRACE_LOG_PATH = os.environ.get('TRACE_LOG_PATH', '')
+STREAMING_ASR_STEP_MS = int(os.environ.get('STREAMING_ASR_STEP_MS', '300'))
+STREAMING_ASR_MAX_WINDOW_S = float(os.environ.get('STREAMING_ASR_MAX_WINDOW_S', '15'))
+PIPELINED_INTENT = os.environ.get('PIPELINED_INTENT', '1') == '1'
+PIPELINE_TTS_CONFIDENCE = float(os.environ.get('PIPELINE_TTS_CONFIDENCE', '0.5'))
 
 # Create data directory if not exists
 Path("data").mkdir(exist_ok=True)
 
-# ----- Speech Recognition Service -----
+# ----- Audio Decoding -----
 
-class SpeechRecognitionService:
-    """Service for speech recognition using Faster-Whisper"""
+def resample_audio(audio, from_rate, to_rate=16000):
+    """Resample a mono float32 array with linear interpolation
+    
+    Args:
+        audio: Mono audio samples
+        from_rate: Sample rate of the input
+        to_rate: Sample rate to convert to
+        
+    Returns:
+        numpy.ndarray: Resampled float32 audio
+    """
+    if from_rate == to_rate or not len(audio):
+        return audio.astype(np.float32, copy=False)
+    
+    target_length = int(round(len(audio) * to_rate / from_rate))
+    positions = np.linspace(0, len(audio) - 1, num=target_length)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+def _parse_pcm_wav(audio_view):
+    """Read the format of a PCM WAV clip and slice out its samples
+    
+    Unlike the wave module this works on the caller's buffer directly, so the
+    samples are never copied before numpy reads them.
+    
+    Args:
+        audio_view: memoryview over a RIFF/WAVE file
+        
+    Returns:
+        tuple: (channels, sample width in bytes, sample rate, memoryview of samples)
+        
+    Raises:
+        wave.Error: If the clip is not uncompressed integer PCM
+    """
+    fmt = None
+    position = 12
+    while position + 8 <= len(audio_view):
+        chunk_id = bytes(audio_view[position:position + 4])
+        chunk_size = struct.unpack_from("<I", audio_view, position + 4)[0]
+        body = position + 8
+        
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", audio_view, body)
+            if fmt[0] == 0xFFFE and chunk_size >= 26:
+                # WAVE_FORMAT_EXTENSIBLE keeps the real format in its sub-format GUID
+                fmt = struct.unpack_from("<H", audio_view, body + 24) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise wave.Error("data chunk before fmt chunk")
+            format_tag, channels, sample_rate, _, _, bits_per_sample = fmt
+            if format_tag != 1:
+                raise wave.Error(f"unsupported WAV format tag {format_tag}")
+            # Streaming recorders often leave the size unset; take what is there
+            end = min(len(audio_view), body + chunk_size)
+            sample_width = bits_per_sample // 8
+            end -= (end - body) % (sample_width * channels)
+            return channels, sample_width, sample_rate, audio_view[body:end]
+        
+        # Chunks are padded to an even size
+        position = body + chunk_size + (chunk_size & 1)
+    
+    raise wave.Error("no data chunk")
+
+def decode_audio_bytes(audio_data, sample_rate=16000):
+    """Decode an encoded audio clip to a float32 array without touching disk
+    
+    PCM WAV is parsed directly with numpy. Anything else (WebM/Opus from
+    MediaRecorder, MP3, Ogg, float WAV) is demuxed and decoded in memory by PyAV
+    through faster-whisper's decode_audio.
+    
+    Args:
+        audio_data: Encoded audio as bytes, bytearray or memoryview
+        sample_rate: Sample rate of the returned audio
+        
+    Returns:
+        numpy.ndarray: Mono float32 audio at sample_rate
+    """
+    audio_view = memoryview(audio_data)
+    
+    if audio_view[:4] == b"RIFF" and audio_view[8:12] == b"WAVE":
+        try:
+            channels, sample_width, source_rate, frames = _parse_pcm_wav(audio_view)
+            
+            if sample_width == 1:
+                audio = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+            elif sample_width == 2:
+                audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+            elif sample_width == 4:
+                audio = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+            else:
+                raise wave.Error(f"unsupported sample width {sample_width}")
+            
+            if channels > 1:
+                audio = audio.reshape(-1, channels).mean(axis=1)
+            return resample_audio(audio, source_rate, sample_rate)
+        except wave.Error as e:
+            # e.g. IEEE float or compressed WAV; let PyAV handle it
+            logger.debug(f"Falling back to PyAV for WAV input: {str(e)}")
+    
+    if decode_audio is None:
+        raise RuntimeError("faster-whisper is required to decode compressed audio")
     
-    def __init__(self, model_size="base"):
-        """Initialize the Whisper model
+    return decode_audio(io.BytesIO(audio_view), sampling_rate=sample_rate)
+
+
+# ----- Voice Activity Detection -----
+
+class VoiceActivityDetector:
+    """Finds speech in a clip so silence never reaches Whisper
+    
+    The default "energy" backend is a vectorized frame-level detector: a frame is
+    speech when its RMS energy clears an adaptive noise-floor threshold, unless
+    it is quiet and has the high zero-crossing rate typical of hiss. The
+    "silero" backend uses the Silero VAD model bundled with faster-whisper.
+    """
+    
+    def __init__(self, backend="energy", sample_rate=16000, frame_ms=30, min_speech_ms=250,
+                 min_silence_ms=500, padding_ms=150, threshold_db=12.0, floor_db=-50.0, ceiling_db=-35.0):
+        """Initialize the detector
         
         Args:
-            model_size: Size of the Whisper model to use (tiny, base, small, medium, large)
+            backend: "energy" or "silero"
+            sample_rate: Sample rate of the audio passed in
+            frame_ms: Analysis frame length for the energy backend
+            min_speech_ms: Speech regions shorter than this are dropped
+            min_silence_ms: Pauses at least this long split utterances
+            padding_ms: Audio kept either side of each speech region
+            threshold_db: Margin above the estimated noise floor counted as speech
+            floor_db: Absolute level (dBFS) below which nothing counts as speech
+            ceiling_db: Level (dBFS) above which a frame always counts as loud enough
         """
-        self.model_size = model_size
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.min_silence_frames = max(1, min_silence_ms // frame_ms)
+        self.min_speech_ms = min_speech_ms
+        self.min_silence_ms = min_silence_ms
+        self.padding = int(sample_rate * padding_ms / 1000)
+        self.threshold_db = threshold_db
+        self.floor_db = floor_db
+        self.ceiling_db = ceiling_db
+        
+        self.clips = 0
+        self.clips_dropped = 0
+        self.input_seconds = 0.0
+        self.removed_seconds = 0.0
+        self._stats_lock = threading.Lock()
+    
+    def detect(self, audio):
+        """Find speech regions
+        
+        Args:
+            audio: Mono float32 numpy array
+            
+        Returns:
+            list: (start, end) sample indices of each utterance, padding included
+        """
+        if self.backend == "silero":
+            regions = self._detect_silero(audio)
+        else:
+            regions = self._detect_energy(audio)
+        
+        # Pad each region and merge any that now overlap
+        padded = []
+        for start, end in regions:
+            start, end = max(0, start - self.padding), min(len(audio), end + self.padding)
+            if padded and start <= padded[-1][1]:
+                padded[-1] = (padded[-1][0], end)
+            else:
+                padded.append((start, end))
+        return padded
+    
+    def split(self, audio):
+        """Trim silence and split a clip into utterances
+        
+        Args:
+            audio: Mono float32 numpy array
+            
+        Returns:
+            tuple: (list of utterance arrays, seconds of audio removed)
+        """
+        regions = self.detect(audio)
+        utterances = [audio[start:end] for start, end in regions]
+        
+        total_seconds = len(audio) / self.sample_rate
+        removed_seconds = total_seconds - sum(len(u) for u in utterances) / self.sample_rate
+        with self._stats_lock:
+            self.clips += 1
+            self.clips_dropped += 0 if utterances else 1
+            self.input_seconds += total_seconds
+            self.removed_seconds += removed_seconds
+        
+        return utterances, removed_seconds
+    
+    def has_speech(self, audio):
+        """Whether the clip contains any speech at all"""
+        return bool(self.detect(audio))
+    
+    def stats(self):
+        """How much audio the detector has kept away from ASR"""
+        with self._stats_lock:
+            return {
+                'backend': self.backend,
+                'clips': self.clips,
+                'clips_dropped': self.clips_dropped,
+                'input_seconds': round(self.input_seconds, 2),
+                'removed_seconds': round(self.removed_seconds, 2),
+                'removed_ratio': round(self.removed_seconds / self.input_seconds, 3) if self.input_seconds else 0.0
+            }
+    
+    def _detect_energy(self, audio):
+        """Energy / zero-crossing detector over fixed frames"""
+        frame_count = len(audio) // self.frame_length
+        if frame_count == 0:
+            return []
+        frames = audio[:frame_count * self.frame_length].reshape(frame_count, self.frame_length)
+        
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        zero_crossings = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        
+        # The quietest tenth of the clip approximates the background noise level;
+        # the ceiling keeps clips with no silence at all from raising it too far
+        threshold = np.clip(np.percentile(energy_db, 10) + self.threshold_db, self.floor_db, self.ceiling_db)
+        hiss = (zero_crossings > 0.35) & (energy_db < threshold + 6)
+        speech = (energy_db > threshold) & ~hiss
+        
+        # Fill short pauses, then find where runs of speech start and stop
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        if len(starts) == 0:
+            return []
+        keep_gap = (starts[1:] - ends[:-1]) >= self.min_silence_frames
+        starts = np.concatenate((starts[:1], starts[1:][keep_gap]))
+        ends = np.concatenate((ends[:-1][keep_gap], ends[-1:]))
+        
+        long_enough = (ends - starts) >= self.min_speech_frames
+        return [
+            (int(start) * self.frame_length, int(end) * self.frame_length)
+            for start, end in zip(starts[long_enough], ends[long_enough])
+        ]
+    
+    def _detect_silero(self, audio):
+        """Silero VAD model shipped with faster-whisper"""
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+        
+        options = VadOptions(
+            min_speech_duration_ms=self.min_speech_ms,
+            min_silence_duration_ms=self.min_silence_ms,
+            speech_pad_ms=0
+        )
+        timestamps = get_speech_timestamps(audio, options, sampling_rate=self.sample_rate)
+        return [(chunk["start"], chunk["end"]) for chunk in timestamps]
+
+
+# ----- Whisper Transcription Engine -----
+
+WHISPER_WORKER_PATH = Path(__file__).resolve().with_name("whisper_worker.py")
+
+def _whisper_device():
+    """Device and compute type Whisper runs with: CUDA if enabled, otherwise CPU"""
+    if USE_CUDA:
+        return "cuda", "float16"
+    return "cpu", "int8"
+
+def _load_whisper_model(model_size, cpu_threads):
+    """Load a WhisperModel for the configured device"""
+    return load_whisper_model(model_size, cpu_threads, *_whisper_device())
+
+def _warm_up_replica(replica):
+    """Run a synthetic clip through a freshly loaded replica
+    
+    The first inference on a CTranslate2 model pays for memory allocation and
+    kernel selection. Doing it here keeps that cost away from the first caller.
+    Both the batched and the single-clip decode paths are exercised.
+    """
+    t = np.arange(WHISPER_SAMPLE_RATE) / WHISPER_SAMPLE_RATE
+    clip = (0.1 * np.sin(2 * np.pi * 220 * t) * np.sin(2 * np.pi * 2 * t)).astype(np.float32)
+    replica([(clip, {}), (clip, {})])
+    replica([(clip, {"beam_size": 1})])
+
+
+class SpeechRecognitionUnavailable(Exception):
+    """Raised when speech recognition cannot serve a request"""
+
+
+class TranscriptionRequest:
+    """A clip waiting in the transcription queue"""
+    
+    def __init__(self, audio, options):
+        self.audio = audio
+        self.options = options
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class ThreadReplica:
+    """Whisper replica sharing the server process, called from its worker thread"""
+    
+    def __init__(self, model):
+        self.model = model
+    
+    def __call__(self, items):
+        return transcribe_batch(self.model, items)
+    
+    def close(self):
         self.model = None
+
+
+class ReplicaExited(RuntimeError):
+    """Raised when a process replica's child has exited
+    
+    sent is False if the batch never reached the child, so it can be retried
+    on another replica.
+    """
+    
+    def __init__(self, message, sent=True):
+        super().__init__(message)
+        self.sent = sent
+
+
+class ProcessReplica:
+    """Whisper replica hosted in a child process running whisper_worker.py
+    
+    The child is a fresh interpreter rather than a fork, so it inherits none
+    of the server's threads or the locks they may hold. A child that crashes
+    or is killed (e.g. by the OOM killer) shows up as ReplicaExited.
+    """
+    
+    def __init__(self, model_size, cpu_threads):
+        self.connection, child_connection = multiprocessing.Pipe()
+        fd = child_connection.fileno()
+        self.process = subprocess.Popen(
+            [sys.executable, str(WHISPER_WORKER_PATH), str(fd), model_size, str(cpu_threads), *_whisper_device()],
+            pass_fds=(fd,)
+        )
+        child_connection.close()
         
-        # Initialize in a separate thread to avoid blocking
-        if WhisperModel:
-            threading.Thread(target=self._initialize_model).start()
+        status, message = self._receive()
+        if status == "error":
+            raise RuntimeError(message)
+    
+    def __call__(self, items):
+        if self.process.poll() is not None:
+            raise ReplicaExited(f"Whisper replica process exited with {self.process.returncode}", sent=False)
+        try:
+            self.connection.send(items)
+        except OSError:
+            raise ReplicaExited(f"Whisper replica process exited with {self.process.wait()}")
+        status, payload = self._receive()
+        if status == "error":
+            raise RuntimeError(payload)
+        return payload
+    
+    def close(self):
+        """Stop the child and release the pipe"""
+        self.connection.close()
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+    
+    def _receive(self):
+        try:
+            return self.connection.recv()
+        except (EOFError, OSError):
+            raise ReplicaExited(f"Whisper replica process exited with {self.process.wait()}")
+
+
+class TranscriptionEngine:
+    """Pool of Whisper model replicas fed from one bounded request queue
+    
+    Each replica runs in its own worker thread, or in a child process running
+    whisper_worker.py when worker_mode is "process". A worker takes the next
+    request off the shared queue and then waits up to batch_window_ms for
+    more, so short utterances that arrive together are decoded in one batched
+    pass.
+    
+    A process replica whose child exits is taken out of rotation and
+    respawned with exponential backoff. Its batch fails, but queued requests
+    wait for the other replicas unless none is left.
+    """
+    
+    def __init__(self, model_size, replicas=1, worker_mode="thread", queue_size=64,
+                 batch_window_ms=10, max_batch=8, respawn_backoff=1.0, max_respawn_backoff=60.0):
+        """Initialize the engine
+        
+        Args:
+            model_size: Size of the Whisper model each replica loads
+            replicas: Number of model replicas (workers)
+            worker_mode: "thread" or "process"
+            queue_size: Maximum number of requests waiting for a replica
+            batch_window_ms: How long a worker waits to fill a batch
+            max_batch: Largest number of requests decoded together
+            respawn_backoff: Seconds before the first attempt to respawn a
+                replica whose process exited; doubles on each failed attempt
+            max_respawn_backoff: Longest wait between respawn attempts
+        """
+        self.model_size = model_size
+        self.replicas = max(1, replicas)
+        self.cpu_threads = max(1, (os.cpu_count() or 1) // self.replicas)
+        self.worker_mode = worker_mode
+        if worker_mode == "process" and os.name != "posix":
+            logger.warning("Process replicas need POSIX file descriptor passing, using threads instead")
+            self.worker_mode = "thread"
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self.respawn_backoff = respawn_backoff
+        self.max_respawn_backoff = max(respawn_backoff, max_respawn_backoff)
+        self.requests = queue.Queue(maxsize=queue_size)
+        
+        self.loading_replicas = self.replicas
+        self.warming_replicas = 0
+        self.ready_replicas = 0
+        self.failed_replicas = 0
+        self.exited_replicas = 0
+        self.respawned_replicas = 0
+        self.ready_after = None
+        self.startup_timings = None
+        self._ready_event = threading.Event()
+        self.busy_replicas = 0
+        self.completed = 0
+        self.batches = 0
+        self.wait_times = deque(maxlen=1024)
+        self._stats_lock = threading.Lock()
+    
+    def start(self):
+        """Start the replica workers; models load in the background"""
+        for index in range(self.replicas):
+            threading.Thread(
+                target=self._worker_loop,
+                name=f"whisper-replica-{index}",
+                daemon=True
+            ).start()
+    
+    @property
+    def state(self):
+        """Lifecycle state: loading, warming, ready or failed"""
+        if self.ready_replicas:
+            return "ready"
+        if self.failed_replicas == self.replicas:
+            return "failed"
+        if self.warming_replicas:
+            return "warming"
+        return "loading"
+    
+    def is_ready(self):
+        """Whether at least one replica is loaded and warmed up"""
+        return self.ready_replicas > 0
+    
+    def wait_ready(self, timeout=None):
+        """Block until a replica is ready or every replica has failed
+        
+        Args:
+            timeout: Seconds to wait; None waits indefinitely
+            
+        Returns:
+            bool: True if a replica is ready
+        """
+        self._ready_event.wait(timeout)
+        return self.is_ready()
+    
+    def submit(self, audio, timeout=None, **options):
+        """Queue a clip for transcription
+        
+        Args:
+            audio: 16 kHz mono float32 numpy array
+            timeout: Seconds to wait for queue space; None waits indefinitely
+            options: Extra keyword arguments for WhisperModel.transcribe
+            
+        Returns:
+            Future: Resolves to a list of (start, end, text) segments
+            
+        Raises:
+            queue.Full: If the queue stays full for the whole timeout
+        """
+        request = TranscriptionRequest(audio, options)
+        self.requests.put(request, timeout=timeout)
+        return request.future
+    
+    def stats(self):
+        """Queue and wait-time statistics for sizing the pool"""
+        with self._stats_lock:
+            waits = sorted(self.wait_times)
+            completed = self.completed
+            batches = self.batches
+            busy = self.busy_replicas
+        
+        def wait_percentile(pct):
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(len(waits) * pct / 100))] * 1000, 2)
+        
+        return {
+            'state': self.state,
+            'ready_after_s': round(self.ready_after, 2) if self.ready_after is not None else None,
+            'startup': self.startup_timings,
+            'replicas': self.replicas,
+            'ready_replicas': self.ready_replicas,
+            'busy_replicas': busy,
+            'exited_replicas': self.exited_replicas,
+            'respawned_replicas': self.respawned_replicas,
+            'worker_mode': self.worker_mode,
+            'queue_depth': self.requests.qsize(),
+            'queue_capacity': self.requests.maxsize,
+            'completed': completed,
+            'mean_batch_size': round(completed / batches, 2) if batches else 0.0,
+            'wait_ms_p50': wait_percentile(50),
+            'wait_ms_p95': wait_percentile(95),
+            'wait_ms_max': round(waits[-1] * 1000, 2) if waits else 0.0
+        }
+    
+    def _worker_loop(self):
+        """Run one replica slot: load a replica, serve it and respawn it if its process exits"""
+        replica = self._load_replica()
+        if replica is None:
+            with self._stats_lock:
+                self.failed_replicas += 1
+                all_failed = self.failed_replicas == self.replicas
+                if all_failed:
+                    self._ready_event.set()
+            if all_failed:
+                self._fail_pending(SpeechRecognitionUnavailable("No Whisper replica could be loaded"))
+            return
+        
+        backoff = self.respawn_backoff
+        while True:
+            served_from = time.monotonic()
+            self._serve(replica)
+            replica.close()
+            
+            # Out of rotation until the respawn below is ready
+            with self._stats_lock:
+                self.ready_replicas -= 1
+                self.exited_replicas += 1
+                none_left = not self.ready_replicas
+                if none_left:
+                    self._ready_event.clear()
+            if none_left:
+                self._fail_pending(SpeechRecognitionUnavailable("Every Whisper replica has exited"))
+            
+            # A replica that served for a while earns a quick respawn again
+            if time.monotonic() - served_from > self.max_respawn_backoff:
+                backoff = self.respawn_backoff
+            while True:
+                logger.warning(f"Respawning Whisper replica in {backoff:.1f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.max_respawn_backoff)
+                with self._stats_lock:
+                    self.loading_replicas += 1
+                replica = self._load_replica()
+                if replica is not None:
+                    with self._stats_lock:
+                        self.respawned_replicas += 1
+                    break
+    
+    def _load_replica(self):
+        """Load and warm up a replica and put it into rotation
         
-    def _initialize_model(self):
-        """Initialize the Whisper model in a background thread"""
+        Returns:
+            The replica, or None if it failed to load or warm up
+        """
+        load_started = time.monotonic()
+        replica = None
+        warming = False
         try:
-            # Use CUDA if available, otherwise CPU
-            device = "cuda" if USE_CUDA else "cpu"
-            compute_type = "float16" if device == "cuda" else "int8"
+            if self.worker_mode == "process":
+                replica = ProcessReplica(self.model_size, self.cpu_threads)
+            else:
+                model = _load_whisper_model(self.model_size, self.cpu_threads)
+                replica = ThreadReplica(model)
             
-            logger.info(f"Loading Whisper model {self.model_size} on {device}...")
-            self.model = WhisperModel(self.model_size, device=device, compute_type=compute_type)
-            logger.info("Whisper model loaded successfully")
+            with self._stats_lock:
+                self.loading_replicas -= 1
+                self.warming_replicas += 1
+            warming = True
+            warmup_started = time.monotonic()
+            _warm_up_replica(replica)
+            warmup_finished = time.monotonic()
         except Exception as e:
             logger.error(f"Error loading Whisper model: {str(e)}")
+            if replica is not None:
+                replica.close()
+            with self._stats_lock:
+                if warming:
+                    self.warming_replicas -= 1
+                else:
+                    self.loading_replicas -= 1
+            return None
+        
+        with self._stats_lock:
+            self.warming_replicas -= 1
+            self.ready_replicas += 1
+            self._ready_event.set()
+            if self.ready_after is None:
+                self.ready_after = warmup_finished - SERVER_START_TIME
+                self.startup_timings = {
+                    'load_s': round(warmup_started - load_started, 2),
+                    'warmup_s': round(warmup_finished - warmup_started, 2)
+                }
+                logger.info(
+                    f"Speech recognition ready {self.ready_after:.2f}s after boot "
+                    f"(model load {warmup_started - load_started:.2f}s, warm-up {warmup_finished - warmup_started:.2f}s)"
+                )
+        logger.info(f"Whisper replica ready ({self.ready_replicas}/{self.replicas})")
+        return replica
+    
+    def _serve(self, replica):
+        """Decode batches from the queue until the replica's process exits"""
+        while True:
+            batch = self._next_batch()
+            started = time.monotonic()
+            with self._stats_lock:
+                self.busy_replicas += 1
+                self.wait_times.extend(started - request.enqueued_at for request in batch)
+            
+            try:
+                results = replica([(request.audio, request.options) for request in batch])
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            except ReplicaExited as e:
+                logger.error(f"Whisper replica died: {str(e)}")
+                for request in batch:
+                    # A batch the child never saw goes back for another replica
+                    if not e.sent:
+                        try:
+                            self.requests.put_nowait(request)
+                            continue
+                        except queue.Full:
+                            pass
+                    request.future.set_exception(e)
+                return
+            except Exception as e:
+                logger.error(f"Error in transcription batch: {str(e)}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            finally:
+                with self._stats_lock:
+                    self.busy_replicas -= 1
+                    self.completed += len(batch)
+                    self.batches += 1
+    
+    def _fail_pending(self, error):
+        """Fail every request still waiting in the queue"""
+        while True:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                return
+            request.future.set_exception(error)
+    
+    def _next_batch(self):
+        """Block for one request, then gather more that arrive within the window"""
+        batch = [self.requests.get()]
+        deadline = time.monotonic() + self.batch_window
+        
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        return batch
+
+
+# ----- Speech Recognition Service -----
+
+class SpeechRecognitionService:
+    """Service for speech recognition using Faster-Whisper"""
+    
+    def __init__(self, model_size="base", replicas=1):
+        """Initialize the Whisper transcription engine
+        
+        Args:
+            model_size: Size of the Whisper model to use (tiny, base, small, medium, large)
+            replicas: Number of model replicas serving requests in parallel
+        """
+        self.model_size = model_size
+        self.engine = None
+        self.first_transcript_after = None
+        self.vad = None
+        if VAD_BACKEND != "off":
+            self.vad = VoiceActivityDetector(backend=VAD_BACKEND, min_silence_ms=VAD_MIN_SILENCE_MS)
+        
+        # Replicas load in their own workers to avoid blocking
+        if WhisperModel:
+            self.engine = TranscriptionEngine(
+                model_size,
+                replicas=replicas,
+                worker_mode=ASR_WORKER_MODE,
+                queue_size=ASR_QUEUE_SIZE,
+                batch_window_ms=ASR_BATCH_WINDOW_MS,
+                max_batch=ASR_MAX_BATCH,
+                respawn_backoff=ASR_RESPAWN_BACKOFF,
+                max_respawn_backoff=ASR_RESPAWN_MAX_BACKOFF
+            )
+            self.engine.start()
     
     def transcribe_audio(self, audio_data, sample_rate=16000):
         """Transcribe audio data to text
@@ -99,316 +882,3478 @@ class SpeechRecognitionService:
             
         Returns:
             str: Transcribed text
-        """
-        if not WhisperModel:
-            logger.error("faster-whisper not installed")
-            return "Speech recognition unavailable. Please install faster-whisper."
             
-        if not self.model:
-            logger.error("Whisper model not loaded yet")
-            return "Speech recognition model is still loading. Please try again in a moment."
+        Raises:
+            SpeechRecognitionUnavailable: If the model is not ready and the
+                early-request policy rejects the call
+        """
+        self.ensure_ready()
             
         try:
-            # Convert audio bytes to temporary file if needed
-            if isinstance(audio_data, (bytes, bytearray)):
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=True) as temp_file:
-                    temp_file.write(audio_data)
-                    temp_file.flush()
-                    # Perform transcription
-                    segments, info = self.model.transcribe(temp_file.name, language="en")
+            # Decode encoded audio in memory; numpy arrays are used as-is
+            if isinstance(audio_data, (bytes, bytearray, memoryview)):
+                audio_data = decode_audio_bytes(audio_data)
+            
+            # Trim silence and split into utterances before paying for ASR
+            if self.vad:
+                utterances, removed_seconds = self.vad.split(audio_data)
+                logger.info(f"VAD removed {removed_seconds:.2f}s of silence, {len(utterances)} utterance(s) left")
+                if not utterances:
+                    return ""
             else:
-                # Directly process numpy array
-                segments, info = self.model.transcribe(audio_data, language="en")
+                utterances = [audio_data]
+            
+            # Transcribe the utterances in parallel on the free replicas
+            futures = [self.engine.submit(utterance, timeout=ASR_QUEUE_TIMEOUT) for utterance in utterances]
+            segments = [segment for future in futures for segment in future.result()]
             
             # Collect transcription from segments
-            transcription = " ".join(segment.text for segment in segments)
+            transcription = " ".join(text.strip() for _, _, text in segments)
             logger.info(f"Transcription: {transcription}")
+            self._record_first_transcript(transcription)
             return transcription.strip()
             
+        except queue.Full:
+            logger.error("Transcription queue is full")
+            return ""
+        except SpeechRecognitionUnavailable:
+            # An outage is not an empty transcript; let the caller say so
+            raise
         except Exception as e:
             logger.error(f"Error in transcription: {str(e)}")
             return ""
 
+    def transcribe_segments(self, audio, **options):
+        """Transcribe a float32 audio array and keep the segment timings
+        
+        Args:
+            audio: 16 kHz mono audio as a float32 numpy array
+            options: Extra keyword arguments for WhisperModel.transcribe
+            
+        Returns:
+            list: (start, end, text) tuples, times in seconds
+            
+        Raises:
+            SpeechRecognitionUnavailable: If the model is not ready and the
+                early-request policy rejects the call
+        """
+        self.ensure_ready()
+            
+        try:
+            segments = self.engine.submit(audio, timeout=ASR_QUEUE_TIMEOUT, **options).result()
+            self._record_first_transcript(" ".join(text for _, _, text in segments))
+            return segments
+        except queue.Full:
+            logger.error("Transcription queue is full")
+            return []
+        except SpeechRecognitionUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"Error in segment transcription: {str(e)}")
+            return []
+    
+    @property
+    def state(self):
+        """Readiness of speech recognition: unavailable, loading, warming, ready or failed"""
+        return self.engine.state if self.engine else "unavailable"
+    
+    def stats(self):
+        """Transcription engine and VAD statistics, or None without faster-whisper"""
+        if not self.engine:
+            return None
+        
+        stats = self.engine.stats()
+        stats['first_transcript_after_s'] = (
+            round(self.first_transcript_after, 2) if self.first_transcript_after is not None else None
+        )
+        stats['vad'] = self.vad.stats() if self.vad else None
+        return stats
+    
+    def is_ready(self):
+        """True once a replica can transcribe without waiting"""
+        return bool(self.engine) and self.engine.is_ready()
+    
+    def ensure_ready(self):
+        """Apply the early-request policy until a replica is ready
+        
+        With the "queue" policy callers wait up to ASR_READY_TIMEOUT for the
+        model; with "reject" they fail straight away.
+        
+        Raises:
+            SpeechRecognitionUnavailable: If the model is not ready and the
+                early-request policy rejects the call
+        """
+        if not self.engine:
+            logger.error("faster-whisper not installed")
+            raise SpeechRecognitionUnavailable("Speech recognition unavailable. Please install faster-whisper.")
+        
+        if self.engine.is_ready():
+            return
+        
+        if ASR_EARLY_REQUEST_POLICY == "queue" and self.engine.state != "failed":
+            logger.info("Whisper model not ready yet, waiting")
+            if self.engine.wait_ready(ASR_READY_TIMEOUT):
+                return
+        
+        state = self.engine.state
+        logger.error(f"Speech recognition not ready ({state})")
+        if state == "failed":
+            raise SpeechRecognitionUnavailable("Speech recognition model failed to load.")
+        raise SpeechRecognitionUnavailable("Speech recognition model is still loading. Please try again in a moment.")
+    
+    def _record_first_transcript(self, transcription):
+        """Log the cold-start time the first time a caller gets real text back"""
+        if self.first_transcript_after is None and transcription.strip():
+            self.first_transcript_after = time.monotonic() - SERVER_START_TIME
+            logger.info(f"Cold start to first useful transcript: {self.first_transcript_after:.2f}s")
+
 
-# ----- Text-to-Speech Service -----
+# ----- Streaming Speech Recognition -----
 
-class TextToSpeechService:
-    """Service for text-to-speech synthesis using Octave TTS API or fallback"""
+class StreamingTranscription:
+    """Incremental transcription of a single caller's audio stream
     
-    def __init__(self, voice="alloy"):
-        """Initialize the TTS service
+    Audio arrives as mono PCM16 chunks while the caller is still speaking. Once
+    enough new audio has arrived, the uncommitted tail of the buffer (the rolling
+    window) is decoded again and a partial transcript is produced. Segments that
+    Whisper has already closed off are committed and dropped from the window, so
+    each decode only covers the speech that is still in progress.
+    """
+    
+    def __init__(self, asr_service, sample_rate=16000, step_ms=None, max_window_s=None):
+        """Initialize the stream
         
         Args:
-            voice: Voice to use for synthesis (varies by provider)
+            asr_service: SpeechRecognitionService used for decoding
+            sample_rate: Sample rate of the incoming PCM chunks
+            step_ms: Milliseconds of new audio between partial decodes
+            max_window_s: Longest window decoded before it is force-committed
         """
-        self.voice = voice
-        self.api_url = OCTAVE_TTS_API_URL
-        self.api_key = OCTAVE_TTS_API_KEY
-        self.use_fallback = True  # Default to fallback
+        self.asr_service = asr_service
+        self.input_rate = sample_rate
+        self.sample_rate = 16000
+        self.step_samples = int(self.sample_rate * (step_ms or STREAMING_ASR_STEP_MS) / 1000)
+        self.max_window_samples = int(self.sample_rate * (max_window_s or STREAMING_ASR_MAX_WINDOW_S))
         
-        # Test if Octave TTS is available
-        try:
-            response = requests.get(self.api_url, timeout=1)
-            if response.status_code == 200:
-                self.use_fallback = False
-                logger.info("Octave TTS service is available")
-            else:
-                logger.warning("Octave TTS returned non-200 status code, using fallback")
-        except requests.exceptions.RequestException:
-            logger.warning("Could not connect to Octave TTS, using fallback TTS")
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.committed = []
+        self.last_partial = ""
+        self.samples_since_decode = 0
+        self.started_at = time.monotonic()
+        self.first_partial_at = None
+        self.stable_partial = None  # Partial the latest decode reproduced unchanged
+        self.intent_guess = None  # Kept by IntentPipeline
+        self.finished = False
+        
+        self._buffer_lock = threading.Lock()
+        self._decode_lock = threading.Lock()
     
-    def synthesize_speech(self, text):
-        """Convert text to speech
+    def is_ready(self):
+        """True once the decoder can run without waiting for the model"""
+        return self.asr_service.is_ready()
+    
+    def ensure_ready(self):
+        """Apply the early-request policy of the decoder until it is ready"""
+        self.asr_service.ensure_ready()
+    
+    def feed(self, pcm_bytes):
+        """Append a chunk of PCM16 audio
         
         Args:
-            text: Text to synthesize
+            pcm_bytes: Little-endian signed 16-bit mono samples
             
         Returns:
-            bytes: Audio data in bytes
+            bool: True when enough new audio has arrived for a partial decode
         """
-        if self.use_fallback:
-            return self._fallback_tts(text)
+        chunk = np.frombuffer(pcm_bytes, dtype="<i2").astype(np.float32) / 32768.0
+        chunk = resample_audio(chunk, self.input_rate, self.sample_rate)
+        
+        with self._buffer_lock:
+            self.audio = np.concatenate((self.audio, chunk))
+            self.samples_since_decode += len(chunk)
+            return self.samples_since_decode >= self.step_samples
+    
+    def decode_partial(self):
+        """Decode the rolling window and return the partial transcript
+        
+        Returns:
+            str: Partial transcript, or None if a decode is already running or
+                nothing changed since the last partial
+        """
+        if not self._decode_lock.acquire(blocking=False):
+            return None
             
         try:
-            # Send request to Octave TTS API
-            payload = {
-                "text": text,
-                "voice": self.voice,
-                "format": "wav"
-            }
+            # Partial decodes queued behind finish() have nothing left to add
+            if self.finished:
+                return None
             
-            headers = {}
-            if self.api_key:
-                headers["Authorization"] = f"Bearer {self.api_key}"
+            with self._buffer_lock:
+                window = self.audio
+                self.samples_since_decode = 0
             
-            response = requests.post(self.api_url, json=payload, headers=headers, timeout=5)
+            try:
+                segments = self._decode(window)
+            except SpeechRecognitionUnavailable:
+                return None
+            if not segments:
+                return None
             
-            if response.status_code == 200:
-                return response.content
+            # Everything but the last segment is final; the last one may still change
+            # as the caller keeps speaking. A window that has grown too long is
+            # committed in full so decode cost stays bounded.
+            if len(window) >= self.max_window_samples:
+                self._commit(segments, len(window))
+                tail_text = ""
             else:
-                logger.error(f"TTS API error: {response.status_code} - {response.text}")
-                # Fallback to gTTS
-                return self._fallback_tts(text)
+                if len(segments) > 1:
+                    self._commit(segments[:-1], int(segments[-2][1] * self.sample_rate))
+                tail_text = segments[-1][2]
+            
+            partial = " ".join(self.committed + [tail_text.strip()]).strip()
+            if not partial:
+                return None
+            if partial == self.last_partial:
+                # New audio added no words, so the caller has likely finished this phrase
+                self.stable_partial = partial
+                return None
                 
-        except Exception as e:
-            logger.error(f"Error in speech synthesis: {str(e)}")
-            return self._fallback_tts(text)
+            self.last_partial = partial
+            self.stable_partial = None
+            if self.first_partial_at is None:
+                self.first_partial_at = time.monotonic()
+                logger.info(f"First partial transcript after {self.first_partial_at - self.started_at:.3f}s")
+            return partial
+        finally:
+            self._decode_lock.release()
+    
+    def finish(self):
+        """Decode whatever is left in the window and return the final transcript
+        
+        Returns:
+            str: Final transcript for the whole stream
+        """
+        with self._decode_lock:
+            with self._buffer_lock:
+                window = self.audio
+            
+            segments = self._decode(window) if len(window) else []
+            self._commit(segments, len(window))
+            
+            self.finished = True
+            transcription = " ".join(self.committed).strip()
+            logger.info(f"Final streaming transcription: {transcription}")
+            return transcription
+    
+    def _decode(self, window):
+        """Run Whisper over a window, using committed text as the prompt"""
+        vad = self.asr_service.vad
+        if vad and not vad.has_speech(window):
+            return []
+        
+        prompt = " ".join(self.committed)[-200:] or None
+        return self.asr_service.transcribe_segments(
+            window,
+            beam_size=1,
+            condition_on_previous_text=False,
+            initial_prompt=prompt
+        )
+    
+    def _commit(self, segments, end_sample):
+        """Commit segments and drop their audio from the front of the window"""
+        self.committed.extend(text.strip() for _, _, text in segments if text.strip())
+        with self._buffer_lock:
+            self.audio = self.audio[max(0, end_sample):]
+
+
+# ----- Text-to-Speech Cache -----
+
+class TTSCache:
+    """Content-addressed cache for synthesized speech
+    
+    Entries are keyed on a SHA-256 digest of (text, voice, format, engine).
+    Recently used audio is kept in an in-memory LRU; every entry is also
+    written to disk so prompts survive a restart. Each tier evicts its least
+    recently used entries once it goes over its byte budget.
+    """
+    
+    def __init__(self, directory, memory_bytes, disk_bytes):
+        """Initialize the cache and index whatever is already on disk
+        
+        Args:
+            directory: Directory for the on-disk tier
+            memory_bytes: Byte budget of the in-memory tier
+            disk_bytes: Byte budget of the on-disk tier (0 disables it)
+        """
+        self.directory = Path(directory)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+        
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        if self.disk_bytes:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = sorted(self.directory.glob("*.audio"), key=lambda path: path.stat().st_mtime)
+            for path in entries:
+                size = path.stat().st_size
+                self._disk[path.stem] = size
+                self._disk_size += size
+            self._evict_disk()
+    
+    @staticmethod
+    def make_key(text, voice, audio_format, engine):
+        """Build the cache key for a synthesis request"""
+        payload = json.dumps([text, voice, audio_format, engine], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key):
+        """Look up audio by key
+        
+        Returns:
+            bytes: Cached audio, or None on a miss
+        """
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+            
+            if key not in self._disk:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(key)
+        
+        try:
+            audio = (self.directory / f"{key}.audio").read_bytes()
+        except OSError:
+            with self._lock:
+                self._forget_disk(key)
+                self.misses += 1
+            return None
+        
+        with self._lock:
+            self.disk_hits += 1
+            self._store_memory(key, audio)
+        return audio
+    
+    def __contains__(self, key):
+        """Whether either tier holds key, without counting a hit or miss"""
+        with self._lock:
+            return key in self._memory or key in self._disk
+    
+    def put(self, key, audio):
+        """Store audio under key in both tiers"""
+        if not audio:
+            return
+        
+        with self._lock:
+            self._store_memory(key, audio)
+            if not self.disk_bytes or key in self._disk or len(audio) > self.disk_bytes:
+                return
+        
+        try:
+            # Write to a temporary name first so readers never see a partial file
+            path = self.directory / f"{key}.audio"
+            temp_path = self.directory / f"{key}.{os.getpid()}.tmp"
+            temp_path.write_bytes(audio)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write TTS cache entry: {str(e)}")
+            return
+        
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(audio)
+                self._disk_size += len(audio)
+            self._evict_disk()
+    
+    def stats(self):
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_size,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_size
+            }
+    
+    def _store_memory(self, key, audio):
+        """Insert into the memory tier and evict down to budget (lock held)"""
+        if len(audio) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        
+        self._memory[key] = audio
+        self._memory_size += len(audio)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.evictions += 1
+    
+    def _evict_disk(self):
+        """Delete least recently used files until the disk tier fits (lock held)"""
+        while self._disk_size > self.disk_bytes:
+            key, _ = next(iter(self._disk.items()))
+            self._forget_disk(key)
+            self.evictions += 1
+            try:
+                (self.directory / f"{key}.audio").unlink()
+            except OSError:
+                pass
+    
+    def _forget_disk(self, key):
+        """Drop a key from the disk index (lock held)"""
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_size -= size
+
+
+# ----- Pre-rendered Prompt Bundle -----
+
+class PromptBundle:
+    """Static IVR prompts pre-rendered into one memory-mapped file
+    
+    Layout: an 8 byte magic string, a 4 byte little-endian header length, a JSON
+    header, then the audio blobs back to back. The header holds a fingerprint
+    of the prompt set and maps each TTS cache key to its (offset, length), so a
+    lookup is a dictionary access plus a slice of the mapping.
+    """
+    
+    MAGIC = b"IVRPRMT1"
+    
+    def __init__(self, path):
+        """Initialize the bundle
+        
+        Args:
+            path: Location of the bundle file
+        """
+        self.path = Path(path)
+        self.fingerprint = None
+        self.index = {}
+        self._file = None
+        self._mmap = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_fingerprint(keys):
+        """Fingerprint of a prompt set; changes whenever any text or voice does"""
+        return hashlib.sha256("\n".join(sorted(keys)).encode("utf-8")).hexdigest()
+    
+    def open(self):
+        """Map an existing bundle file
+        
+        Returns:
+            bool: True if a valid bundle was mapped
+        """
+        try:
+            bundle_file = open(self.path, "rb")
+        except OSError:
+            return False
+        
+        try:
+            mapping = mmap.mmap(bundle_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapping[:8] != self.MAGIC:
+                raise ValueError("bad magic")
+            header_length = struct.unpack("<I", mapping[8:12])[0]
+            header = json.loads(mapping[12:12 + header_length])
+            data_start = 12 + header_length
+        except (ValueError, struct.error) as e:
+            logger.warning(f"Ignoring unreadable prompt bundle {self.path}: {str(e)}")
+            bundle_file.close()
+            return False
+        
+        with self._lock:
+            self._close_mapping()
+            self._file = bundle_file
+            self._mmap = mapping
+            self.fingerprint = header["fingerprint"]
+            self.index = {
+                key: (data_start + offset, length)
+                for key, (offset, length) in header["entries"].items()
+            }
+        return True
+    
+    def __contains__(self, key):
+        return key in self.index
+    
+    def covers(self, keys):
+        """Whether the mapped bundle was built for exactly this prompt set"""
+        return self.fingerprint == self.make_fingerprint(keys) and all(key in self.index for key in keys)
+    
+    def get(self, key):
+        """Look up pre-rendered audio by TTS cache key
+        
+        Returns:
+            bytes: Audio data, or None if the prompt is not in the bundle
+        """
+        with self._lock:
+            location = self.index.get(key)
+            if location is None or self._mmap is None:
+                return None
+            offset, length = location
+            return self._mmap[offset:offset + length]
+    
+    def build(self, prompts, render, workers=8):
+        """Render prompts in parallel and write a new bundle
+        
+        Args:
+            prompts: Dict of TTS cache key -> prompt text
+            render: Callable turning text into audio bytes
+            workers: Number of prompts synthesized concurrently
+            
+        Returns:
+            int: Number of prompts that rendered successfully
+        """
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            rendered = dict(zip(prompts, pool.map(render, prompts.values())))
+        
+        entries = {}
+        blobs = []
+        offset = 0
+        for key, audio in rendered.items():
+            if not audio:
+                logger.warning(f"Prompt did not render and is left out of the bundle: {prompts[key][:40]}")
+                continue
+            entries[key] = (offset, len(audio))
+            blobs.append(audio)
+            offset += len(audio)
+        
+        header = json.dumps({
+            'fingerprint': self.make_fingerprint(prompts),
+            'entries': entries
+        }).encode("utf-8")
+        
+        # Write next to the live file and swap it in atomically
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "wb") as bundle_file:
+            bundle_file.write(self.MAGIC)
+            bundle_file.write(struct.pack("<I", len(header)))
+            bundle_file.write(header)
+            for audio in blobs:
+                bundle_file.write(audio)
+        os.replace(temp_path, self.path)
+        
+        self.open()
+        return len(entries)
+    
+    def _close_mapping(self):
+        """Release the current mapping (lock held)"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+        self._mmap = None
+        self._file = None
+
+
+# ----- Audio Transcoding -----
+
+def transcode_to_opus(audio_data, bitrate=24000):
+    """Re-encode an audio clip as Ogg/Opus
+    
+    Args:
+        audio_data: Encoded audio (WAV, MP3, ...) as bytes
+        bitrate: Target Opus bitrate in bits per second
+        
+    Returns:
+        bytes: Ogg/Opus audio
+    """
+    output = io.BytesIO()
+    with av.open(io.BytesIO(audio_data), mode="r") as source, av.open(output, mode="w", format="ogg") as target:
+        stream = target.add_stream("libopus", rate=48000)
+        stream.bit_rate = bitrate
+        stream.layout = "mono"
+        resampler = av.audio.resampler.AudioResampler(format="s16", layout="mono", rate=48000)
+        
+        for frame in source.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                for packet in stream.encode(resampled):
+                    target.mux(packet)
+        
+        # Flush the resampler and the encoder
+        for resampled in resampler.resample(None):
+            for packet in stream.encode(resampled):
+                target.mux(packet)
+        for packet in stream.encode(None):
+            target.mux(packet)
+    
+    return output.getvalue()
+
+
+# ----- HTTP Transport -----
+
+class HTTPTransport:
+    """Pooled keep-alive HTTP client for one backend service
+    
+    Each backend gets its own requests.Session, so TCP connections are reused
+    across calls instead of being opened per request. Failed connections and
+    gateway errors are retried with exponential backoff and full jitter.
+    """
+    
+    RETRY_STATUSES = (502, 503, 504)
+    
+    def __init__(self, name, pool_size=16, connect_timeout=1.0, read_timeout=5.0,
+                 retries=2, backoff=0.05):
+        """Initialize the transport
+        
+        Args:
+            name: Backend name, used in logs and stats
+            pool_size: Maximum idle keep-alive connections kept per host
+            connect_timeout: Seconds allowed to open a connection
+            read_timeout: Default seconds allowed to wait for a response
+            retries: Extra attempts after a connection error or 502/503/504
+            backoff: Base delay in seconds for the retry backoff
+        """
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._adapter = adapter
+        
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retried = 0
+        self._failures = 0
+    
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+    
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+    
+    def request(self, method, url, timeout=None, retry=True, **kwargs):
+        """Send a request over the pooled session
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            timeout: Read timeout in seconds, overriding the backend default
+            retry: False to make a single attempt (e.g. for health probes)
+            **kwargs: Passed through to requests.Session.request
+            
+        Returns:
+            requests.Response: The response; 502/503/504 are returned once
+                retries are exhausted
+                
+        Raises:
+            requests.exceptions.RequestException: If the last attempt failed
+        """
+        timeout = self.timeout if timeout is None else (self.timeout[0], timeout)
+        attempts = 1 + (self.retries if retry else 0)
+        
+        with self._lock:
+            self._requests += 1
+        
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # Covers refused and reset connections and connect timeouts; read
+                # timeouts are not retried since the backend may still be working
+                if last_attempt:
+                    with self._lock:
+                        self._failures += 1
+                    raise
+                logger.warning(f"{self.name} request failed ({str(e)}), retrying")
+            except requests.exceptions.RequestException:
+                with self._lock:
+                    self._failures += 1
+                raise
+            else:
+                if response.status_code not in self.RETRY_STATUSES or last_attempt:
+                    return response
+                logger.warning(f"{self.name} returned {response.status_code}, retrying")
+                response.close()
+            
+            with self._lock:
+                self._retried += 1
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+    
+    def stats(self):
+        """Request, retry and connection counters for this backend"""
+        pools = self._adapter.poolmanager.pools
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'retries': self._retried,
+                'failures': self._failures,
+                'connections_opened': sum(pools[key].num_connections for key in pools.keys()),
+            }
+    
+    def close(self):
+        self.session.close()
+
+
+# ----- Text-to-Speech Service -----
+
+def split_into_sentences(text):
+    """Split text into sentences for streaming synthesis
+    
+    Adapted from ConversationPanel.split_into_sentences in the Workflow-Creator.
+    
+    Args:
+        text: Text to split
+        
+    Returns:
+        list: Sentences of at most 250 characters each
+    """
+    # Add spaces around punctuation for consistent splitting
+    text = " " + text + " "
+    text = text.replace("\n", " ")
+    
+    # Handle abbreviations
+    text = re.sub(r"(Mr|Mrs|Ms|Dr|i\.e)\.", r"\1<prd>", text)
+    text = re.sub(r"\.\.\.", r"<prd><prd><prd>", text)
+    
+    # Split on punctuation
+    sentences = re.split(r"(?<=\d\.)\s+|(?<=[.!?:])\s+", text)
+    
+    # Clean up sentences
+    sentences = [s.replace("<prd>", ".").strip() for s in sentences if s.strip()]
+    
+    # Ensure sentences aren't too long
+    final_sentences = []
+    for sentence in sentences:
+        while len(sentence) > 250:
+            split_index = sentence.rfind(' ', 0, 249)
+            if split_index == -1:
+                split_index = 249
+            final_sentences.append(sentence[:split_index].strip())
+            sentence = sentence[split_index:].strip()
+        final_sentences.append(sentence)
+    
+    return final_sentences
+
+
+class TextToSpeechService:
+    """Service for text-to-speech synthesis using Octave TTS API or fallback"""
+    
+    def __init__(self, voice="alloy"):
+        """Initialize the TTS service
+        
+        Args:
+            voice: Voice to use for synthesis (varies by provider)
+        """
+        self.voice = voice
+        self.api_url = OCTAVE_TTS_API_URL
+        self.api_key = OCTAVE_TTS_API_KEY
+        self.use_fallback = True  # Default to fallback
+        self.http = HTTPTransport(
+            "Octave TTS",
+            pool_size=HTTP_POOL_SIZE,
+            connect_timeout=HTTP_CONNECT_TIMEOUT,
+            read_timeout=OCTAVE_TTS_TIMEOUT,
+            retries=HTTP_RETRIES,
+            backoff=HTTP_RETRY_BACKOFF
+        )
+        self.cache = TTSCache(
+            TTS_CACHE_DIR,
+            memory_bytes=int(TTS_CACHE_MEMORY_MB * 1024 * 1024),
+            disk_bytes=int(TTS_CACHE_DISK_MB * 1024 * 1024)
+        )
+        self.prompt_bundle = PromptBundle(PROMPT_BUNDLE_PATH)
+        self._stream_pool = ThreadPoolExecutor(max_workers=TTS_STREAM_WORKERS, thread_name_prefix="tts-stream")
+        
+        # Opus encoding runs in its own threads so it never stalls a request
+        # thread; PyAV releases the GIL while it encodes
+        self._transcode_pool = None
+        if TTS_OPUS and av:
+            self._transcode_pool = ThreadPoolExecutor(max_workers=TTS_TRANSCODE_WORKERS, thread_name_prefix="tts-transcode")
+        
+        # Test if Octave TTS is available
+        try:
+            response = self.http.get(self.api_url, timeout=1, retry=False)
+            if response.status_code == 200:
+                self.use_fallback = False
+                logger.info("Octave TTS service is available")
+            else:
+                logger.warning("Octave TTS returned non-200 status code, using fallback")
+        except requests.exceptions.RequestException:
+            logger.warning("Could not connect to Octave TTS, using fallback TTS")
+    
+    @property
+    def native_format(self):
+        """Audio format the active TTS engine produces"""
+        return "mp3" if self.use_fallback else "wav"
+    
+    def negotiate_format(self, codecs):
+        """Pick the output format for a client from the codecs it can decode
+        
+        Args:
+            codecs: Codec names the client advertised, e.g. ["opus", "mp3"]
+            
+        Returns:
+            str: "opus" if both sides support it, otherwise the native format
+        """
+        if self._transcode_pool and "opus" in (codecs or []):
+            return "opus"
+        return self.native_format
+    
+    def synthesize_speech(self, text, audio_format=None):
+        """Convert text to speech
+        
+        Args:
+            text: Text to synthesize
+            audio_format: "opus" to get Ogg/Opus output; anything else returns
+                the engine's native format
+            
+        Returns:
+            bytes: Audio data in bytes
+        """
+        if audio_format == "opus" and self._transcode_pool:
+            return self._opus_synthesis(text)
+        
+        # Static prompts are served straight from the pre-rendered bundle
+        audio = self.prompt_bundle.get(self.prompt_key(text))
+        if audio:
+            return audio
+        
+        if not self.use_fallback:
+            audio = self._cached_synthesis(text, "octave", "wav", self._octave_tts)
+            if audio:
+                return audio
+        
+        # Fallback to gTTS
+        return self._cached_synthesis(text, "gtts", "mp3", self._fallback_tts)
+    
+    def _opus_synthesis(self, text):
+        """Serve text as Opus, transcoding and caching the native audio on a miss"""
+        key = self.opus_key(text)
+        audio = self.cache.get(key)
+        if audio is not None:
+            return audio
+        
+        native_audio = self.synthesize_speech(text)
+        if not native_audio:
+            return native_audio
+        
+        try:
+            audio = self._transcode_pool.submit(transcode_to_opus, native_audio, TTS_OPUS_BITRATE).result()
+        except Exception as e:
+            logger.error(f"Opus transcoding error: {str(e)}")
+            return native_audio
+        
+        self.cache.put(key, audio)
+        return audio
+    
+    def synthesize_speech_stream(self, text, audio_format=None):
+        """Convert text to speech one sentence at a time
+        
+        All sentences are queued for synthesis at once and yielded in order, so
+        the first sentence can be played while the rest are still rendering.
+        The first renders on the calling thread, so it never waits behind other
+        callers' sentences in the shared pool. Pre-rendered prompts are yielded
+        whole.
+        
+        Args:
+            text: Text to synthesize
+            audio_format: Output format, as for synthesize_speech
+            
+        Yields:
+            bytes: Audio data for each sentence, in order
+        """
+        units = self.stream_units(text)
+        if len(units) == 1:
+            yield self.synthesize_speech(text, audio_format)
+            return
+        
+        futures = [
+            self._stream_pool.submit(self.synthesize_speech, sentence, audio_format)
+            for sentence in units[1:]
+        ]
+        try:
+            yield self.synthesize_speech(units[0], audio_format)
+            for future in futures:
+                yield future.result()
+        finally:
+            # Drop sentences nobody will play if the caller stops early
+            for future in futures:
+                future.cancel()
+    
+    def stream_units(self, text):
+        """The texts synthesize_speech_stream renders for text: each sentence,
+        or the whole text if it is one sentence or a pre-rendered prompt"""
+        sentences = split_into_sentences(text)
+        if len(sentences) <= 1 or self.prompt_key(text) in self.prompt_bundle:
+            return [text]
+        return sentences
+    
+    def is_rendered(self, text, audio_format=None):
+        """Whether synthesize_speech would answer text from the bundle or cache"""
+        if audio_format == "opus" and self._transcode_pool:
+            return self.opus_key(text) in self.cache
+        key = self.prompt_key(text)
+        return key in self.prompt_bundle or key in self.cache
+    
+    def cached_speech(self, text, audio_format=None):
+        """Audio for text only if it is already rendered; nothing is synthesized
+        
+        Args:
+            text: Text to look up
+            audio_format: Preferred format, as for synthesize_speech
+            
+        Returns:
+            tuple: (audio bytes, audio format), or None if text was never rendered
+        """
+        if audio_format == "opus" and self._transcode_pool:
+            audio = self.cache.get(self.opus_key(text))
+            if audio is not None:
+                return audio, "opus"
+        
+        key = self.prompt_key(text)
+        audio = self.prompt_bundle.get(key) or self.cache.get(key)
+        return (audio, self.native_format) if audio else None
+    
+    def prompt_key(self, text):
+        """Cache key of text rendered with the engine currently in use"""
+        if self.use_fallback:
+            return TTSCache.make_key(text, self.voice, "mp3", "gtts")
+        return TTSCache.make_key(text, self.voice, "wav", "octave")
+    
+    def opus_key(self, text):
+        """Cache key of text rendered with the engine currently in use and transcoded to Opus"""
+        engine = "gtts" if self.use_fallback else "octave"
+        return TTSCache.make_key(text, self.voice, f"opus-{TTS_OPUS_BITRATE}", engine)
+    
+    def prepare_prompt_bundle(self, texts):
+        """Make sure the prompt bundle covers texts, re-rendering it if stale
+        
+        Args:
+            texts: Static prompt texts to pre-render
+        """
+        prompts = {self.prompt_key(text): text for text in texts}
+        if self.prompt_bundle.open() and self.prompt_bundle.covers(prompts):
+            logger.info(f"Prompt bundle up to date with {len(prompts)} prompts")
+            return
+        
+        render = self._fallback_tts if self.use_fallback else self._octave_tts
+        started = time.monotonic()
+        rendered = self.prompt_bundle.build(prompts, render, workers=PROMPT_RENDER_WORKERS)
+        logger.info(
+            f"Rendered prompt bundle in {time.monotonic() - started:.2f}s: "
+            f"{rendered}/{len(prompts)} prompts covered"
+        )
+    
+    def _cached_synthesis(self, text, engine, audio_format, synthesize):
+        """Serve text from the cache, synthesizing and storing it on a miss
+        
+        Args:
+            text: Text to synthesize
+            engine: Name of the TTS engine, part of the cache key
+            audio_format: Audio format the engine produces, part of the cache key
+            synthesize: Callable producing the audio for text
+            
+        Returns:
+            bytes: Audio data in bytes (empty if synthesis failed)
+        """
+        key = TTSCache.make_key(text, self.voice, audio_format, engine)
+        audio = self.cache.get(key)
+        if audio is not None:
+            return audio
+        
+        audio = synthesize(text)
+        self.cache.put(key, audio)
+        return audio
+    
+    def _octave_tts(self, text):
+        """Synthesize speech with the Octave TTS API
+        
+        Args:
+            text: Text to synthesize
+            
+        Returns:
+            bytes: WAV audio data, or empty bytes if the request failed
+        """
+        try:
+            # Send request to Octave TTS API
+            payload = {
+                "text": text,
+                "voice": self.voice,
+                "format": "wav"
+            }
+            
+            headers = {}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            
+            response = self.http.post(self.api_url, json=payload, headers=headers)
+            
+            if response.status_code == 200:
+                return response.content
+            else:
+                logger.error(f"TTS API error: {response.status_code} - {response.text}")
+                return b""
+                
+        except Exception as e:
+            logger.error(f"Error in speech synthesis: {str(e)}")
+            return b""
+    
+    def _fallback_tts(self, text):
+        """Fallback TTS method when the primary method fails
+        
+        Args:
+            text: Text to synthesize
+            
+        Returns:
+            bytes: Audio data in bytes
+        """
+        try:
+            # Import gtts only when needed (fallback)
+            from gtts import gTTS
+            
+            tts = gTTS(text=text, lang='en')
+            mp3_fp = io.BytesIO()
+            tts.write_to_fp(mp3_fp)
+            mp3_fp.seek(0)
+            
+            # Return the MP3 data
+            return mp3_fp.read()
+            
+        except Exception as e:
+            logger.error(f"Fallback TTS error: {str(e)}")
+            # Return empty bytes
+            return b""
+
+
+# ----- Intent Cache -----
+
+# Words dropped from cache keys; they rarely change what the caller wants
+INTENT_STOPWORDS = frozenset("""
+    a an the i i'm im me my we our you your it is am are be to of for on in at
+    and or so just please would could can like want need id hi hello hey um uh
+    yes yeah ok okay well oh thanks thank
+""".split())
+
+NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10",
+    "first": "1", "second": "2", "third": "3", "fourth": "4", "fifth": "5"
+}
+
+# Relative day expressions, checked longest first, and their offset from today
+RELATIVE_DAYS = (
+    ("day after tomorrow", 2),
+    ("next week", 7),
+    ("tomorrow", 1),
+    ("tonight", 0),
+    ("today", 0),
+)
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+def normalize_utterance(text):
+    """Reduce an utterance to the form used as an intent cache key
+    
+    Lowercases, strips punctuation, spells numbers as digits and drops
+    stopwords, so "Can I speak to an agent, please?" and "speak to agent"
+    share a key.
+    
+    Args:
+        text: Raw utterance
+        
+    Returns:
+        str: Normalized utterance
+    """
+    words = re.sub(r"[^\w\s']", " ", text.lower()).replace("'", "").split()
+    words = [NUMBER_WORDS.get(word, word) for word in words if word not in INTENT_STOPWORDS]
+    return " ".join(words)
+
+def relative_date_entities(text):
+    """Resolve relative day expressions in an utterance against today's date
+    
+    Args:
+        text: Raw or normalized utterance
+        
+    Returns:
+        dict: {"date": ISO date} if the utterance names a relative day or a
+            day of the week (the next one after today), else {}
+    """
+    text = text.lower()
+    today = date.today()
+    for phrase, offset in RELATIVE_DAYS:
+        if phrase in text:
+            return {"date": (today + timedelta(days=offset)).isoformat()}
+    for index, weekday in enumerate(WEEKDAYS):
+        if re.search(rf"\b{weekday}\b", text):
+            return {"date": (today + timedelta(days=(index - today.weekday() - 1) % 7 + 1)).isoformat()}
+    return {}
+
+class IntentCache:
+    """Cache of intent extraction results keyed on normalized utterances
+    
+    Results live in an in-memory LRU with a TTL and are optionally written
+    through to SQLite so they survive restarts. Dates that depend on the
+    current day ("tomorrow") are not stored; they are recomputed on every hit.
+    """
+    
+    def __init__(self, max_entries, ttl, db_path=None, namespace=""):
+        """Initialize the cache
+        
+        Args:
+            max_entries: Entries kept in memory before LRU eviction
+            ttl: Seconds an entry stays valid
+            db_path: SQLite file for the persistent tier, or None to disable it
+            namespace: Prefix for keys, e.g. the model name, so results from
+                different models are never mixed
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.namespace = namespace
+        
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        
+        if db_path:
+            try:
+                Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS intents (key TEXT PRIMARY KEY, result TEXT, stored_at REAL)")
+                self._db.execute("DELETE FROM intents WHERE stored_at < ?", (time.time() - self.ttl,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Intent cache persistence disabled: {str(e)}")
+                self._db = None
+    
+    def make_key(self, user_input):
+        """Build the cache key for an utterance
+        
+        Returns:
+            str: The key, or None if nothing is left after normalization
+        """
+        normalized = normalize_utterance(user_input)
+        return f"{self.namespace}:{normalized}" if normalized else None
+    
+    def get(self, user_input, record=True):
+        """Look up the intent for an utterance
+        
+        Args:
+            user_input: The utterance
+            record: False to leave the hit and miss counters alone, for
+                lookups that may never become a turn
+        
+        Returns:
+            dict: Intent data with time-relative entities resolved for today,
+                or None on a miss
+        """
+        key = self.make_key(user_input)
+        now = time.time()
+        
+        with self._lock:
+            if key is None:
+                if record:
+                    self.misses += 1
+                return None
+            
+            entry = self._memory.get(key)
+            if entry is not None:
+                result, stored_at = entry
+                if now - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    if record:
+                        self.memory_hits += 1
+                    return self._resolve(result, user_input)
+                del self._memory[key]
+                self.expired += 1
+            
+            row = None
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT result, stored_at FROM intents WHERE key = ?", (key,)).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Intent cache read failed: {str(e)}")
+            
+            if row is None or now - row[1] > self.ttl:
+                if record:
+                    self.misses += 1
+                return None
+            
+            result = json.loads(row[0])
+            self._store_memory(key, result, row[1])
+            if record:
+                self.disk_hits += 1
+            return self._resolve(result, user_input)
+    
+    def put(self, user_input, intent_data):
+        """Store the intent extracted for an utterance"""
+        key = self.make_key(user_input)
+        if key is None:
+            return
+        
+        result = dict(intent_data)
+        entities = dict(result.get("entities") or {})
+        
+        # Relative dates go stale at midnight; get() recomputes them instead
+        if relative_date_entities(user_input):
+            entities.pop("date", None)
+        result["entities"] = entities
+        stored_at = time.time()
+        
+        with self._lock:
+            self._store_memory(key, result, stored_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO intents (key, result, stored_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(result), stored_at)
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Intent cache write failed: {str(e)}")
+    
+    def stats(self):
+        """Hit/miss counters and size"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'entries': len(self._memory),
+                'persistent': self._db is not None
+            }
+    
+    def _store_memory(self, key, result, stored_at):
+        """Insert into the LRU and evict down to size (lock held)"""
+        self._memory[key] = (result, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+    
+    @staticmethod
+    def _resolve(result, user_input):
+        """Copy a cached result and fill in today's value for relative dates"""
+        resolved = dict(result)
+        resolved["entities"] = {**(result.get("entities") or {}), **relative_date_entities(user_input)}
+        return resolved
+
+
+# ----- Keyword Intent Matcher -----
+
+# Declarative keyword table for rule-based intent extraction. Phrases may span
+# several words; every phrase found in an utterance adds its weight to its
+# intent and the highest total wins, ties going to the earlier intent.
+INTENT_KEYWORDS = {
+    "schedule_appointment": {
+        "confidence": 0.8,
+        "keywords": {"schedule": 1.0, "appointment": 1.0, "book": 1.0, "booking": 1.0, "reserve": 1.0}
+    },
+    "cancel_appointment": {
+        "confidence": 0.8,
+        "keywords": {"cancel": 2.0, "reschedule": 2.0, "call off": 2.0}
+    },
+    "billing_inquiry": {
+        "confidence": 0.8,
+        "keywords": {"bill": 1.0, "billing": 1.0, "payment": 1.0, "pay": 1.0, "account": 1.0, "charge": 1.0, "refund": 1.0}
+    },
+    "location_hours": {
+        "confidence": 0.9,
+        "keywords": {"location": 1.0, "address": 1.0, "hour": 1.0, "open": 1.0, "close": 1.0, "where are you": 1.0}
+    },
+    "speak_to_agent": {
+        "confidence": 0.9,
+        "keywords": {"agent": 1.5, "human": 1.5, "person": 1.0, "representative": 1.5, "operator": 1.5, "speak": 0.5, "talk": 0.5}
+    },
+}
+
+def load_intent_keywords(path=None):
+    """Load the keyword table from a JSON file, or return the built-in one
+    
+    Args:
+        path: JSON file with the same shape as INTENT_KEYWORDS
+        
+    Returns:
+        dict: Keyword table
+    """
+    if not path:
+        return INTENT_KEYWORDS
+    try:
+        with open(path, "r", encoding="utf-8") as keywords_file:
+            return json.load(keywords_file)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Could not load intent keywords from {path}, using built-in table: {str(e)}")
+        return INTENT_KEYWORDS
+
+class KeywordIntentMatcher:
+    """Score every intent in one pass over an utterance with a token-level trie
+    
+    Keywords only match whole words (so "pay" does not fire on "display"), and
+    a plural "s" on an utterance word is dropped if the word itself is not a
+    keyword, so "hours" matches "hour".
+    """
+    
+    TERMINAL = object()
+    
+    def __init__(self, table):
+        """Compile the keyword table into a trie
+        
+        Args:
+            table: Dict of intent to {"confidence": float, "keywords": {phrase: weight}}
+        """
+        self.intents = list(table)
+        self.confidence = {intent: table[intent].get("confidence", 0.7) for intent in self.intents}
+        self.root = {}
+        
+        for index, intent in enumerate(self.intents):
+            for phrase, weight in table[intent]["keywords"].items():
+                node = self.root
+                for token in self.tokenize(phrase):
+                    node = node.setdefault(token, {})
+                node.setdefault(self.TERMINAL, []).append((index, weight))
+    
+    TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+    
+    @classmethod
+    def tokenize(cls, text):
+        return cls.TOKEN_PATTERN.findall(text.lower())
+    
+    def scores(self, text):
+        """Total keyword weight per intent, in self.intents order"""
+        tokens = self.tokenize(text)
+        scores = [0.0] * len(self.intents)
+        root = self.root
+        terminal = self.TERMINAL
+        
+        for start, token in enumerate(tokens):
+            node = root.get(token)
+            if node is None and token.endswith("s"):
+                node = root.get(token[:-1])
+            position = start + 1
+            while node is not None:
+                for index, weight in node.get(terminal, ()):
+                    scores[index] += weight
+                if position == len(tokens) or len(node) == 1 and terminal in node:
+                    break
+                token = tokens[position]
+                child = node.get(token)
+                if child is None and token.endswith("s"):
+                    child = node.get(token[:-1])
+                node = child
+                position += 1
+        return scores
+    
+    def match(self, text):
+        """Best matching intent for an utterance
+        
+        Returns:
+            tuple: (intent, confidence), or (None, None) if no keyword matched
+        """
+        scores = self.scores(text)
+        best = scores.index(max(scores))
+        if scores[best] <= 0:
+            return None, None
+        intent = self.intents[best]
+        return intent, self.confidence[intent]
+
+
+# ----- Intent Classifier -----
+
+# Labelled example utterances the embedding classifier matches against
+INTENT_EXAMPLES = {
+    "schedule_appointment": [
+        "I'd like to schedule an appointment",
+        "can I book an appointment",
+        "I need to make an appointment",
+        "book me in for a visit",
+        "I want to see someone next week",
+        "do you have any availability",
+        "set up a meeting",
+        "reserve a time slot",
+        "when is the next available appointment",
+        "I need to come in for a consultation",
+        "schedule a visit",
+        "I'd like to book a session",
+        "is there an opening on friday",
+    ],
+    "cancel_appointment": [
+        "I need to cancel my appointment",
+        "cancel my booking",
+        "I can't make it to my appointment",
+        "I want to reschedule",
+        "move my appointment to another day",
+        "change the time of my appointment",
+        "call off my visit",
+        "I won't be able to come in",
+    ],
+    "billing_inquiry": [
+        "I have a question about my bill",
+        "why is my bill so high",
+        "I want to make a payment",
+        "how do I pay my invoice",
+        "there's a charge I don't recognize",
+        "I was charged twice",
+        "billing question",
+        "I need a refund",
+        "when is my payment due",
+        "can I set up a payment plan",
+        "how much is my balance due",
+        "my statement is wrong",
+        "I want to pay with my card",
+    ],
+    "account_info": [
+        "I want to check my account",
+        "update my account details",
+        "change my address on file",
+        "what's my account balance",
+        "reset my password",
+        "I can't log in to my account",
+        "update my phone number",
+        "check my account status",
+    ],
+    "location_hours": [
+        "what are your opening hours",
+        "when are you open",
+        "what time do you close",
+        "where are you located",
+        "what's your address",
+        "are you open on weekends",
+        "how do I get to your office",
+        "are you open today",
+        "directions to your location",
+        "what are your business hours",
+    ],
+    "speak_to_agent": [
+        "I want to speak to an agent",
+        "let me talk to a real person",
+        "connect me to a representative",
+        "I need a human",
+        "operator please",
+        "transfer me to customer service",
+        "can I speak with someone",
+        "get me a live agent",
+        "representative",
+        "talk to a person",
+    ],
+    "general_inquiry": [
+        "I have a question",
+        "can you help me",
+        "I need some information",
+        "what services do you offer",
+        "tell me more about your company",
+        "how does this work",
+        "what can you do",
+        "I'm not sure",
+    ],
+}
+
+class HashedNgramEmbedder:
+    """Embed text as a signed, hashed bag of word and character n-grams
+    
+    Needs no model download. Word unigrams and bigrams carry the meaning;
+    character n-grams make it tolerant of ASR misspellings and inflections.
+    """
+    
+    def __init__(self, dimensions=4096, char_ngram_range=(3, 5)):
+        """Initialize the embedder
+        
+        Args:
+            dimensions: Size of the hashed feature space
+            char_ngram_range: Smallest and largest character n-gram
+        """
+        self.dimensions = dimensions
+        self.char_ngram_range = char_ngram_range
+    
+    def features(self, text):
+        """Word unigrams, word bigrams and character n-grams of the normalized text"""
+        words = normalize_utterance(text).split()
+        features = list(words)
+        features.extend(f"{first} {second}" for first, second in zip(words, words[1:]))
+        
+        low, high = self.char_ngram_range
+        for word in words:
+            padded = f" {word} "
+            for size in range(low, high + 1):
+                features.extend(f"#{padded[i:i + size]}" for i in range(len(padded) - size + 1))
+        return features
+    
+    def embed(self, texts):
+        """Embed texts as L2-normalized rows
+        
+        Args:
+            texts: List of strings
+            
+        Returns:
+            np.ndarray: float32 matrix of shape (len(texts), dimensions)
+        """
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            # crc32 rather than hash() so vectors are stable across processes
+            hashes = np.array([zlib.crc32(feature.encode("utf-8")) for feature in self.features(text)], dtype=np.int64)
+            if not len(hashes):
+                continue
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix[row], hashes % self.dimensions, signs)
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-9)
+
+class SentenceEmbedder:
+    """Embed text with a local sentence-transformers model"""
+    
+    def __init__(self, model_name):
+        self.model = SentenceTransformer(model_name, device="cpu")
+    
+    def embed(self, texts):
+        return self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+def create_intent_embedder(model_name=None):
+    """Use the named sentence-transformers model if possible, else hashed n-grams"""
+    if model_name:
+        if SentenceTransformer is None:
+            logger.warning("sentence-transformers not installed, using hashed n-gram intent embeddings")
+        else:
+            try:
+                return SentenceEmbedder(model_name)
+            except Exception as e:
+                logger.warning(f"Could not load intent embedding model {model_name}: {str(e)}")
+    return HashedNgramEmbedder()
+
+class EmbeddingIntentClassifier:
+    """Nearest-neighbour intent classifier over labelled example utterances
+    
+    Example embeddings are computed once into a matrix, so classifying an
+    utterance is one matrix-vector product. Only confident matches, those with
+    a clear margin over the runner-up intent, are resolved here; the rest are
+    left to the LLM.
+    """
+    
+    def __init__(self, examples, embedder, min_score=0.35, min_margin=0.08):
+        """Embed the examples
+        
+        Args:
+            examples: Dict of intent name to example utterances
+            embedder: Object with embed(texts) returning L2-normalized rows
+            min_score: Lowest cosine similarity accepted for the best intent
+            min_margin: Lowest lead the best intent needs over the runner-up
+        """
+        self.embedder = embedder
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.intents = sorted(examples)
+        
+        texts = [text for intent in self.intents for text in examples[intent]]
+        self.labels = np.array([index for index, intent in enumerate(self.intents) for _ in examples[intent]])
+        self.matrix = embedder.embed(texts)
+        
+        self._lock = threading.Lock()
+        self.resolved = 0
+        self.deferred = 0
+    
+    def scores(self, user_input):
+        """Best cosine similarity per intent, in self.intents order"""
+        similarities = self.matrix @ self.embedder.embed([user_input])[0]
+        best = np.full(len(self.intents), -1.0, dtype=np.float32)
+        np.maximum.at(best, self.labels, similarities)
+        return best
+    
+    def classify(self, user_input, record=True):
+        """Classify an utterance if the match is unambiguous
+        
+        Args:
+            user_input: User's input text
+            record: Count the outcome in stats(); off for speculative lookups
+            
+        Returns:
+            dict: Intent and entities, or None to defer to the next tier
+        """
+        # Numbers are usually entities (times, account numbers) the LLM must extract
+        if re.search(r"\d", normalize_utterance(user_input)):
+            return self._defer(record)
+        
+        scores = self.scores(user_input)
+        runner_up, best = np.argsort(scores)[-2:]
+        if scores[best] < self.min_score or scores[best] - scores[runner_up] < self.min_margin:
+            return self._defer(record)
+        
+        if record:
+            with self._lock:
+                self.resolved += 1
+        return {
+            "intent": self.intents[best],
+            "entities": relative_date_entities(user_input),
+            "confidence": round(float(scores[best]), 3)
+        }
+    
+    def stats(self):
+        """How many utterances were resolved here vs deferred"""
+        with self._lock:
+            total = self.resolved + self.deferred
+            return {
+                'embedder': type(self.embedder).__name__,
+                'examples': len(self.labels),
+                'resolved': self.resolved,
+                'deferred': self.deferred,
+                'resolved_rate': round(self.resolved / total, 3) if total else 0.0
+            }
+    
+    def _defer(self, record=True):
+        if record:
+            with self._lock:
+                self.deferred += 1
+        return None
+
+
+# ----- Ollama LLM Service -----
+
+class IncrementalJSONScanner:
+    """Find the first complete JSON object in text that arrives in pieces
+    
+    Tracks brace depth outside string literals, so an object can be parsed the
+    moment its closing brace arrives without waiting for the rest of the text.
+    """
+    
+    def __init__(self):
+        self.buffer = []
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+    
+    def feed(self, text):
+        """Consume the next piece of text
+        
+        Args:
+            text: Newly generated text
+            
+        Returns:
+            dict: The first complete object that parses, or None so far
+        """
+        for char in text:
+            if self.depth == 0:
+                if char == "{":
+                    self.buffer = [char]
+                    self.depth = 1
+                continue
+            
+            self.buffer.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        value = json.loads("".join(self.buffer))
+                    except json.JSONDecodeError:
+                        # Not valid JSON after all; keep scanning for the next object
+                        continue
+                    if isinstance(value, dict):
+                        return value
+        return None
+
+
+INTENT_NAMES = [
+    "schedule_appointment",
+    "cancel_appointment",
+    "billing_inquiry",
+    "account_info",
+    "location_hours",
+    "speak_to_agent",
+    "general_inquiry",
+]
+
+# Sent unchanged on every intent call so Ollama can reuse its evaluated prefix
+INTENT_SYSTEM_PROMPT = """
+You are an assistant for an IVR system. Extract the user's intent and any relevant entities from their input.
+Respond with a JSON object that includes:
+- intent: The primary user intent (e.g., "schedule_appointment", "billing_inquiry", "speak_to_agent", "location_hours")
+- entities: Any relevant entities (e.g., {"date": "2023-04-15", "time": "14:30"})
+- confidence: Your confidence score (0.0 to 1.0)
+
+Common intents in our system:
+""" + "".join(f"- {intent}\n" for intent in INTENT_NAMES)
+
+def intent_json_schema(intents):
+    """JSON schema for intent results, used to constrain Ollama's output
+    
+    Args:
+        intents: Allowed intent names
+        
+    Returns:
+        dict: JSON schema of {"intent", "entities", "confidence"}
+    """
+    return {
+        "type": "object",
+        "properties": {
+            "intent": {"type": "string", "enum": list(intents)},
+            "entities": {"type": "object", "additionalProperties": {"type": "string"}},
+            "confidence": {"type": "number", "minimum": 0, "maximum": 1}
+        },
+        "required": ["intent", "entities", "confidence"]
+    }
+
+INTENT_PROMPT_TEMPLATE = "Extract intent from: '{user_input}'"
+
+class OllamaService:
+    """Service for natural language processing using Ollama LLM"""
+    
+    def __init__(self, model_name="llama3", api_url=None):
+        """Initialize the Ollama service
+        
+        Args:
+            model_name: Name of the Ollama model to use
+            api_url: URL of the Ollama API server
+        """
+        self.model_name = model_name
+        self.api_url = api_url or OLLAMA_API_URL
+        self.is_available = False
+        self.http = HTTPTransport(
+            "Ollama",
+            pool_size=HTTP_POOL_SIZE,
+            connect_timeout=HTTP_CONNECT_TIMEOUT,
+            read_timeout=OLLAMA_TIMEOUT,
+            retries=HTTP_RETRIES,
+            backoff=HTTP_RETRY_BACKOFF
+        )
+        self.intent_cache = IntentCache(
+            INTENT_CACHE_SIZE,
+            INTENT_CACHE_TTL,
+            db_path=INTENT_CACHE_DB or None,
+            namespace=model_name
+        )
+        # Constrain intent output to JSON, or to the intent schema on Ollama 0.5+
+        self.intent_format = {
+            'schema': intent_json_schema(INTENT_NAMES),
+            'json': 'json'
+        }.get(OLLAMA_OUTPUT_FORMAT)
+        self.keyword_matcher = KeywordIntentMatcher(load_intent_keywords(INTENT_KEYWORDS_FILE))
+        self.intent_classifier = None
+        if INTENT_CLASSIFIER:
+            self.intent_classifier = EmbeddingIntentClassifier(
+                INTENT_EXAMPLES,
+                create_intent_embedder(INTENT_EMBEDDING_MODEL),
+                min_score=INTENT_MIN_SCORE,
+                min_margin=INTENT_MIN_MARGIN
+            )
+        
+        # Check if Ollama is available
+        try:
+            response = self.http.get(f"{self.api_url}/health", timeout=1, retry=False)
+            if response.status_code == 200:
+                self.is_available = True
+                logger.info(f"Ollama service is available with model {model_name}")
+            else:
+                logger.warning("Ollama service returned non-200 status code")
+        except requests.exceptions.RequestException:
+            logger.warning("Could not connect to Ollama service")
+        
+    def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024, output_format=None):
+        """Generate a response from the LLM
+        
+        Args:
+            prompt: User's input prompt
+            system_prompt: Optional system prompt to guide the model
+            temperature: Controls randomness (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            output_format: Optional "json" or JSON schema to constrain the output
+            
+        Returns:
+            str: Generated response
+        """
+        if not self.is_available:
+            return "LLM service is not available. Using rule-based responses instead."
+            
+        try:
+            # Prepare request to Ollama API
+            payload = {
+                "model": self.model_name,
+                "prompt": prompt,
+                "stream": False,
+                "keep_alive": OLLAMA_KEEP_ALIVE,
+                "options": {
+                    "temperature": temperature,
+                    "num_predict": max_tokens
+                }
+            }
+            
+            # Add system prompt if provided
+            if system_prompt:
+                payload["system"] = system_prompt
+            if output_format:
+                payload["format"] = output_format
+                
+            # Make API request
+            response = self.http.post(f"{self.api_url}/generate", json=payload)
+            
+            # Parse response
+            if response.status_code == 200:
+                result = response.json()
+                self._log_timings("generate", result)
+                return result.get("response", "")
+            else:
+                logger.error(f"Ollama API error: {response.status_code} - {response.text}")
+                return "I'm sorry, I couldn't process that request."
+                
+        except Exception as e:
+            logger.error(f"Error in LLM generation: {str(e)}")
+            return "I'm sorry, there was an error processing your request."
+    
+    def generate_response_stream(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024, output_format=None):
+        """Generate a response from the LLM token by token
+        
+        Consumes Ollama's NDJSON stream as it arrives. Closing the generator
+        early drops the connection, which makes Ollama stop generating.
+        
+        Args:
+            prompt: User's input prompt
+            system_prompt: Optional system prompt to guide the model
+            temperature: Controls randomness (0.0 to 1.0)
+            max_tokens: Maximum tokens to generate
+            output_format: Optional "json" or JSON schema to constrain the output
+            
+        Yields:
+            dict: Ollama stream messages; "response" holds the next fragment of
+                text and the final message has "done" set with eval timings
+        """
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens
+            }
+        }
+        if system_prompt:
+            payload["system"] = system_prompt
+        if output_format:
+            payload["format"] = output_format
+        
+        response = self.http.post(f"{self.api_url}/generate", json=payload, stream=True)
+        try:
+            if response.status_code != 200:
+                raise requests.exceptions.HTTPError(f"Ollama API error: {response.status_code} - {response.text}")
+            
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+        finally:
+            response.close()
+    
+    def warm_up(self):
+        """Load the model and evaluate the intent prompt prefix ahead of the first caller
+        
+        Sends one intent request for OLLAMA_WARMUP_UTTERANCE with the same
+        system prompt real turns use, so the model stays resident for
+        OLLAMA_KEEP_ALIVE with that prefix already in its cache.
+        """
+        if not self.is_available or not OLLAMA_WARMUP_UTTERANCE:
+            return
+        
+        payload = {
+            "model": self.model_name,
+            "prompt": INTENT_PROMPT_TEMPLATE.format(user_input=OLLAMA_WARMUP_UTTERANCE),
+            "system": INTENT_SYSTEM_PROMPT,
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {"num_predict": 1}
+        }
+        
+        started = time.monotonic()
+        try:
+            response = self.http.post(f"{self.api_url}/generate", json=payload)
+            if response.status_code != 200:
+                logger.warning(f"Ollama warm-up failed: {response.status_code} - {response.text}")
+                return
+            self._log_timings("warm-up", response.json())
+            logger.info(f"Ollama model {self.model_name} warmed up in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            logger.warning(f"Ollama warm-up failed: {str(e)}")
+    
+    @staticmethod
+    def _log_timings(label, result):
+        """Log Ollama's load, prompt evaluation and generation timings for one call
+        
+        Args:
+            label: What the call was for
+            result: Final response message carrying Ollama's *_duration fields (ns)
+        """
+        if "total_duration" not in result:
+            return
+        
+        logger.info(
+            f"Ollama {label} timings: load {result.get('load_duration', 0) / 1e6:.0f} ms, "
+            f"prompt eval {result.get('prompt_eval_count', 0)} tokens in {result.get('prompt_eval_duration', 0) / 1e6:.0f} ms, "
+            f"generation {result.get('eval_count', 0)} tokens in {result.get('eval_duration', 0) / 1e6:.0f} ms, "
+            f"total {result['total_duration'] / 1e6:.0f} ms"
+        )
+    
+    def _stream_intent(self, prompt, system_prompt):
+        """Stream the intent completion and stop at the first complete JSON object
+        
+        Args:
+            prompt: Intent extraction prompt
+            system_prompt: Intent extraction instructions
+            
+        Returns:
+            tuple: (intent dict or None, full generated text)
+        """
+        scanner = IncrementalJSONScanner()
+        fragments = []
+        started = time.monotonic()
+        first_token_at = None
+        intent_data = None
+        eval_rate = None
+        
+        stream = self.generate_response_stream(prompt, system_prompt, temperature=0.3, output_format=self.intent_format)
+        try:
+            for message in stream:
+                fragment = message.get("response", "")
+                if fragment:
+                    if first_token_at is None:
+                        first_token_at = time.monotonic()
+                    fragments.append(fragment)
+                    intent_data = scanner.feed(fragment)
+                    if intent_data is not None:
+                        break
+                if message.get("done"):
+                    self._log_timings("intent", message)
+                    if message.get("eval_duration"):
+                        eval_rate = message.get("eval_count", 0) / (message["eval_duration"] / 1e9)
+        finally:
+            stream.close()
+        
+        elapsed = time.monotonic() - started
+        if eval_rate is None and first_token_at is not None and len(fragments) > 1:
+            eval_rate = (len(fragments) - 1) / max(time.monotonic() - first_token_at, 1e-6)
+        
+        outcome = f"intent after {elapsed * 1000:.0f} ms" if intent_data is not None else f"no intent JSON in {elapsed * 1000:.0f} ms"
+        rate = f"{eval_rate:.1f} tokens/s" if eval_rate else "n/a tokens/s"
+        # Stopping early skips Ollama's final timings; time to first token is
+        # the client-side view of model load plus prompt evaluation
+        first_token = f"first token after {(first_token_at - started) * 1000:.0f} ms, " if first_token_at else ""
+        logger.info(f"Ollama intent stream: {outcome}, {first_token}{len(fragments)} tokens, {rate}"
+                    f"{', stopped early' if intent_data is not None else ''}")
+        
+        return intent_data, "".join(fragments)
+    
+    def extract_intent(self, user_input):
+        """Extract intent and entities from user input
+        
+        Args:
+            user_input: User's input text
+            
+        Returns:
+            dict: Intent and entities
+        """
+        # Callers repeat the same few phrases; only new ones reach the LLM
+        if self.is_available:
+            intent_data = self.intent_cache.get(user_input)
+            if intent_data is not None:
+                return intent_data
+        
+        # Clear-cut utterances resolve against the labelled examples in milliseconds
+        if self.intent_classifier:
+            intent_data = self.intent_classifier.classify(user_input)
+            if intent_data is not None:
+                return intent_data
+        
+        if not self.is_available:
+            # Fallback to rule-based intent extraction
+            return self._rule_based_intent_extraction(user_input)
+        
+        intent_data = self._llm_intent_extraction(user_input)
+        if intent_data is None:
+            return {"intent": "general_inquiry", "entities": {}, "confidence": 0.5}
+        
+        if isinstance(intent_data, dict):
+            self.intent_cache.put(user_input, intent_data)
+        return intent_data
+    
+    def quick_intent(self, user_input):
+        """Intent of user input from the tiers that need no LLM call
+        
+        Matches what extract_intent returns for utterances it resolves without
+        a new LLM call, including ones the LLM answered before and the intent
+        cache remembers. Nothing is counted in the cache or classifier stats,
+        so it is safe to call on transcripts that may never become a turn.
+        
+        Args:
+            user_input: User's input text
+            
+        Returns:
+            dict: Intent and entities, or None if only the LLM can tell
+        """
+        if not self.is_available:
+            return self._rule_based_intent_extraction(user_input)
+        intent_data = self.intent_cache.get(user_input, record=False)
+        if intent_data is not None:
+            return intent_data
+        if self.intent_classifier:
+            return self.intent_classifier.classify(user_input, record=False)
+        return None
+    
+    def _llm_intent_extraction(self, user_input):
+        """Ask the LLM for the intent and entities of user input
+        
+        Args:
+            user_input: User's input text
+            
+        Returns:
+            dict: Intent and entities, or None if no usable JSON came back
+        """
+        system_prompt = INTENT_SYSTEM_PROMPT
+        prompt = INTENT_PROMPT_TEMPLATE.format(user_input=user_input)
+        
+        try:
+            if OLLAMA_STREAMING:
+                intent_data, response = self._stream_intent(prompt, system_prompt)
+                if intent_data is not None:
+                    return intent_data
+            else:
+                response = self.generate_response(prompt, system_prompt, temperature=0.3, output_format=self.intent_format)
+            
+            if self.intent_format:
+                # Constrained output is bare JSON, so anything else is a failure
+                try:
+                    return json.loads(response)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ollama returned invalid JSON despite format constraint: {response[:100]}")
+                    return None
+            
+            # Extract JSON from response (handle cases where LLM adds explanation text)
+            try:
+                # Try to parse entire response
+                intent_data = json.loads(response)
+            except json.JSONDecodeError:
+                # Try to extract JSON if there's surrounding text
+                json_match = re.search(r'({.*})', response, re.DOTALL)
+                if json_match:
+                    try:
+                        intent_data = json.loads(json_match.group(1))
+                    except json.JSONDecodeError:
+                        intent_data = None
+                else:
+                    intent_data = None
+            
+            return intent_data
+            
+        except Exception as e:
+            logger.error(f"Error in intent extraction: {str(e)}")
+            return None
+    
+    def _rule_based_intent_extraction(self, user_input):
+        """Simple rule-based intent extraction when Ollama is not available
+        
+        Args:
+            user_input: User's input text
+            
+        Returns:
+            dict: Intent and entities
+        """
+        # Default intent
+        intent = "general_inquiry"
+        entities = {}
+        confidence = 0.7
+        
+        # Keyword mapping, all intents scored in one pass
+        matched_intent, matched_confidence = self.keyword_matcher.match(user_input)
+        if matched_intent:
+            intent = matched_intent
+            confidence = matched_confidence
+        
+        # Simple entity extraction (very basic example)
+        entities.update(relative_date_entities(user_input))
+        
+        return {
+            "intent": intent,
+            "entities": entities,
+            "confidence": confidence
+        }
+
+
+# ----- Turn Tracing -----
+
+# Upper bounds, in seconds, of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with estimated quantiles
+    
+    Observing is a bisect and an increment, cheap enough for every turn.
+    Quantiles are interpolated within the bucket they fall in.
+    """
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+    
+    def prometheus(self, metric, labels):
+        """Bucket, sum and count lines of the histogram in the Prometheus text format
+        
+        Args:
+            metric: Metric name, e.g. "ivr_stage_seconds"
+            labels: Label string identifying the series, e.g. 'stage="tts"'
+        """
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f'{metric}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{metric}_count{{{labels}}} {self.count}')
+        return lines
+    
+    def quantile(self, q):
+        """Estimate the q-th quantile (0 to 1) in seconds"""
+        if not self.count:
+            return 0.0
+        
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.max
+
+class TurnTrace:
+    """Monotonic stage timings for one caller turn"""
+    
+    def __init__(self, tracer, session_id, kind, sampled):
+        self.tracer = tracer
+        self.session_id = session_id
+        self.kind = kind
+        self.sampled = sampled
+        self.turn_id = uuid.uuid4().hex[:12]
+        self.started = time.monotonic()
+        self.deadline = None  # Monotonic time the turn should be answered by
+        self.degraded = None  # Why the turn is running degraded, if it is
+        self.spans = {}
+        self.marks = {}
+    
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block as stage name"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.spans[name] = (start - self.started, time.monotonic() - start)
+    
+    def mark(self, name):
+        """Record a point in time, e.g. when the first audio went out"""
+        self.marks.setdefault(name, time.monotonic() - self.started)
+    
+    def remaining(self):
+        """Seconds left until the turn's deadline (infinite without one)"""
+        return float('inf') if self.deadline is None else self.deadline - time.monotonic()
+    
+    def finish(self):
+        self.tracer.record(self, time.monotonic() - self.started)
+
+class TurnTracer:
+    """Collect per-stage latency histograms and export sampled turn traces
+    
+    Every turn feeds the histograms behind /metrics. A TRACE_SAMPLE_RATE
+    share of turns is also written out as one JSON event with all its spans.
+    """
+    
+    def __init__(self, sample_rate=1.0, log_path=None):
+        """Initialize the tracer
+        
+        Args:
+            sample_rate: Share of turns (0 to 1) exported as structured events
+            log_path: File the events are appended to; without one they go to
+                the "ivr.trace" logger
+        """
+        self.sample_rate = sample_rate
+        self.histograms = {}
+        self.turns = {}
+        self.exported = 0
+        self._lock = threading.Lock()
+        
+        self.events = logging.getLogger("ivr.trace")
+        if log_path:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.FileHandler(log_path)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.events.addHandler(handler)
+            self.events.propagate = False
+    
+    def start_turn(self, session_id, kind):
+        """Begin tracing a turn
+        
+        Args:
+            session_id: Caller session
+            kind: Turn type, e.g. "voice" or "text"
+            
+        Returns:
+            TurnTrace: Trace to add spans to and finish()
+        """
+        return TurnTrace(self, session_id, kind, random.random() < self.sample_rate)
+    
+    def record(self, trace, total):
+        """Add a finished turn to the histograms and export it if sampled"""
+        with self._lock:
+            self.turns[trace.kind] = self.turns.get(trace.kind, 0) + 1
+            self._histogram("turn").observe(total)
+            for name, (_, duration) in trace.spans.items():
+                self._histogram(name).observe(duration)
+            for name, offset in trace.marks.items():
+                self._histogram(name).observe(offset)
+            if trace.sampled:
+                self.exported += 1
+        
+        if trace.sampled:
+            self.events.info(json.dumps({
+                'event': 'turn_trace',
+                'session_id': trace.session_id,
+                'turn_id': trace.turn_id,
+                'kind': trace.kind,
+                'total_ms': round(total * 1000, 1),
+                'degraded': trace.degraded,
+                'spans': {
+                    name: {'start_ms': round(start * 1000, 1), 'duration_ms': round(duration * 1000, 1)}
+                    for name, (start, duration) in trace.spans.items()
+                },
+                'marks': {name: round(offset * 1000, 1) for name, offset in trace.marks.items()}
+            }))
+    
+    def stats(self):
+        """p50/p95/p99 per stage in milliseconds"""
+        with self._lock:
+            return {
+                name: {
+                    'count': histogram.count,
+                    'p50_ms': round(histogram.quantile(0.50) * 1000, 1),
+                    'p95_ms': round(histogram.quantile(0.95) * 1000, 1),
+                    'p99_ms': round(histogram.quantile(0.99) * 1000, 1)
+                }
+                for name, histogram in self.histograms.items()
+            }
+    
+    def prometheus(self):
+        """Render the histograms in the Prometheus text exposition format"""
+        lines = [
+            "# HELP ivr_turns_total Caller turns completed, by kind",
+            "# TYPE ivr_turns_total counter"
+        ]
+        with self._lock:
+            for kind, count in sorted(self.turns.items()):
+                lines.append(f'ivr_turns_total{{kind="{kind}"}} {count}')
+            
+            lines.append("# HELP ivr_stage_seconds Latency of each turn stage")
+            lines.append("# TYPE ivr_stage_seconds histogram")
+            for name, histogram in sorted(self.histograms.items()):
+                lines.extend(histogram.prometheus("ivr_stage_seconds", f'stage="{name}"'))
+            
+            lines.append("# HELP ivr_stage_seconds_quantile Estimated latency quantiles of each turn stage")
+            lines.append("# TYPE ivr_stage_seconds_quantile gauge")
+            for name, histogram in sorted(self.histograms.items()):
+                for q in (0.5, 0.95, 0.99):
+                    lines.append(f'ivr_stage_seconds_quantile{{stage="{name}",quantile="{q}"}} {histogram.quantile(q):.6f}')
+        
+        return "\n".join(lines) + "\n"
+    
+    def _histogram(self, name):
+        """Get or create the histogram for a stage (lock held)"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+
+# ----- Turn Executor -----
+
+class TurnExecutor:
+    """Run caller turns as coroutines, awaiting each stage on its own executor
+    
+    In "async" mode turns run on a dedicated asyncio event loop thread, so
+    Socket.IO handlers return at once and a slow caller only occupies a slot
+    in the stage it is waiting on. Each stage (asr, llm, tts) has a bounded
+    worker pool, which caps how much of each resource the server commits no
+    matter how many sessions are connected. In "inline" mode the same
+    coroutines run to completion on the calling thread, as before.
+    """
+    
+    def __init__(self, stage_workers, mode="async"):
+        """Start the event loop and stage executors
+        
+        Args:
+            stage_workers: Dict of stage name to worker count
+            mode: "async" or "inline"
+        """
+        self.mode = mode
+        self.loop = None
+        self.executors = {}
+        
+        self._lock = threading.Lock()
+        self.active = 0
+        self.peak_active = 0
+        self.completed = 0
+        self.failed = 0
+        self.peak_threads = 0
+        
+        if mode == "async":
+            self.executors = {
+                stage: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"turn-{stage}")
+                for stage, workers in stage_workers.items()
+            }
+            self.loop = asyncio.new_event_loop()
+            threading.Thread(target=self.loop.run_forever, name="turn-loop", daemon=True).start()
+    
+    async def run_stage(self, stage, function, *args, **kwargs):
+        """Run a blocking stage function without blocking the event loop
+        
+        Args:
+            stage: Name of the stage executor to use
+            function: Blocking callable
+            *args, **kwargs: Passed to function
+            
+        Returns:
+            The function's return value
+        """
+        if self.loop is None:
+            return function(*args, **kwargs)
+        return await self.loop.run_in_executor(self.executors[stage], functools.partial(function, *args, **kwargs))
+    
+    async def run_io(self, function, *args, **kwargs):
+        """Run blocking I/O that belongs to no stage, such as session store reads
+        
+        Uses the loop's default executor, so it takes no stage worker and is
+        not admission controlled.
+        """
+        if self.loop is None:
+            return function(*args, **kwargs)
+        return await self.loop.run_in_executor(None, functools.partial(function, *args, **kwargs))
+    
+    def dispatch(self, coroutine, trace=None, counted=True):
+        """Start a turn
+        
+        Args:
+            coroutine: The turn's coroutine object
+            trace: Optional TurnTrace, finished once the turn completes
+            counted: False for background work such as partial transcripts,
+                which is left out of the turn counters (and so out of the
+                active-turn budget admission control enforces)
+            
+        Returns:
+            concurrent.futures.Future: The turn's result in async mode, or None
+                once an inline turn has finished
+        """
+        if counted:
+            with self._lock:
+                self.active += 1
+                self.peak_active = max(self.peak_active, self.active)
+                self.peak_threads = max(self.peak_threads, threading.active_count())
+        
+        if self.loop is None:
+            asyncio.run(self._run(coroutine, trace, counted))
+            return None
+        return asyncio.run_coroutine_threadsafe(self._run(coroutine, trace, counted), self.loop)
+    
+    def stats(self):
+        """Turn counters and process thread counts"""
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'active': self.active,
+                'peak_active': self.peak_active,
+                'completed': self.completed,
+                'failed': self.failed,
+                'threads': threading.active_count(),
+                'peak_threads': self.peak_threads
+            }
+    
+    async def _run(self, coroutine, trace, counted=True):
+        """Await a turn and keep the counters; failures are logged, not raised"""
+        failed = False
+        try:
+            return await coroutine
+        except Exception as e:
+            failed = True
+            logger.error(f"Turn failed: {str(e)}")
+        finally:
+            if counted:
+                with self._lock:
+                    self.active -= 1
+                    if failed:
+                        self.failed += 1
+                    else:
+                        self.completed += 1
+            if trace is not None:
+                trace.finish()
+
+
+# ----- Admission Control -----
+
+class StageOverloaded(Exception):
+    """A turn stage cannot take the work in time; the caller degrades instead"""
+    
+    def __init__(self, stage, reason):
+        super().__init__(f"{stage} stage overloaded ({reason})")
+        self.stage = stage
+        self.reason = reason
+
+class StageGate:
+    """Bounded queue in front of one stage's workers
+    
+    Tracks work in flight and a moving average of service time, which gives
+    the wait a new request can expect behind the queue. The average decays
+    with a half-life while nothing completes, so one slow outlier cannot keep
+    the stage looking overloaded after it has stopped taking work.
+    """
+    
+    def __init__(self, workers, queue_limit, half_life=10.0):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.half_life = half_life
+        self.in_flight = 0
+        self.service_time = 0.0
+        self.recorded_at = 0.0
+        self.started_at = 0.0
+        self.queue_wait = LatencyHistogram()
+        self.admitted = 0
+        self.probes = 0
+    
+    def service_estimate(self):
+        """Moving average of service time, decayed for the time since the last completion"""
+        if not self.service_time:
+            return 0.0
+        idle = time.monotonic() - self.recorded_at
+        return self.service_time * 0.5 ** (idle / self.half_life)
+    
+    def expected_wait(self):
+        """Seconds a request entering now would wait for a worker"""
+        waiting_ahead = max(0, self.in_flight + 1 - self.workers)
+        return waiting_ahead / self.workers * self.service_estimate()
+    
+    def record(self, wait, service):
+        self.queue_wait.observe(wait)
+        # Exponential moving average, weighted towards recent requests
+        self.service_time = service if not self.service_time else 0.8 * self.service_estimate() + 0.2 * service
+        self.recorded_at = time.monotonic()
+
+class AdmissionController:
+    """Bound each stage's queue and the number of turns in progress
+    
+    Each turn carries a deadline, its start plus TURN_SLO_SECONDS. A stage
+    refuses work when its queue is full, or, for stages listed in
+    deadline_stages, when the expected wait plus service time would overrun
+    the turn's deadline. Once more than max_active turns are in progress, new
+    turns are admitted degraded and skip those stages from the start.
+    
+    A refusal raises StageOverloaded and the turn falls back by policy:
+    rule-based intents for llm, cached audio for tts, and the menu-only
+    prompt (DTMF/buttons) for asr.
+    
+    The deadline check is only as good as the service time estimate, which
+    is measured on admitted work. So a stage that has been refusing work on
+    deadline lets one request through as a probe every probe_interval
+    seconds (half-open), and the estimate decays while the stage is idle.
+    """
+    
+    def __init__(self, executor, stage_limits, max_active, slo, deadline_stages=('asr', 'llm'), enabled=True,
+                 probe_interval=2.0, half_life=10.0):
+        """Initialize the controller
+        
+        Args:
+            executor: TurnExecutor running the stages
+            stage_limits: Dict of stage name to (workers, queue limit)
+            max_active: Turns in progress beyond which new turns are degraded
+            slo: Latency target of a turn in seconds
+            deadline_stages: Stages that are skipped when they would miss the deadline
+            enabled: False to pass every stage through unchecked
+            probe_interval: Seconds between requests let through a stage that
+                would otherwise refuse them on deadline
+            half_life: Seconds over which an idle stage's service time estimate halves
+        """
+        self.executor = executor
+        self.gates = {
+            stage: StageGate(workers, queue_limit, half_life)
+            for stage, (workers, queue_limit) in stage_limits.items()
+        }
+        self.probe_interval = probe_interval
+        self.max_active = max_active
+        self.slo = slo
+        self.deadline_stages = set(deadline_stages)
+        self.enabled = enabled
+        
+        self._lock = threading.Lock()
+        self.admitted = 0
+        self.degraded = 0
+        self.shed = {}
+    
+    def admit(self, trace):
+        """Give a new turn its deadline and decide whether it runs degraded
+        
+        Returns:
+            TurnTrace: The same trace, for chaining
+        """
+        trace.deadline = trace.started + self.slo
+        with self._lock:
+            self.admitted += 1
+            if self.enabled and self.executor.active >= self.max_active:
+                trace.degraded = "budget"
+                self.degraded += 1
+        return trace
+    
+    async def run_stage(self, stage, trace, function, *args, **kwargs):
+        """Run a stage through its gate
+        
+        Args:
+            stage: Stage name
+            trace: The turn's TurnTrace, or None for work outside a turn
+            function: Blocking callable
+            *args, **kwargs: Passed to function
+            
+        Returns:
+            The function's return value
+            
+        Raises:
+            StageOverloaded: The stage refused the work
+        """
+        gate = self.gates.get(stage)
+        if not self.enabled or gate is None:
+            return await self.executor.run_stage(stage, function, *args, **kwargs)
+        
+        with self._lock:
+            reason = None
+            if trace is not None and trace.degraded == "budget":
+                reason = "budget"
+            elif gate.in_flight >= gate.workers + gate.queue_limit:
+                reason = "queue_full"
+            elif trace is not None and stage in self.deadline_stages:
+                if gate.expected_wait() + gate.service_estimate() > trace.remaining():
+                    if time.monotonic() - gate.started_at >= self.probe_interval:
+                        # Half-open: let this one through to re-measure the stage
+                        gate.probes += 1
+                    else:
+                        reason = "deadline"
+            
+            if reason:
+                self.shed[(stage, reason)] = self.shed.get((stage, reason), 0) + 1
+                if trace is not None and not trace.degraded:
+                    trace.degraded = f"{stage}:{reason}"
+                raise StageOverloaded(stage, reason)
+            gate.in_flight += 1
+            gate.admitted += 1
+            gate.started_at = time.monotonic()
+        
+        submitted = time.monotonic()
+        started = [submitted]
+        
+        def timed():
+            started[0] = time.monotonic()
+            return function(*args, **kwargs)
+        
+        try:
+            return await self.executor.run_stage(stage, timed)
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                gate.in_flight -= 1
+                gate.record(started[0] - submitted, finished - started[0])
+    
+    def has_idle_capacity(self, stage, share=0.5):
+        """Whether a stage is using less than share of its workers, for optional work"""
+        gate = self.gates.get(stage)
+        if not self.enabled or gate is None:
+            return True
+        return gate.in_flight < gate.workers * share and self.executor.active < self.max_active
+    
+    def stats(self):
+        """Budget use, shed counts and queue waits per stage"""
+        with self._lock:
+            shed_total = sum(self.shed.values())
+            return {
+                'enabled': self.enabled,
+                'max_active': self.max_active,
+                'slo_seconds': self.slo,
+                'admitted': self.admitted,
+                'degraded': self.degraded,
+                'shed': {f"{stage}:{reason}": count for (stage, reason), count in sorted(self.shed.items())},
+                'shed_rate': round(shed_total / self.admitted, 4) if self.admitted else 0.0,
+                'stages': {
+                    stage: {
+                        'in_flight': gate.in_flight,
+                        'admitted': gate.admitted,
+                        'service_ms': round(gate.service_estimate() * 1000, 1),
+                        'probes': gate.probes,
+                        'queue_wait_p95_ms': round(gate.queue_wait.quantile(0.95) * 1000, 1)
+                    }
+                    for stage, gate in self.gates.items()
+                }
+            }
+    
+    def prometheus(self):
+        """Render shed counters, queue depth and queue-wait histograms for /metrics"""
+        with self._lock:
+            lines = [
+                "# HELP ivr_turns_admitted_total Caller turns admitted",
+                "# TYPE ivr_turns_admitted_total counter",
+                f"ivr_turns_admitted_total {self.admitted}",
+                "# HELP ivr_turns_degraded_total Turns admitted degraded because the concurrency budget was spent",
+                "# TYPE ivr_turns_degraded_total counter",
+                f"ivr_turns_degraded_total {self.degraded}",
+                "# HELP ivr_stage_shed_total Stage requests refused and served by a fallback",
+                "# TYPE ivr_stage_shed_total counter"
+            ]
+            for (stage, reason), count in sorted(self.shed.items()):
+                lines.append(f'ivr_stage_shed_total{{stage="{stage}",reason="{reason}"}} {count}')
+            
+            lines.append("# HELP ivr_stage_in_flight Stage requests running or queued")
+            lines.append("# TYPE ivr_stage_in_flight gauge")
+            for stage, gate in sorted(self.gates.items()):
+                lines.append(f'ivr_stage_in_flight{{stage="{stage}"}} {gate.in_flight}')
+            
+            lines.append("# HELP ivr_stage_queue_wait_seconds Time stage requests waited for a worker")
+            lines.append("# TYPE ivr_stage_queue_wait_seconds histogram")
+            for stage, gate in sorted(self.gates.items()):
+                lines.extend(gate.queue_wait.prometheus("ivr_stage_queue_wait_seconds", f'stage="{stage}"'))
+        
+        return "\n".join(lines) + "\n"
+
+
+# ----- Speculative Synthesis -----
+
+class SpeculativeSynthesizer:
+    """Render the prompts a caller is likely to hear next into the TTS cache
     
-    def _fallback_tts(self, text):
-        """Fallback TTS method when the primary method fails
+    After each response the dialogue knows the few prompts that can follow
+    it. They are rendered on a small pool of their own while the caller
+    listens and answers, but only while the TTS stage has idle workers and
+    never more than max_pending at once. When a turn later synthesizes a
+    prompt that was speculated, the audio comes straight from the cache.
+    A render no turn asks for within ttl seconds is counted as wasted.
+    """
+    
+    def __init__(self, tts, workers, max_pending, idle=None, streaming=True, tracked=1024, ttl=120):
+        """Initialize the synthesizer
         
         Args:
-            text: Text to synthesize
-            
-        Returns:
-            bytes: Audio data in bytes
+            tts: TextToSpeechService whose cache is filled
+            workers: Threads rendering speculative prompts (0 disables speculation)
+            max_pending: Speculative renders allowed in flight at once
+            idle: Callable returning True when TTS has capacity to spare
+            streaming: Render prompts sentence by sentence, as streamed responses are
+            tracked: Speculated prompts remembered while waiting to be used
+            ttl: Seconds a speculated prompt waits to be used before it is
+                counted as wasted
         """
-        try:
-            # Import gtts only when needed (fallback)
-            from gtts import gTTS
-            
-            tts = gTTS(text=text, lang='en')
-            mp3_fp = io.BytesIO()
-            tts.write_to_fp(mp3_fp)
-            mp3_fp.seek(0)
+        self.tts = tts
+        self.max_pending = max_pending
+        self.idle = idle
+        self.streaming = streaming
+        self.tracked = tracked
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-speculate") if workers > 0 else None
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.pending = 0
+        self.predicted = 0
+        self.already_rendered = 0
+        self.skipped_busy = 0
+        self.skipped_cap = 0
+        self.rendered = 0
+        self.failed = 0
+        self.observed = 0
+        self.used = 0
+        self.late = 0
+        self.wasted = 0
+    
+    def speculate(self, texts, audio_format=None):
+        """Queue renders of likely next prompts that are not cached yet"""
+        if self._pool is None:
+            return
+        
+        with self._lock:
+            self._expire()
+        
+        for text in texts:
+            key = (text, audio_format)
+            with self._lock:
+                self.predicted += 1
+                if key in self._futures:
+                    continue
             
-            # Return the MP3 data
-            return mp3_fp.read()
+            if all(self.tts.is_rendered(unit, audio_format) for unit in self._units(text)):
+                with self._lock:
+                    self.already_rendered += 1
+                continue
             
+            with self._lock:
+                if self.pending >= self.max_pending:
+                    self.skipped_cap += 1
+                    continue
+                if self.idle is not None and not self.idle():
+                    self.skipped_busy += 1
+                    continue
+                self.pending += 1
+                self._futures[key] = (self._pool.submit(self._render, text, audio_format), time.monotonic())
+                while len(self._futures) > self.tracked:
+                    self._futures.popitem(last=False)
+                    self.wasted += 1
+    
+    def observe(self, text, audio_format=None):
+        """Note that a turn is about to synthesize text, to score the speculation"""
+        with self._lock:
+            self._expire()
+            self.observed += 1
+            entry = self._futures.pop((text, audio_format), None)
+            if entry is None:
+                return
+            if entry[0].done():
+                self.used += 1
+            else:
+                # Still rendering; synthesis waits on the same cache entry less long
+                self.late += 1
+    
+    def _expire(self):
+        """Count renders that waited past the TTL unused as wasted (lock held)"""
+        cutoff = time.monotonic() - self.ttl
+        while self._futures:
+            key, (_, speculated_at) = next(iter(self._futures.items()))
+            if speculated_at > cutoff:
+                break
+            del self._futures[key]
+            self.wasted += 1
+    
+    def _units(self, text):
+        return self.tts.stream_units(text) if self.streaming else [text]
+    
+    def _render(self, text, audio_format):
+        try:
+            for unit in self._units(text):
+                self.tts.synthesize_speech(unit, audio_format)
+            with self._lock:
+                self.rendered += 1
         except Exception as e:
-            logger.error(f"Fallback TTS error: {str(e)}")
-            # Return empty bytes
-            return b""
+            logger.warning(f"Speculative synthesis failed: {str(e)}")
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self.pending -= 1
+    
+    def stats(self):
+        """Speculation counters; hit_rate is the share of renders a turn went on to use"""
+        with self._lock:
+            self._expire()
+            return {
+                'enabled': self._pool is not None,
+                'pending': self.pending,
+                'predicted': self.predicted,
+                'already_rendered': self.already_rendered,
+                'skipped_busy': self.skipped_busy,
+                'skipped_cap': self.skipped_cap,
+                'rendered': self.rendered,
+                'failed': self.failed,
+                'used': self.used,
+                'late': self.late,
+                'wasted': self.wasted,
+                'hit_rate': round((self.used + self.late) / self.rendered, 3) if self.rendered else 0.0,
+                'turns_served': round(self.used / self.observed, 3) if self.observed else 0.0
+            }
+    
+    def prometheus(self):
+        """Render the speculation counters for /metrics"""
+        stats = self.stats()
+        lines = [
+            "# HELP ivr_tts_speculative_total Speculative prompt renders, by outcome",
+            "# TYPE ivr_tts_speculative_total counter"
+        ]
+        for outcome in ('already_rendered', 'skipped_busy', 'skipped_cap', 'rendered', 'failed', 'used', 'late', 'wasted'):
+            lines.append(f'ivr_tts_speculative_total{{outcome="{outcome}"}} {stats[outcome]}')
+        return "\n".join(lines) + "\n"
 
 
-# ----- Ollama LLM Service -----
+# ----- Pipelined Intent -----
 
-class OllamaService:
-    """Service for natural language processing using Ollama LLM"""
+class IntentPipeline:
+    """Guess a streamed utterance's intent before its final transcript is in
     
-    def __init__(self, model_name="llama3", api_url=None):
-        """Initialize the Ollama service
+    A partial transcript that a later decode reproduces unchanged is one the
+    caller has most likely finished saying. It is classified with the cheap
+    tiers only (embedding classifier or keyword rules, never the LLM) and the
+    result is kept on the stream as a guess. A confident guess also has its
+    response rendered into the TTS cache while the final decode runs. When the
+    final transcript arrives it is classified the same way: if intent and
+    entities agree the guess is confirmed and the turn answers from it,
+    otherwise the guess is cancelled and the turn extracts the intent as usual.
+    """
+    
+    def __init__(self, min_confidence=0.5, idle=None, enabled=True):
+        """Initialize the pipeline
         
         Args:
-            model_name: Name of the Ollama model to use
-            api_url: URL of the Ollama API server
+            min_confidence: Lowest confidence for which a guess's response is rendered early
+            idle: Callable returning True when TTS has capacity to spare
+            enabled: False leaves streamed turns strictly in series
         """
-        self.model_name = model_name
-        self.api_url = api_url or OLLAMA_API_URL
-        self.is_available = False
+        self.min_confidence = min_confidence
+        self.idle = idle
+        self.enabled = enabled
+        self._lock = threading.Lock()
         
-        # Check if Ollama is available
-        try:
-            response = requests.get(f"{self.api_url}/health", timeout=1)
-            if response.status_code == 200:
-                self.is_available = True
-                logger.info(f"Ollama service is available with model {model_name}")
-            else:
-                logger.warning("Ollama service returned non-200 status code")
-        except requests.exceptions.RequestException:
-            logger.warning("Could not connect to Ollama service")
-        
-    def generate_response(self, prompt, system_prompt=None, temperature=0.7, max_tokens=1024):
-        """Generate a response from the LLM
+        self.guessed = 0
+        self.superseded = 0
+        self.rendered = 0
+        self.skipped_confidence = 0
+        self.skipped_busy = 0
+        self.confirmed = 0
+        self.cancelled = 0
+        self.unguessed = 0
+    
+    def guess(self, stream, text, intent_data):
+        """Keep the cheap intent of a stable partial as the stream's guess
         
         Args:
-            prompt: User's input prompt
-            system_prompt: Optional system prompt to guide the model
-            temperature: Controls randomness (0.0 to 1.0)
-            max_tokens: Maximum tokens to generate
+            stream: StreamingTranscription the partial came from
+            text: The stable partial transcript
+            intent_data: Its intent and entities, or None if it needs the LLM
             
         Returns:
-            str: Generated response
+            dict: The new guess, or None if there is nothing new to guess
         """
-        if not self.is_available:
-            return "LLM service is not available. Using rule-based responses instead."
-            
-        try:
-            # Prepare request to Ollama API
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": temperature,
-                    "num_predict": max_tokens
-                }
+        if not self.enabled or intent_data is None:
+            return None
+        
+        with self._lock:
+            previous = stream.intent_guess
+            if previous is not None:
+                if previous["text"] == text:
+                    return None
+                self.superseded += 1
+            self.guessed += 1
+            stream.intent_guess = {
+                "text": text,
+                "intent": intent_data.get("intent", "general_inquiry"),
+                "entities": intent_data.get("entities") or {},
+                "confidence": intent_data.get("confidence", 0.0),
+                "render": None
             }
-            
-            # Add system prompt if provided
-            if system_prompt:
-                payload["system"] = system_prompt
-                
-            # Make API request
-            response = requests.post(
-                f"{self.api_url}/generate",
-                json=payload,
-                timeout=30
-            )
-            
-            # Parse response
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
-            else:
-                logger.error(f"Ollama API error: {response.status_code} - {response.text}")
-                return "I'm sorry, I couldn't process that request."
-                
-        except Exception as e:
-            logger.error(f"Error in LLM generation: {str(e)}")
-            return "I'm sorry, there was an error processing your request."
+            return stream.intent_guess
     
-    def extract_intent(self, user_input):
-        """Extract intent and entities from user input
+    def start_render(self, guess):
+        """Claim an early render of a guess's response, if it is worth one
+        
+        Returns:
+            concurrent.futures.Future: To be resolved once the render is over,
+                or None if the guess is not confident enough or TTS is busy
+        """
+        with self._lock:
+            if guess["confidence"] < self.min_confidence:
+                self.skipped_confidence += 1
+                return None
+            if self.idle is not None and not self.idle():
+                self.skipped_busy += 1
+                return None
+            self.rendered += 1
+            guess["render"] = Future()
+            return guess["render"]
+    
+    def resolve(self, stream, intent_data):
+        """Confirm or cancel the stream's guess against its final transcript
         
         Args:
-            user_input: User's input text
+            stream: The finished StreamingTranscription
+            intent_data: Cheap intent of the final transcript, or None
             
         Returns:
-            dict: Intent and entities
+            dict: The confirmed guess, or None if the turn has to extract the
+                intent itself
         """
-        if not self.is_available:
-            # Fallback to rule-based intent extraction
-            return self._rule_based_intent_extraction(user_input)
-            
-        system_prompt = """
-        You are an assistant for an IVR system. Extract the user's intent and any relevant entities from their input.
-        Respond with a JSON object that includes:
-        - intent: The primary user intent (e.g., "schedule_appointment", "billing_inquiry", "speak_to_agent", "get_hours")
-        - entities: Any relevant entities (e.g., {"date": "2023-04-15", "time": "14:30"})
-        - confidence: Your confidence score (0.0 to 1.0)
+        if not self.enabled:
+            return None
+        
+        with self._lock:
+            guess, stream.intent_guess = stream.intent_guess, None
+            if guess is None:
+                self.unguessed += 1
+                return None
+            if intent_data is None or (
+                intent_data.get("intent", "general_inquiry"), intent_data.get("entities") or {}
+            ) != (guess["intent"], guess["entities"]):
+                self.cancelled += 1
+                return None
+            self.confirmed += 1
+            return guess
+    
+    def stats(self):
+        """Pipeline counters; confirm_rate is the share of streamed turns answered from a guess"""
+        with self._lock:
+            turns = self.confirmed + self.cancelled + self.unguessed
+            return {
+                'enabled': self.enabled,
+                'guessed': self.guessed,
+                'superseded': self.superseded,
+                'rendered': self.rendered,
+                'skipped_confidence': self.skipped_confidence,
+                'skipped_busy': self.skipped_busy,
+                'confirmed': self.confirmed,
+                'cancelled': self.cancelled,
+                'unguessed': self.unguessed,
+                'confirm_rate': round(self.confirmed / turns, 3) if turns else 0.0
+            }
+    
+    def prometheus(self):
+        """Render the pipeline counters for /metrics"""
+        stats = self.stats()
+        lines = [
+            "# HELP ivr_pipeline_guesses_total Streamed turns by what became of the intent guessed from partials",
+            "# TYPE ivr_pipeline_guesses_total counter"
+        ]
+        for outcome in ('confirmed', 'cancelled', 'unguessed'):
+            lines.append(f'ivr_pipeline_guesses_total{{outcome="{outcome}"}} {stats[outcome]}')
+        lines.append("# HELP ivr_pipeline_renders_total Early response renders for guessed intents, by outcome")
+        lines.append("# TYPE ivr_pipeline_renders_total counter")
+        for outcome in ('rendered', 'skipped_confidence', 'skipped_busy'):
+            lines.append(f'ivr_pipeline_renders_total{{outcome="{outcome}"}} {stats[outcome]}')
+        return "\n".join(lines) + "\n"
+
+
+# ----- Session State -----
+
+class DialogueState:
+    """Server-side state of one call, kept between turns
+    
+    Slotted so 100k concurrent calls cost a few hundred bytes each rather
+    than a per-instance dict.
+    """
+    
+    __slots__ = ('session_id', 'stage', 'slots', 'turns', 'last_seen')
+    
+    def __init__(self, session_id, stage=None, slots=None, turns=0, last_seen=0.0):
+        self.session_id = session_id
+        self.stage = stage  # What the last prompt asked for, e.g. "appointment_date"
+        self.slots = slots  # Values collected so far; None until the first one
+        self.turns = turns
+        self.last_seen = last_seen
+    
+    def copy(self):
+        return DialogueState(self.session_id, self.stage, dict(self.slots) if self.slots else None, self.turns, self.last_seen)
+    
+    def to_json(self):
+        return json.dumps([self.stage, self.slots, self.turns, self.last_seen])
+    
+    @classmethod
+    def from_json(cls, session_id, data):
+        stage, slots, turns, last_seen = json.loads(data)
+        return cls(session_id, stage, slots, turns, last_seen)
+
+class MemorySessionBackend:
+    """Session records in a dict ordered by last activity
+    
+    Saving a record moves it to the end, so the records idle the longest are
+    always at the front and expiry stops at the first one still live.
+    """
+    
+    shared = False
+    
+    def __init__(self):
+        self._records = OrderedDict()
+    
+    def get(self, session_id):
+        return self._records.get(session_id)
+    
+    def put(self, state):
+        self._records[state.session_id] = state
+        self._records.move_to_end(state.session_id)
+    
+    def delete(self, session_id):
+        return self._records.pop(session_id, None) is not None
+    
+    def expire(self, cutoff):
+        """Drop records last seen before cutoff and return how many went"""
+        expired = 0
+        while self._records:
+            state = next(iter(self._records.values()))
+            if state.last_seen >= cutoff:
+                break
+            self._records.popitem(last=False)
+            expired += 1
+        return expired
+    
+    def __len__(self):
+        return len(self._records)
+
+class SQLiteSessionBackend:
+    """Session records in a SQLite file that several server processes can share
+    
+    A stand-in for a network key-value store: every lookup reads the file, so
+    a turn handled by any process sees the state the previous turn left.
+    """
+    
+    shared = True
+    
+    def __init__(self, db_path):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, state TEXT, last_seen REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+        self._db.commit()
+    
+    def get(self, session_id):
+        row = self._db.execute("SELECT state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return DialogueState.from_json(session_id, row[0]) if row else None
+    
+    def put(self, state):
+        self._db.execute(
+            "INSERT OR REPLACE INTO sessions (session_id, state, last_seen) VALUES (?, ?, ?)",
+            (state.session_id, state.to_json(), state.last_seen)
+        )
+        self._db.commit()
+    
+    def delete(self, session_id):
+        deleted = self._db.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+        self._db.commit()
+        return deleted > 0
+    
+    def expire(self, cutoff):
+        expired = self._db.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,)).rowcount
+        self._db.commit()
+        return expired
+    
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+def create_session_backend(kind, path, shard):
+    """Build one shard's backend: 'memory', or 'sqlite' with one file per shard"""
+    if kind == 'sqlite':
+        return SQLiteSessionBackend(f"{path}.{shard}.db")
+    return MemorySessionBackend()
+
+class SessionStore:
+    """Dialogue state for every live call, keyed by session_id
+    
+    Sessions are spread over shards by a hash of their id. Each shard has its
+    own backend and lock, so turns for different calls rarely contend, and
+    with the SQLite backend the shards are separate files that separate
+    processes can write at the same time. Calls idle for longer than the TTL
+    are treated as abandoned and swept by a background thread.
+    
+    update() runs a turn's read, change and save under a per-call lock, so
+    overlapping turns of one call cannot overwrite each other's changes.
+    """
+    
+    def __init__(self, backend='memory', path=None, shards=8, ttl=1800, sweep_interval=60, session_locks=64):
+        """Initialize the store
         
-        Common intents in our system:
-        - schedule_appointment
-        - cancel_appointment
-        - billing_inquiry
-        - account_info
-        - location_hours
-        - speak_to_agent
-        - general_inquiry
+        Args:
+            backend: 'memory' for this process only, or 'sqlite' to share
+                state between server processes
+            path: File prefix for the SQLite shards
+            shards: Number of independent shards
+            ttl: Seconds without a turn before a call is dropped
+            sweep_interval: Seconds between expiry sweeps, or 0 to sweep only
+                when expire() is called
+            session_locks: Number of striped locks serializing updates per call
         """
+        self.backend = backend
+        self.ttl = ttl
+        try:
+            self._shards = [create_session_backend(backend, path, shard) for shard in range(max(1, shards))]
+        except sqlite3.Error as e:
+            logger.warning(f"Shared session store unavailable, keeping sessions in memory: {str(e)}")
+            self.backend = 'memory'
+            self._shards = [MemorySessionBackend() for _ in range(max(1, shards))]
+        self._locks = [threading.Lock() for _ in self._shards]
+        self._session_locks = [threading.Lock() for _ in range(max(1, session_locks))]
         
-        prompt = f"Extract intent from: '{user_input}'"
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
         
-        try:
-            response = self.generate_response(prompt, system_prompt, temperature=0.3)
-            
-            # Extract JSON from response (handle cases where LLM adds explanation text)
-            try:
-                # Try to parse entire response
-                intent_data = json.loads(response)
-            except json.JSONDecodeError:
-                # Try to extract JSON if there's surrounding text
-                import re
-                json_match = re.search(r'({.*})', response, re.DOTALL)
-                if json_match:
-                    try:
-                        intent_data = json.loads(json_match.group(1))
-                    except json.JSONDecodeError:
-                        # Fallback to default intent
-                        intent_data = {"intent": "general_inquiry", "entities": {}, "confidence": 0.5}
-                else:
-                    # Fallback to default intent
-                    intent_data = {"intent": "general_inquiry", "entities": {}, "confidence": 0.5}
-            
-            return intent_data
-            
-        except Exception as e:
-            logger.error(f"Error in intent extraction: {str(e)}")
-            return {"intent": "general_inquiry", "entities": {}, "confidence": 0.5}
+        if sweep_interval > 0:
+            threading.Thread(target=self._sweep_loop, args=(sweep_interval,), name="session-sweeper", daemon=True).start()
     
-    def _rule_based_intent_extraction(self, user_input):
-        """Simple rule-based intent extraction when Ollama is not available
+    def _shard(self, session_id):
+        return zlib.crc32(session_id.encode()) % len(self._shards)
+    
+    def get(self, session_id):
+        """Return a call's state, or None if it is unknown or has expired"""
+        index = self._shard(session_id)
+        with self._locks[index]:
+            state = self._shards[index].get(session_id)
+            if state is not None and time.time() - state.last_seen > self.ttl:
+                self._shards[index].delete(session_id)
+                self.expired += 1
+                state = None
+            if state is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return state
+    
+    def start(self, session_id):
+        """Begin a call with fresh state, replacing whatever was stored for its id"""
+        state = DialogueState(session_id)
+        self.save(state, turn=False)
+        self.started += 1
+        return state
+    
+    def save(self, state, turn=True):
+        """Store a call's state after a turn, which also resets its TTL"""
+        if turn:
+            state.turns += 1
+        state.last_seen = time.time()
+        index = self._shard(state.session_id)
+        with self._locks[index]:
+            self._shards[index].put(state)
+    
+    def update(self, session_id, function):
+        """Read, change and store a call's state as one step
         
         Args:
-            user_input: User's input text
+            session_id: The call
+            function: Called with the call's state (fresh if it is unknown or
+                has expired), which it may change
             
         Returns:
-            dict: Intent and entities
+            What function returned
         """
-        user_input = user_input.lower()
-        
-        # Default intent
-        intent = "general_inquiry"
-        entities = {}
-        confidence = 0.7
-        
-        # Simple keyword mapping
-        if any(word in user_input for word in ["schedule", "appointment", "book", "reserve"]):
-            intent = "schedule_appointment"
-            confidence = 0.8
-        elif any(word in user_input for word in ["cancel", "reschedule"]):
-            intent = "cancel_appointment"
-            confidence = 0.8
-        elif any(word in user_input for word in ["bill", "billing", "payment", "pay", "account"]):
-            intent = "billing_inquiry"
-            confidence = 0.8
-        elif any(word in user_input for word in ["location", "address", "hour", "open", "close"]):
-            intent = "location_hours"
-            confidence = 0.9
-        elif any(word in user_input for word in ["agent", "human", "person", "representative", "speak", "talk"]):
-            intent = "speak_to_agent"
-            confidence = 0.9
+        with self._session_locks[zlib.crc32(session_id.encode()) % len(self._session_locks)]:
+            state = self.get(session_id) or DialogueState(session_id)
+            result = function(state)
+            self.save(state)
+            return result
+    
+    def end(self, session_id):
+        """Forget a call"""
+        index = self._shard(session_id)
+        with self._locks[index]:
+            return self._shards[index].delete(session_id)
+    
+    def expire(self):
+        """Drop every call idle for longer than the TTL and return how many went"""
+        cutoff = time.time() - self.ttl
+        expired = 0
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                expired += shard.expire(cutoff)
+        self.expired += expired
+        return expired
+    
+    def _sweep_loop(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                expired = self.expire()
+                if expired:
+                    logger.info(f"Expired {expired} abandoned sessions")
+            except Exception as e:
+                logger.error(f"Session sweep failed: {str(e)}")
+    
+    def __len__(self):
+        total = 0
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                total += len(shard)
+        return total
+    
+    def stats(self):
+        """Session counters for /health"""
+        return {
+            'backend': self.backend,
+            'shards': len(self._shards),
+            'sessions': len(self),
+            'started': self.started,
+            'hits': self.hits,
+            'misses': self.misses,
+            'expired': self.expired
+        }
+
+
+# ----- Message Queue -----
+
+class TCPQueueManager(PubSubManager):
+    """Socket.IO client manager that fans emits out through a TCP broker
+    
+    Lets several server processes act as one: an emit for a client connected
+    to another process goes to the broker, which relays it to every process.
+    The broker is a stand-in for Redis when running locally (see
+    benchmarks/_stubs.py); frames are a 4-byte length and a JSON message.
+    
+    Behind a sticky load balancer a turn's replies go to its own caller, who
+    is connected to the same process. Those are delivered directly and never
+    touch the queue, so audio is not copied to every worker.
+    """
+    
+    name = 'tcp'
+    
+    def __init__(self, url, channel='flask-socketio', write_only=False, logger=None):
+        """Initialize the manager
         
-        # Simple entity extraction (very basic example)
-        if "tomorrow" in user_input:
-            from datetime import date, timedelta
-            tomorrow = date.today() + timedelta(days=1)
-            entities["date"] = tomorrow.isoformat()
+        Args:
+            url: Broker address as tcp://host:port
+            channel: Channel name; processes only see messages on their own
+            write_only: Only publish, e.g. to emit from outside the server
+            logger: Logger for the underlying Socket.IO manager
+        """
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        parsed = urlparse(url)
+        self.address = (parsed.hostname or '127.0.0.1', parsed.port or 6380)
+        self._sock = None
+        self._connect_lock = threading.Lock()
+        self._send_lock = threading.Lock()
         
+        self.delivered_locally = 0
+        self.published = 0
+        self.received = 0
+        self.reconnects = 0
+    
+    def emit(self, event, data, namespace=None, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        room = to or room
+        if callback is None and room is not None and self.is_connected(room, namespace or '/'):
+            self.delivered_locally += 1
+            kwargs['ignore_queue'] = True
+        return super().emit(event, data, namespace=namespace, room=room, skip_sid=skip_sid, callback=callback, **kwargs)
+    
+    def _connection(self):
+        """The broker connection, opened on first use and after a failure"""
+        with self._connect_lock:
+            if self._sock is None:
+                sock = socket.create_connection(self.address, timeout=HTTP_CONNECT_TIMEOUT)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.settimeout(None)
+                self._sock = sock
+            return self._sock
+    
+    def _drop(self, sock):
+        with self._connect_lock:
+            if self._sock is sock:
+                self._sock = None
+                self.reconnects += 1
+        try:
+            sock.close()
+        except OSError:
+            pass
+    
+    def _publish(self, data):
+        frame = json.dumps({'channel': self.channel, 'message': data}).encode('utf-8')
+        # One retry on a fresh connection if the broker went away
+        for attempt in range(2):
+            sock = None
+            try:
+                sock = self._connection()
+                with self._send_lock:
+                    sock.sendall(struct.pack('>I', len(frame)) + frame)
+                self.published += 1
+                return
+            except OSError as e:
+                if sock is not None:
+                    self._drop(sock)
+                if attempt:
+                    logger.error(f"Message queue publish failed: {str(e)}")
+    
+    def _listen(self):
+        backoff = 0.1
+        while True:
+            try:
+                sock = self._connection()
+            except OSError as e:
+                logger.warning(f"Message queue broker unreachable: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 5.0)
+                continue
+            backoff = 0.1
+            reader = sock.makefile('rb')
+            try:
+                while True:
+                    header = reader.read(4)
+                    if len(header) < 4:
+                        raise ConnectionError("broker closed the connection")
+                    frame = json.loads(reader.read(struct.unpack('>I', header)[0]))
+                    if frame.get('channel') == self.channel:
+                        self.received += 1
+                        yield frame['message']
+            except (OSError, ValueError) as e:
+                logger.warning(f"Message queue connection lost: {str(e)}")
+                self._drop(sock)
+    
+    def stats(self):
+        """Emit counters for /health"""
         return {
-            "intent": intent,
-            "entities": entities,
-            "confidence": confidence
+            'broker': f"{self.address[0]}:{self.address[1]}",
+            'delivered_locally': self.delivered_locally,
+            'published': self.published,
+            'received': self.received,
+            'reconnects': self.reconnects
         }
 
+def message_queue_options(url, channel):
+    """SocketIO keyword arguments for a message queue URL
+    
+    tcp:// uses TCPQueueManager; anything else (redis://, amqp://, ...) is
+    left to Flask-SocketIO. An empty URL means a single process.
+    """
+    if not url:
+        return {}
+    if url.startswith('tcp://'):
+        return {'client_manager': TCPQueueManager(url, channel=channel)}
+    return {'message_queue': url, 'channel': channel}
+
+
+# ----- IVR Prompts -----
+
+WELCOME_MESSAGE = "Welcome to Super Company. How can I help you today?"
+
+MAIN_MENU_OPTIONS = [
+    {"id": "customer_service", "text": "Customer Service"},
+    {"id": "appointments", "text": "Schedule an Appointment"},
+    {"id": "billing", "text": "Billing and Account Information"},
+    {"id": "location", "text": "Location and Hours"},
+    {"id": "agent", "text": "Speak to a Live Agent"}
+]
+
+# Response for each intent; general_inquiry doubles as the default
+INTENT_RESPONSES = {
+    "schedule_appointment": {
+        "text": "I'd be happy to help you schedule an appointment. What day would you prefer?",
+        "menu_options": [
+            {"id": "today", "text": "Today"},
+            {"id": "tomorrow", "text": "Tomorrow"},
+            {"id": "next_week", "text": "Next Week"},
+            {"id": "specify_date", "text": "Specify a Different Date"}
+        ]
+    },
+    "billing_inquiry": {
+        "text": "For billing inquiries, I'll need your account information. What's your account number or the phone number associated with your account?"
+    },
+    "location_hours": {
+        "text": "Our main location is at 123 Business Ave. We're open Monday to Friday from 9 AM to 5 PM, and Saturday from 10 AM to 2 PM. Is there anything else you'd like to know?"
+    },
+    "speak_to_agent": {
+        "text": "I'll connect you with the next available agent. Please hold while I transfer your call.",
+        "redirect": "/agent_queue"
+    },
+    "general_inquiry": {
+        "text": "How can I assist you today? You can ask about appointments, billing, location and hours, or speak to a live agent.",
+        "menu_options": MAIN_MENU_OPTIONS
+    }
+}
+
+# Follow-up prompts of the appointment booking flow
+APPOINTMENT_DATE_OPTIONS = INTENT_RESPONSES["schedule_appointment"]["menu_options"]
+APPOINTMENT_SPECIFY_DATE = "Which day would you like? You can say a day of the week, like Tuesday."
+APPOINTMENT_RETRY = "Sorry, I didn't catch a day. What day would you prefer?"
+APPOINTMENT_CONFIRMED = "Your appointment is booked for {day}. Is there anything else I can help you with?"
+
+# Played instead of listening when the server is too busy for speech recognition
+BUSY_MENU_MESSAGE = "We're very busy right now. Please choose an option from the menu, or press its number on your keypad."
+
+def static_prompts():
+    """Every prompt whose text is known ahead of time"""
+    return ([WELCOME_MESSAGE] + [response["text"] for response in INTENT_RESPONSES.values()]
+            + [APPOINTMENT_SPECIFY_DATE, APPOINTMENT_RETRY, BUSY_MENU_MESSAGE])
+
 
 # ----- Service Singletons -----
 
 # Initialize services
-speech_recognition_service = SpeechRecognitionService(model_size=WHISPER_MODEL_SIZE)
+socketio = SocketIO(app, cors_allowed_origins="*", **message_queue_options(SOCKETIO_MESSAGE_QUEUE, SOCKETIO_CHANNEL))
+speech_recognition_service = SpeechRecognitionService(model_size=WHISPER_MODEL_SIZE, replicas=WHISPER_REPLICAS)
 tts_service = TextToSpeechService(voice="alloy")
 ollama_service = OllamaService(model_name=OLLAMA_MODEL, api_url=OLLAMA_API_URL)
+session_store = SessionStore(
+    backend=SESSION_BACKEND,
+    path=SESSION_DB,
+    shards=SESSION_SHARDS,
+    ttl=SESSION_TTL,
+    sweep_interval=SESSION_SWEEP_INTERVAL
+)
+turn_tracer = TurnTracer(sample_rate=TRACE_SAMPLE_RATE, log_path=TRACE_LOG_PATH or None)
+turn_executor = TurnExecutor(
+    {'asr': TURN_ASR_WORKERS, 'llm': TURN_LLM_WORKERS, 'tts': TURN_TTS_WORKERS},
+    mode=TURN_EXECUTION
+)
+admission = AdmissionController(
+    turn_executor,
+    {
+        'asr': (TURN_ASR_WORKERS, TURN_ASR_QUEUE),
+        'llm': (TURN_LLM_WORKERS, TURN_LLM_QUEUE),
+        'tts': (TURN_TTS_WORKERS, TURN_TTS_QUEUE)
+    },
+    max_active=TURN_MAX_ACTIVE,
+    slo=TURN_SLO_SECONDS,
+    enabled=ADMISSION_CONTROL,
+    probe_interval=ADMISSION_PROBE_INTERVAL,
+    half_life=ADMISSION_HALF_LIFE
+)
+speculator = SpeculativeSynthesizer(
+    tts_service,
+    workers=TTS_SPECULATIVE_WORKERS if TTS_SPECULATION else 0,
+    max_pending=TTS_SPECULATIVE_MAX_PENDING,
+    idle=functools.partial(admission.has_idle_capacity, 'tts'),
+    streaming=TTS_STREAMING,
+    ttl=TTS_SPECULATIVE_TTL
+)
+intent_pipeline = IntentPipeline(
+    min_confidence=PIPELINE_TTS_CONFIDENCE,
+    idle=functools.partial(admission.has_idle_capacity, 'tts'),
+    enabled=PIPELINED_INTENT
+)
+
+# Pre-render static prompts and warm up the LLM without holding up startup
+threading.Thread(target=tts_service.prepare_prompt_bundle, args=(static_prompts(),), daemon=True).start()
+threading.Thread(target=ollama_service.warm_up, daemon=True).start()
+
+
+# Active streaming transcriptions, keyed by Socket.IO client id
+voice_streams = {}
+
+# What each connected client said it supports at start_session, keyed by client id
+client_capabilities = {}
 
 
 # ----- Route Handlers -----
@@ -437,9 +4382,43 @@ def health_check():
     return jsonify({
         'status': 'ok',
         'service': 'multimodal-ivr',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'asr_state': speech_recognition_service.state,
+        'asr': speech_recognition_service.stats(),
+        'tts_cache': tts_service.cache.stats(),
+        'intent_cache': ollama_service.intent_cache.stats(),
+        'intent_classifier': ollama_service.intent_classifier.stats() if ollama_service.intent_classifier else None,
+        'turns': turn_executor.stats(),
+        'admission': admission.stats(),
+        'speculation': speculator.stats(),
+        'pipeline': intent_pipeline.stats(),
+        'worker': {
+            'pid': os.getpid(),
+            'message_queue': socketio.server.manager.stats() if isinstance(socketio.server.manager, TCPQueueManager) else None
+        },
+        'sessions': session_store.stats(),
+        'latency': turn_tracer.stats(),
+        'http': {
+            'octave_tts': tts_service.http.stats(),
+            'ollama': ollama_service.http.stats()
+        }
     })
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: per-stage turn latency histograms and turn counters"""
+    turns = turn_executor.stats()
+    gauges = [
+        "# HELP ivr_turns_active Caller turns currently in progress",
+        "# TYPE ivr_turns_active gauge",
+        f"ivr_turns_active {turns['active']}",
+        "# HELP ivr_turns_failed_total Caller turns that raised an error",
+        "# TYPE ivr_turns_failed_total counter",
+        f"ivr_turns_failed_total {turns['failed']}",
+    ]
+    body = turn_tracer.prometheus() + admission.prometheus() + speculator.prometheus() + intent_pipeline.prometheus() + "\n".join(gauges) + "\n"
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/speech/recognize', methods=['POST'])
 def recognize_speech():
     """Endpoint for speech recognition"""
@@ -467,6 +4446,11 @@ def recognize_speech():
             'transcription': transcription
         })
     
+    except SpeechRecognitionUnavailable as e:
+        return jsonify({
+            'error': 'Speech recognition not ready',
+            'details': str(e)
+        }), 503
     except Exception as e:
         logger.error(f"Error in speech recognition: {str(e)}")
         return jsonify({
@@ -518,38 +4502,25 @@ def handle_connect():
 def handle_disconnect():
     """Handle client disconnection"""
     logger.info(f"Client disconnected: {request.sid}")
+    voice_streams.pop(request.sid, None)
+    client_capabilities.pop(request.sid, None)
 
 @socketio.on('start_session')
 def handle_start_session(data):
     """Initialize a new session"""
     session_id = data.get('session_id') or str(uuid.uuid4())
     logger.info(f"Starting new session: {session_id}")
+    session_store.start(session_id)
     
-    # Send initial IVR greeting
-    welcome_message = "Welcome to Super Company. How can I help you today?"
-    
-    # Generate audio for welcome message
-    audio_data = tts_service.synthesize_speech(welcome_message)
-    
-    # Convert audio data to base64 for sending over WebSocket
-    audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-    
-    # Prepare menu options
-    menu_options = [
-        {"id": "customer_service", "text": "Customer Service"},
-        {"id": "appointments", "text": "Schedule an Appointment"},
-        {"id": "billing", "text": "Billing and Account Information"},
-        {"id": "location", "text": "Location and Hours"},
-        {"id": "agent", "text": "Speak to a Live Agent"}
-    ]
+    # Remember how the client wants its audio: binary frames, and which codec
+    client_capabilities[request.sid] = {
+        'binary_audio': bool(data.get('binary_audio')),
+        'audio_format': tts_service.negotiate_format(data.get('codecs'))
+    }
     
-    # Send response to client
-    emit('ivr_response', {
-        'session_id': session_id,
-        'text': welcome_message,
-        'audio': audio_base64,
-        'menu_options': menu_options
-    })
+    # Send initial IVR greeting
+    trace = admission.admit(turn_tracer.start_turn(session_id, "welcome"))
+    turn_executor.dispatch(welcome_turn(session_id, request.sid, trace), trace)
 
 @socketio.on('voice_input')
 def handle_voice_input(data):
@@ -565,19 +4536,55 @@ def handle_voice_input(data):
         return
     
     try:
-        # Decode base64 audio
-        audio_bytes = base64.b64decode(audio_data.split(',')[1] if ',' in audio_data else audio_data)
-        
-        # Transcribe audio
-        transcription = speech_recognition_service.transcribe_audio(audio_bytes)
-        
-        # Process the transcription
-        process_user_input(transcription, session_id)
-        
+        # Binary frames arrive as bytes and are used as-is
+        audio_bytes = audio_input_bytes(audio_data)
+    except ValueError:
+        emit('error', {'message': 'Invalid audio data'})
+        return
+    
+    trace = admission.admit(turn_tracer.start_turn(session_id, "voice"))
+    turn_executor.dispatch(voice_turn(audio_bytes, session_id, request.sid, trace), trace)
+
+@socketio.on('voice_stream_start')
+def handle_voice_stream_start(data):
+    """Start a streaming voice input for the client"""
+    session_id = data.get('session_id')
+    sample_rate = int(data.get('sample_rate') or 16000)
+    
+    logger.info(f"Starting voice stream for session {session_id} at {sample_rate} Hz")
+    voice_streams[request.sid] = StreamingTranscription(speech_recognition_service, sample_rate=sample_rate)
+
+@socketio.on('voice_chunk')
+def handle_voice_chunk(data):
+    """Append a chunk of streamed audio and emit a partial transcript when due"""
+    session_id = data.get('session_id')
+    stream = voice_streams.get(request.sid)
+    
+    if stream is None:
+        emit('error', {'message': 'No active voice stream'})
+        return
+    
+    try:
+        chunk = audio_input_bytes(data.get('audio') or b'')
+        if stream.feed(chunk):
+            turn_executor.dispatch(partial_transcript_turn(stream, session_id, request.sid), counted=False)
     except Exception as e:
-        logger.error(f"Error processing voice input: {str(e)}")
+        logger.error(f"Error processing voice chunk: {str(e)}")
         emit('error', {'message': 'Error processing voice input'})
 
+@socketio.on('voice_stream_end')
+def handle_voice_stream_end(data):
+    """Finish a streaming voice input and process the final transcript"""
+    session_id = data.get('session_id')
+    stream = voice_streams.pop(request.sid, None)
+    
+    if stream is None:
+        emit('error', {'message': 'No active voice stream'})
+        return
+    
+    trace = admission.admit(turn_tracer.start_turn(session_id, "voice_stream"))
+    turn_executor.dispatch(voice_stream_turn(stream, session_id, request.sid, trace), trace)
+
 @socketio.on('text_input')
 def handle_text_input(data):
     """Process text input from the client"""
@@ -587,7 +4594,8 @@ def handle_text_input(data):
     logger.info(f"Received text input for session {session_id}: {text}")
     
     # Process the text input
-    process_user_input(text, session_id)
+    trace = admission.admit(turn_tracer.start_turn(session_id, "text"))
+    turn_executor.dispatch(text_turn(text, session_id, request.sid, trace), trace)
 
 @socketio.on('menu_selection')
 def handle_menu_selection(data):
@@ -597,7 +4605,42 @@ def handle_menu_selection(data):
     
     logger.info(f"Received menu selection for session {session_id}: {selection_id}")
     
-    # Map selection ID to intent
+    intent, entities = menu_selection_intent(selection_id)
+    trace = admission.admit(turn_tracer.start_turn(session_id, "menu"))
+    turn_executor.dispatch(intent_turn(intent, entities, session_id, request.sid, trace), trace)
+
+@socketio.on('dtmf_input')
+def handle_dtmf_input(data):
+    """Process a keypad press as a pick from the menu the caller was last offered"""
+    session_id = data.get('session_id')
+    key = str(data.get('key', ''))
+    
+    logger.info(f"Received DTMF key for session {session_id}: {key}")
+    
+    state = session_store.get(session_id) if session_id else None
+    menu = APPOINTMENT_DATE_OPTIONS if state is not None and state.stage == "appointment_date" else MAIN_MENU_OPTIONS
+    
+    # 1..N pick an option, 0 asks for an agent, anything else repeats the main menu
+    if key.isdigit() and 1 <= int(key) <= len(menu):
+        intent, entities = menu_selection_intent(menu[int(key) - 1]["id"])
+    elif key == "0":
+        intent, entities = "speak_to_agent", {}
+    else:
+        intent, entities = "general_inquiry", {}
+    
+    trace = admission.admit(turn_tracer.start_turn(session_id, "dtmf"))
+    turn_executor.dispatch(intent_turn(intent, entities, session_id, request.sid, trace), trace)
+
+def menu_selection_intent(selection_id):
+    """Map a menu option id to the intent and entities it stands for
+    
+    Returns:
+        tuple: (intent, entities)
+    """
+    # Answers to "What day would you prefer?"
+    if selection_id in {option["id"] for option in APPOINTMENT_DATE_OPTIONS}:
+        return "provide_date", relative_date_entities(selection_id.replace("_", " ")) or {"date_option": selection_id}
+    
     intent_map = {
         "customer_service": "general_inquiry",
         "appointments": "schedule_appointment",
@@ -605,75 +4648,434 @@ def handle_menu_selection(data):
         "location": "location_hours",
         "agent": "speak_to_agent"
     }
-    
-    # Process the selection based on the mapping
-    intent = intent_map.get(selection_id, "general_inquiry")
-    process_intent(intent, {}, session_id)
+    return intent_map.get(selection_id, "general_inquiry"), {}
 
 
 # ----- Business Logic Functions -----
 
-def process_user_input(user_input, session_id):
-    """Process user input and determine intent"""
-    # Extract intent using LLM
-    intent_data = ollama_service.extract_intent(user_input)
-    logger.info(f"Extracted intent: {intent_data}")
+# Each turn coroutine awaits its blocking stages through the admission
+# controller and takes the client id explicitly, since it may run outside the
+# request context. A stage that refuses work raises StageOverloaded, and the
+# turn falls back to the cheaper path for that stage.
+
+async def welcome_turn(session_id, sid, trace):
+    """Greet a new session with the welcome prompt and main menu"""
+    audio_data, audio_format = await response_audio(WELCOME_MESSAGE, sid, trace)
+    
+    socketio.emit('ivr_response', {
+        'session_id': session_id,
+        'response_id': trace.turn_id,
+        'text': WELCOME_MESSAGE,
+        'audio': audio_payload(audio_data, sid),
+        'audio_format': audio_format,
+        'menu_options': MAIN_MENU_OPTIONS
+    }, room=sid)
+    speculator.speculate(predicted_prompts({"menu_options": MAIN_MENU_OPTIONS}, DialogueState(session_id)), client_audio_format(sid))
+
+async def menu_only_turn(session_id, sid, trace):
+    """Answer a voice turn with the menu instead of transcribing it"""
+    audio_data, audio_format = await response_audio(BUSY_MENU_MESSAGE, sid, trace)
+    
+    socketio.emit('ivr_response', {
+        'session_id': session_id,
+        'response_id': trace.turn_id,
+        'text': BUSY_MENU_MESSAGE,
+        'audio': audio_payload(audio_data, sid),
+        'audio_format': audio_format,
+        'menu_options': MAIN_MENU_OPTIONS,
+        'menu_only': True
+    }, room=sid)
+
+async def asr_ready(recognizer):
+    """Wait out the ASR early-request policy before a turn enters the asr stage
+    
+    Waiting for the model to load is not transcription work, so it happens
+    here rather than inside the asr stage. There it would be measured as
+    service time and could hold the stage's estimate above the SLO.
+    
+    Args:
+        recognizer: SpeechRecognitionService or StreamingTranscription
+        
+    Raises:
+        SpeechRecognitionUnavailable: If the model is not ready and the
+            early-request policy rejects the call
+    """
+    if not recognizer.is_ready():
+        await turn_executor.run_io(recognizer.ensure_ready)
+
+async def session_state(session_id):
+    """A call's stored state, read off the event loop, or None"""
+    if not session_id:
+        return None
+    return await turn_executor.run_io(session_store.get, session_id)
+
+async def voice_turn(audio_bytes, session_id, sid, trace):
+    """Transcribe a recorded utterance and respond to it"""
+    try:
+        with trace.span("asr_ready"):
+            await asr_ready(speech_recognition_service)
+        with trace.span("asr"):
+            transcription = await admission.run_stage('asr', trace, speech_recognition_service.transcribe_audio, audio_bytes)
+    except StageOverloaded:
+        await menu_only_turn(session_id, sid, trace)
+        return
+    except SpeechRecognitionUnavailable as e:
+        socketio.emit('error', {'message': str(e)}, room=sid)
+        return
+    except Exception as e:
+        logger.error(f"Error processing voice input: {str(e)}")
+        socketio.emit('error', {'message': 'Error processing voice input'}, room=sid)
+        return
+    
+    await text_turn(transcription, session_id, sid, trace)
+
+async def partial_transcript_turn(stream, session_id, sid):
+    """Decode a streaming utterance so far and emit the partial transcript
+    
+    Once a partial is stable, its intent is guessed and a confident guess's
+    response is rendered while the caller finishes speaking.
+    """
+    # Partials are not worth waiting for the model; the final decode will wait
+    if not stream.is_ready():
+        return
+    try:
+        partial = await admission.run_stage('asr', None, stream.decode_partial)
+    except StageOverloaded:
+        # Partial transcripts are only a preview; they are the first thing to go
+        return
+    if partial is not None:
+        socketio.emit('partial_transcript', {
+            'session_id': session_id,
+            'text': partial
+        }, room=sid)
+    
+    text = stream.stable_partial
+    if not intent_pipeline.enabled or text is None or stream.finished:
+        return
+    if stream.intent_guess is not None and stream.intent_guess["text"] == text:
+        return
+    state = await session_state(session_id) or DialogueState(session_id)
+    try:
+        intent_data = await admission.run_stage('llm', None, quick_intent, text, state)
+    except StageOverloaded:
+        return
+    guess = intent_pipeline.guess(stream, text, intent_data)
+    if guess is None:
+        return
+    
+    audio_format = client_audio_format(sid)
+    response_text = dialogue_response(guess["intent"], guess["entities"], state.copy())["text"]
+    if all(tts_service.is_rendered(unit, audio_format) for unit in speech_units(response_text)):
+        return
+    render = intent_pipeline.start_render(guess)
+    if render is None:
+        return
+    try:
+        await admission.run_stage('tts', None, render_speech, response_text, audio_format)
+    except Exception as e:
+        logger.warning(f"Early synthesis for a guessed intent failed: {str(e)}")
+    finally:
+        render.set_result(None)
+
+async def voice_stream_turn(stream, session_id, sid, trace):
+    """Finish a streaming utterance and respond to the final transcript"""
+    try:
+        with trace.span("asr_ready"):
+            await asr_ready(stream)
+        # Only the audio since the last partial decode is left to transcribe
+        with trace.span("asr_final"):
+            transcription = await admission.run_stage('asr', trace, stream.finish)
+    except StageOverloaded:
+        await menu_only_turn(session_id, sid, trace)
+        return
+    except SpeechRecognitionUnavailable as e:
+        socketio.emit('error', {'message': str(e)}, room=sid)
+        return
+    except Exception as e:
+        logger.error(f"Error finishing voice stream: {str(e)}")
+        socketio.emit('error', {'message': 'Error processing voice input'}, room=sid)
+        return
+    
+    socketio.emit('final_transcript', {
+        'session_id': session_id,
+        'text': transcription
+    }, room=sid)
     
-    # Process the intent
-    intent = intent_data.get("intent", "general_inquiry")
-    entities = intent_data.get("entities", {})
+    # Check the intent guessed from the partials, if there is one, against the final transcript
+    intent_data = None
+    if stream.intent_guess is not None:
+        state = await session_state(session_id)
+        with trace.span("intent_check"):
+            try:
+                intent_data = await admission.run_stage('llm', trace, quick_intent, transcription, state)
+            except StageOverloaded:
+                pass
+    guess = intent_pipeline.resolve(stream, intent_data)
+    if guess is None:
+        await text_turn(transcription, session_id, sid, trace)
+        return
     
-    process_intent(intent, entities, session_id)
+    # The intent guessed from the partials held; its audio may already be rendering
+    if guess["render"] is not None and not guess["render"].done():
+        with trace.span("early_tts_wait"):
+            await asyncio.wrap_future(guess["render"])
+    await intent_turn(guess["intent"], guess["entities"], session_id, sid, trace)
+
+async def text_turn(user_input, session_id, sid, trace):
+    """Extract the intent of user input and respond to it"""
+    state = await session_state(session_id)
+    if state is not None and state.stage == "appointment_date":
+        # The caller was just asked for a day, so a day is all they need to say
+        entities = relative_date_entities(user_input)
+        if entities:
+            await intent_turn("provide_date", entities, session_id, sid, trace)
+            return
+    
+    with trace.span("intent"):
+        try:
+            intent_data = await admission.run_stage('llm', trace, process_user_input, user_input)
+        except StageOverloaded:
+            # The keyword rules need no LLM slot and answer in microseconds
+            intent_data = ollama_service._rule_based_intent_extraction(user_input)
+    await intent_turn(intent_data.get("intent", "general_inquiry"), intent_data.get("entities") or {}, session_id, sid, trace)
 
-def process_intent(intent, entities, session_id):
+async def intent_turn(intent, entities, session_id, sid, trace):
     """Handle different intents and generate appropriate responses"""
-    # Initialize response
-    response_text = ""
-    menu_options = []
-    redirect = None
-    
-    # Handle different intents
-    if intent == "schedule_appointment":
-        response_text = "I'd be happy to help you schedule an appointment. What day would you prefer?"
-        menu_options = [
-            {"id": "today", "text": "Today"},
-            {"id": "tomorrow", "text": "Tomorrow"},
-            {"id": "next_week", "text": "Next Week"},
-            {"id": "specify_date", "text": "Specify a Different Date"}
-        ]
+    with trace.span("dialogue"):
+        def respond(state):
+            return dialogue_response(intent, entities, state), state.copy()
+        
+        if session_id:
+            response, state = await turn_executor.run_io(session_store.update, session_id, respond)
+        else:
+            response, state = respond(DialogueState(session_id))
+        response_text = response["text"]
+        menu_options = response.get("menu_options", [])
+        redirect = response.get("redirect")
     
-    elif intent == "billing_inquiry":
-        response_text = "For billing inquiries, I'll need your account information. What's your account number or the phone number associated with your account?"
+    speculator.observe(response_text, client_audio_format(sid))
+    if TTS_STREAMING:
+        # Send the text right away and follow up with audio sentence by sentence
+        socketio.emit('ivr_response', {
+            'session_id': session_id,
+            'response_id': trace.turn_id,
+            'text': response_text,
+            'audio': None,
+            'menu_options': menu_options,
+            'redirect': redirect
+        }, room=sid)
+        with trace.span("tts"):
+            try:
+                await admission.run_stage('tts', trace, stream_response_audio, response_text, session_id, sid, trace)
+            except StageOverloaded:
+                emit_cached_audio(response_text, session_id, sid, trace)
+    else:
+        # Generate audio for response
+        audio_data, audio_format = await response_audio(response_text, sid, trace)
+        
+        # Send response to client
+        socketio.emit('ivr_response', {
+            'session_id': session_id,
+            'response_id': trace.turn_id,
+            'text': response_text,
+            'audio': audio_payload(audio_data, sid),
+            'audio_format': audio_format,
+            'menu_options': menu_options,
+            'redirect': redirect
+        }, room=sid)
     
-    elif intent == "location_hours":
-        response_text = "Our main location is at 123 Business Ave. We're open Monday to Friday from 9 AM to 5 PM, and Saturday from 10 AM to 2 PM. Is there anything else you'd like to know?"
+    # Render what the caller may hear next while they listen and answer
+    speculator.speculate(predicted_prompts(response, state), client_audio_format(sid))
+
+async def response_audio(text, sid, trace):
+    """Synthesize a response for a client, or fall back to cached audio
     
-    elif intent == "speak_to_agent":
-        response_text = "I'll connect you with the next available agent. Please hold while I transfer your call."
-        redirect = "/agent_queue"
+    Returns:
+        tuple: (audio bytes, audio format); the audio is empty if TTS was
+            overloaded and the text was never rendered
+    """
+    audio_format = client_audio_format(sid)
+    with trace.span("tts"):
+        try:
+            audio_data = await admission.run_stage('tts', trace, tts_service.synthesize_speech, text, audio_format)
+        except StageOverloaded:
+            audio_data, audio_format = tts_service.cached_speech(text, audio_format) or (b"", audio_format)
+    trace.mark("first_audio")
+    return audio_data, audio_format
+
+def emit_cached_audio(text, session_id, sid, trace):
+    """Finish a streamed response with cached audio, if there is any, instead of synthesizing it"""
+    cached = tts_service.cached_speech(text, client_audio_format(sid))
+    index = 0
+    if cached:
+        trace.mark("first_audio")
+        socketio.emit('ivr_audio_chunk', {
+            'session_id': session_id,
+            'response_id': trace.turn_id,
+            'index': 0,
+            'audio': audio_payload(cached[0], sid),
+            'audio_format': cached[1],
+            'final': False
+        }, room=sid)
+        index = 1
+    socketio.emit('ivr_audio_chunk', {
+        'session_id': session_id,
+        'response_id': trace.turn_id,
+        'index': index,
+        'audio': None,
+        'final': True
+    }, room=sid)
+
+def dialogue_response(intent, entities, state):
+    """Choose the response to a turn given where the call is in its dialogue
     
-    else:  # Default for general_inquiry and unknown intents
-        response_text = "How can I assist you today? You can ask about appointments, billing, location and hours, or speak to a live agent."
-        menu_options = [
-            {"id": "customer_service", "text": "Customer Service"},
-            {"id": "appointments", "text": "Schedule an Appointment"},
-            {"id": "billing", "text": "Billing and Account Information"},
-            {"id": "location", "text": "Location and Hours"},
-            {"id": "agent", "text": "Speak to a Live Agent"}
-        ]
+    Args:
+        intent: Intent of the turn
+        entities: Entities of the turn
+        state: The call's DialogueState, updated in place
+        
+    Returns:
+        dict: Response with "text" and optionally "menu_options" and "redirect"
+    """
+    awaiting_date = state.stage == "appointment_date"
     
-    # Generate audio for response
-    audio_data = tts_service.synthesize_speech(response_text)
-    audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+    if intent in ("schedule_appointment", "provide_date") or (awaiting_date and intent == "general_inquiry"):
+        booked = appointment_date(entities)
+        if booked is not None:
+            state.stage = None
+            state.slots = dict(state.slots or {}, appointment_date=booked.isoformat())
+            return {"text": appointment_confirmation(booked), "menu_options": MAIN_MENU_OPTIONS}
+        
+        state.stage = "appointment_date"
+        if entities.get("date_option") == "specify_date":
+            return {"text": APPOINTMENT_SPECIFY_DATE}
+        if awaiting_date and intent != "schedule_appointment":
+            return {"text": APPOINTMENT_RETRY, "menu_options": APPOINTMENT_DATE_OPTIONS}
+        return INTENT_RESPONSES["schedule_appointment"]
     
-    # Send response to client
-    socketio.emit('ivr_response', {
+    # Any other request leaves the booking flow; general_inquiry covers unknown intents
+    state.stage = None
+    return INTENT_RESPONSES.get(intent, INTENT_RESPONSES["general_inquiry"])
+
+def appointment_confirmation(day):
+    """The prompt confirming an appointment booked for day"""
+    return APPOINTMENT_CONFIRMED.format(day=f"{day:%A}, {day.day} {day:%B}")
+
+def predicted_prompts(response, state):
+    """Prompts the caller is likely to hear after response, most likely first
+    
+    Each menu option offered is played through the dialogue on a copy of the
+    call's state. A caller asked for an appointment day may also name any of
+    the coming week's days.
+    """
+    prompts = []
+    for option in response.get("menu_options") or []:
+        intent, entities = menu_selection_intent(option["id"])
+        prompts.append(dialogue_response(intent, entities, state.copy())["text"])
+    
+    if state.stage == "appointment_date":
+        today = date.today()
+        prompts.extend(appointment_confirmation(today + timedelta(days=offset)) for offset in range(1, 8))
+    
+    return list(dict.fromkeys(prompts))
+
+def appointment_date(entities):
+    """The appointment day named in a turn's entities, or None if there is no usable one"""
+    try:
+        day = date.fromisoformat(str(entities.get("date")))
+    except ValueError:
+        return None
+    return day if day >= date.today() else None
+
+def quick_intent(user_input, state):
+    """Intent of user input as text_turn would find it, but only from the tiers
+    that need no new LLM call (date replies, the intent cache, the classifier)
+    
+    Returns:
+        dict: Intent and entities, or None if only the LLM can tell
+    """
+    if state is not None and state.stage == "appointment_date":
+        entities = relative_date_entities(user_input)
+        if entities:
+            return {"intent": "provide_date", "entities": entities, "confidence": 1.0}
+    return ollama_service.quick_intent(user_input)
+
+def speech_units(text):
+    """The texts a response is synthesized as: sentence by sentence when streaming"""
+    return tts_service.stream_units(text) if TTS_STREAMING else [text]
+
+def render_speech(text, audio_format=None):
+    """Synthesize a response into the TTS cache the way intent_turn will ask for it"""
+    if TTS_STREAMING:
+        # Sentences render side by side, so this takes about as long as the longest one
+        for _ in tts_service.synthesize_speech_stream(text, audio_format):
+            pass
+    else:
+        tts_service.synthesize_speech(text, audio_format)
+
+def process_user_input(user_input):
+    """Process user input and determine intent"""
+    # Extract intent using LLM
+    intent_data = ollama_service.extract_intent(user_input)
+    logger.info(f"Extracted intent: {intent_data}")
+    return intent_data
+
+def stream_response_audio(text, session_id, sid, trace):
+    """Emit a response's audio as ivr_audio_chunk events as sentences finish
+    
+    Chunks carry the turn id as response_id; the client drops chunks that
+    belong to a response it has already moved past.
+    """
+    started = time.monotonic()
+    index = -1
+    audio_format = client_audio_format(sid)
+    
+    for index, audio_data in enumerate(tts_service.synthesize_speech_stream(text, audio_format)):
+        if index == 0:
+            logger.info(f"Time to first audio for session {session_id}: {(time.monotonic() - started) * 1000:.0f}ms")
+            trace.mark("first_audio")
+        socketio.emit('ivr_audio_chunk', {
+            'session_id': session_id,
+            'response_id': trace.turn_id,
+            'index': index,
+            'audio': audio_payload(audio_data, sid),
+            'audio_format': audio_format,
+            'final': False
+        }, room=sid)
+    
+    # Tell the client no more chunks are coming for this response
+    socketio.emit('ivr_audio_chunk', {
         'session_id': session_id,
-        'text': response_text,
-        'audio': audio_base64,
-        'menu_options': menu_options,
-        'redirect': redirect
-    }, room=request.sid)
+        'response_id': trace.turn_id,
+        'index': index + 1,
+        'audio': None,
+        'final': True
+    }, room=sid)
+
+
+def audio_payload(audio_data, sid):
+    """Prepare audio for a Socket.IO event
+    
+    Clients that negotiated binary audio get the raw bytes, which Socket.IO
+    sends as a binary attachment; everyone else gets base64 text.
+    """
+    if client_capabilities.get(sid, {}).get('binary_audio'):
+        return audio_data
+    return base64.b64encode(audio_data).decode('utf-8')
+
+def client_audio_format(sid):
+    """Audio format negotiated with a client at start_session"""
+    return client_capabilities.get(sid, {}).get('audio_format', tts_service.native_format)
+
+def audio_input_bytes(audio):
+    """Get the raw bytes of audio received from a client
+    
+    Binary attachments are passed through untouched; base64 strings (with or
+    without a data URL prefix) are decoded.
+    """
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return audio
+    return base64.b64decode(audio.split(',')[1] if ',' in audio else audio)
 
 
 # ----- HTML Templates -----
@@ -1122,6 +5524,52 @@ INDEX_HTML = """
             let mediaRecorder = null;
             let audioChunks = [];
             let socket = null;
+            let audioContext = null;
+            let streamProcessor = null;
+            let micStream = null;
+            let audioQueue = [];
+            let audioPlaying = false;
+            let audioObjectUrl = null;
+            let responseId = null;
+            const AUDIO_MIME_TYPES = {
+                opus: 'audio/ogg; codecs=opus',
+                mp3: 'audio/mpeg',
+                wav: 'audio/wav'
+            };
+            let liveTranscriptEl = null;
+            const streamingSupported = !!(window.AudioContext || window.webkitAudioContext);
+            
+            // Samples per streamed chunk, about 85 ms at 48 kHz
+            const PCM_CHUNK_SAMPLES = 4096;
+            
+            // AudioWorklet processor that hands microphone samples to the page
+            // in PCM_CHUNK_SAMPLES blocks (the audio thread delivers 128 at a time)
+            const PCM_WORKLET_SOURCE = `
+                class PcmForwarder extends AudioWorkletProcessor {
+                    constructor() {
+                        super();
+                        this.chunk = new Float32Array(${PCM_CHUNK_SAMPLES});
+                        this.length = 0;
+                    }
+                    
+                    process(inputs) {
+                        const samples = inputs[0][0];
+                        let offset = 0;
+                        while (samples && offset < samples.length) {
+                            const count = Math.min(samples.length - offset, this.chunk.length - this.length);
+                            this.chunk.set(samples.subarray(offset, offset + count), this.length);
+                            this.length += count;
+                            offset += count;
+                            if (this.length === this.chunk.length) {
+                                this.port.postMessage(this.chunk.slice(0));
+                                this.length = 0;
+                            }
+                        }
+                        return true;
+                    }
+                }
+                registerProcessor('pcm-forwarder', PcmForwarder);
+            `;
             
             // Update current time
             function updateCurrentTime() {
@@ -1154,6 +5602,25 @@ INDEX_HTML = """
                 
                 socket.on('ivr_response', handleIVRResponse);
                 
+                socket.on('ivr_audio_chunk', function(data) {
+                    // Late chunks of a response the caller has moved past are dropped
+                    if (data.response_id !== responseId) {
+                        return;
+                    }
+                    if (data.audio) {
+                        enqueueAudio(data.audio, data.audio_format);
+                    }
+                });
+                
+                socket.on('partial_transcript', function(data) {
+                    updateLiveTranscript(data.text);
+                });
+                
+                socket.on('final_transcript', function(data) {
+                    updateLiveTranscript(data.text || '[No speech detected]');
+                    liveTranscriptEl = null;
+                });
+                
                 socket.on('error', function(data) {
                     console.error('Error:', data.message);
                     addSystemMessage('Sorry, there was an error processing your request. Please try again.');
@@ -1166,21 +5633,36 @@ INDEX_HTML = """
                 setCookie('session_id', sessionId, 1); // Store for 1 day
                 
                 console.log('Starting IVR session:', sessionId);
-                socket.emit('start_session', { session_id: sessionId });
+                socket.emit('start_session', {
+                    session_id: sessionId,
+                    binary_audio: true,
+                    codecs: supportedCodecs()
+                });
+            }
+            
+            // Codecs this browser can play, so the server can pick the smallest
+            function supportedCodecs() {
+                const probe = document.createElement('audio');
+                return Object.keys(AUDIO_MIME_TYPES).filter(function(codec) {
+                    return probe.canPlayType(AUDIO_MIME_TYPES[codec]) !== '';
+                });
             }
             
             // Handle IVR response from server
             function handleIVRResponse(data) {
                 console.log('Received IVR response:', data);
+                responseId = data.response_id;
                 
                 // Add system message to conversation
                 if (data.text) {
                     addSystemMessage(data.text);
                 }
                 
-                // Play audio response if available
+                // Play audio response if available; streamed responses send
+                // their audio afterwards as ivr_audio_chunk events
+                stopAudio();
                 if (data.audio) {
-                    playAudioResponse(data.audio);
+                    enqueueAudio(data.audio, data.audio_format);
                 }
                 
                 // Display menu options if available
@@ -1219,6 +5701,16 @@ INDEX_HTML = """
                 
                 // Scroll to bottom
                 conversationArea.scrollTop = conversationArea.scrollHeight;
+                return messageEl;
+            }
+            
+            // Show the transcript of the voice input currently being streamed
+            function updateLiveTranscript(text) {
+                if (!liveTranscriptEl) {
+                    liveTranscriptEl = addUserMessage('');
+                }
+                liveTranscriptEl.textContent = `🎤 ${text}`;
+                conversationArea.scrollTop = conversationArea.scrollHeight;
             }
             
             // Display menu options
@@ -1253,15 +5745,52 @@ INDEX_HTML = """
                 });
             }
             
-            // Play audio response
-            function playAudioResponse(audioBase64) {
+            // Queue audio so streamed sentences play back to back
+            function enqueueAudio(audio, format) {
+                audioQueue.push({ audio: audio, format: format });
+                if (!audioPlaying) {
+                    playNextAudio();
+                }
+            }
+            
+            // Play the next queued audio clip, if any
+            function playNextAudio() {
+                const next = audioQueue.shift();
+                if (!next) {
+                    audioPlaying = false;
+                    return;
+                }
+                
+                audioPlaying = true;
+                playAudioResponse(next.audio, next.format);
+                responseAudio.onended = playNextAudio;
+                responseAudio.onerror = function() {
+                    console.error('Error loading audio');
+                    playNextAudio();
+                };
+            }
+            
+            // Play audio response (raw bytes from a binary frame, or base64 text)
+            function playAudioResponse(audio, format) {
                 try {
-                    const audioSrc = `data:audio/wav;base64,${audioBase64}`;
-                    responseAudio.src = audioSrc;
+                    if (audioObjectUrl) {
+                        URL.revokeObjectURL(audioObjectUrl);
+                        audioObjectUrl = null;
+                    }
+                    
+                    const mimeType = AUDIO_MIME_TYPES[format] || 'audio/wav';
+                    if (typeof audio === 'string') {
+                        responseAudio.src = `data:${mimeType};base64,${audio}`;
+                    } else {
+                        audioObjectUrl = URL.createObjectURL(new Blob([audio], { type: mimeType }));
+                        responseAudio.src = audioObjectUrl;
+                    }
                     
                     responseAudio.oncanplaythrough = function() {
                         responseAudio.play().catch(error => {
+                            // A rejected play (e.g. autoplay blocked) never ends; move on
                             console.error('Error playing audio:', error);
+                            playNextAudio();
                         });
                     };
                     
@@ -1270,9 +5799,17 @@ INDEX_HTML = """
                     };
                 } catch (error) {
                     console.error('Error setting up audio:', error);
+                    playNextAudio();
                 }
             }
             
+            // Drop queued audio and stop whatever is playing
+            function stopAudio() {
+                audioQueue = [];
+                audioPlaying = false;
+                responseAudio.pause();
+            }
+            
             // Send text input to server
             function sendTextInput() {
                 const text = textInput.value.trim();
@@ -1307,23 +5844,11 @@ INDEX_HTML = """
                 try {
                     const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
                     
-                    mediaRecorder = new MediaRecorder(stream);
-                    audioChunks = [];
-                    
-                    mediaRecorder.ondataavailable = event => {
-                        audioChunks.push(event.data);
-                    };
-                    
-                    mediaRecorder.onstop = async () => {
-                        const audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
-                        await sendAudioToServer(audioBlob);
-                        
-                        // Release microphone
-                        stream.getTracks().forEach(track => track.stop());
-                    };
-                    
-                    // Start recording
-                    mediaRecorder.start();
+                    // Stream audio while recording so transcription starts immediately,
+                    // or record the whole utterance where the browser cannot stream
+                    if (!streamingSupported || !(await startStreaming(stream))) {
+                        startMediaRecorder(stream);
+                    }
                     isRecording = true;
                     
                     // Update UI
@@ -1338,10 +5863,111 @@ INDEX_HTML = """
                 }
             }
             
+            // Record the whole utterance and upload it once recording stops
+            function startMediaRecorder(stream) {
+                mediaRecorder = new MediaRecorder(stream);
+                audioChunks = [];
+                
+                mediaRecorder.ondataavailable = event => {
+                    audioChunks.push(event.data);
+                };
+                
+                mediaRecorder.onstop = async () => {
+                    const audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
+                    await sendAudioToServer(audioBlob);
+                    
+                    // Release microphone
+                    stream.getTracks().forEach(track => track.stop());
+                };
+                
+                // Start recording
+                mediaRecorder.start();
+            }
+            
+            // Stream microphone audio to the server as 16-bit PCM chunks
+            //
+            // The context runs at the device's own rate, since Firefox cannot
+            // connect a microphone to a context at any other; the server
+            // resamples. Resolves to false if streaming could not start, so
+            // the caller can record instead.
+            async function startStreaming(stream) {
+                const AudioContextClass = window.AudioContext || window.webkitAudioContext;
+                const sendChunk = samples => {
+                    socket.emit('voice_chunk', {
+                        session_id: sessionId,
+                        audio: floatTo16BitPCM(samples)
+                    });
+                };
+                
+                try {
+                    audioContext = new AudioContextClass();
+                    const source = audioContext.createMediaStreamSource(stream);
+                    
+                    if (audioContext.audioWorklet) {
+                        const moduleUrl = URL.createObjectURL(new Blob([PCM_WORKLET_SOURCE], { type: 'application/javascript' }));
+                        try {
+                            await audioContext.audioWorklet.addModule(moduleUrl);
+                        } finally {
+                            URL.revokeObjectURL(moduleUrl);
+                        }
+                        streamProcessor = new AudioWorkletNode(audioContext, 'pcm-forwarder');
+                        streamProcessor.port.onmessage = event => sendChunk(event.data);
+                    } else {
+                        // No AudioWorklet (older browsers, insecure origins)
+                        streamProcessor = audioContext.createScriptProcessor(PCM_CHUNK_SAMPLES, 1, 1);
+                        streamProcessor.onaudioprocess = event => sendChunk(event.inputBuffer.getChannelData(0));
+                    }
+                    
+                    micStream = stream;
+                    socket.emit('voice_stream_start', {
+                        session_id: sessionId,
+                        sample_rate: audioContext.sampleRate
+                    });
+                    source.connect(streamProcessor);
+                    streamProcessor.connect(audioContext.destination);
+                    return true;
+                } catch (error) {
+                    console.warn('Audio streaming unavailable, recording instead:', error);
+                    if (audioContext) {
+                        audioContext.close();
+                    }
+                    audioContext = null;
+                    streamProcessor = null;
+                    micStream = null;
+                    return false;
+                }
+            }
+            
+            // Stop streaming and ask the server for the final transcript
+            function stopStreaming() {
+                streamProcessor.disconnect();
+                audioContext.close();
+                micStream.getTracks().forEach(track => track.stop());
+                streamProcessor = null;
+                audioContext = null;
+                micStream = null;
+                
+                socket.emit('voice_stream_end', { session_id: sessionId });
+            }
+            
+            // Convert Web Audio float samples to a 16-bit PCM buffer (sent as a binary frame)
+            function floatTo16BitPCM(samples) {
+                const pcm = new Int16Array(samples.length);
+                for (let i = 0; i < samples.length; i++) {
+                    const sample = Math.max(-1, Math.min(1, samples[i]));
+                    pcm[i] = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+                }
+                return pcm.buffer;
+            }
+            
             // Stop recording audio
             function stopRecording() {
-                if (mediaRecorder && isRecording) {
-                    mediaRecorder.stop();
+                if (isRecording) {
+                    if (audioContext) {
+                        stopStreaming();
+                    } else if (mediaRecorder) {
+                        mediaRecorder.stop();
+                    }
                     isRecording = false;
                     
                     // Update UI
@@ -1359,19 +5985,12 @@ INDEX_HTML = """
                     // Add user "speaking" message
                     addUserMessage('🎤 [Voice input]');
                     
-                    // Convert Blob to base64
-                    const reader = new FileReader();
-                    reader.readAsDataURL(audioBlob);
-                    
-                    reader.onloadend = function() {
-                        const base64Audio = reader.result;
-                        
-                        // Send to server
-                        socket.emit('voice_input', {
-                            session_id: sessionId,
-                            audio: base64Audio
-                        });
-                    };
+                    // Send the recording as a binary frame
+                    const audioBuffer = await audioBlob.arrayBuffer();
+                    socket.emit('voice_input', {
+                        session_id: sessionId,
+                        audio: audioBuffer
+                    });
                 } catch (error) {
                     console.error('Error sending audio to server:', error);
                 }
@@ -1892,6 +6511,51 @@ PHONE_HTML = """
             let mediaRecorder = null;
             let audioChunks = [];
             let socket = null;
+            let audioContext = null;
+            let streamProcessor = null;
+            let micStream = null;
+            let audioQueue = [];
+            let audioPlaying = false;
+            let audioObjectUrl = null;
+            let responseId = null;
+            const AUDIO_MIME_TYPES = {
+                opus: 'audio/ogg; codecs=opus',
+                mp3: 'audio/mpeg',
+                wav: 'audio/wav'
+            };
+            const streamingSupported = !!(window.AudioContext || window.webkitAudioContext);
+            
+            // Samples per streamed chunk, about 85 ms at 48 kHz
+            const PCM_CHUNK_SAMPLES = 4096;
+            
+            // AudioWorklet processor that hands microphone samples to the page
+            // in PCM_CHUNK_SAMPLES blocks (the audio thread delivers 128 at a time)
+            const PCM_WORKLET_SOURCE = `
+                class PcmForwarder extends AudioWorkletProcessor {
+                    constructor() {
+                        super();
+                        this.chunk = new Float32Array(${PCM_CHUNK_SAMPLES});
+                        this.length = 0;
+                    }
+                    
+                    process(inputs) {
+                        const samples = inputs[0][0];
+                        let offset = 0;
+                        while (samples && offset < samples.length) {
+                            const count = Math.min(samples.length - offset, this.chunk.length - this.length);
+                            this.chunk.set(samples.subarray(offset, offset + count), this.length);
+                            this.length += count;
+                            offset += count;
+                            if (this.length === this.chunk.length) {
+                                this.port.postMessage(this.chunk.slice(0));
+                                this.length = 0;
+                            }
+                        }
+                        return true;
+                    }
+                }
+                registerProcessor('pcm-forwarder', PcmForwarder);
+            `;
             
             // Initialize WebSocket connection
             function initializeSocket() {
@@ -1912,6 +6576,24 @@ PHONE_HTML = """
                 
                 socket.on('ivr_response', handleIVRResponse);
                 
+                socket.on('ivr_audio_chunk', function(data) {
+                    // Late chunks of a response the caller has moved past are dropped
+                    if (data.response_id !== responseId) {
+                        return;
+                    }
+                    if (data.audio) {
+                        enqueueAudio(data.audio, data.audio_format);
+                    }
+                });
+                
+                socket.on('partial_transcript', function(data) {
+                    updateLastTranscript(data.text);
+                });
+                
+                socket.on('final_transcript', function(data) {
+                    updateLastTranscript(data.text);
+                });
+                
                 socket.on('error', function(data) {
                     console.error('Error:', data.message);
                     updateVoiceStatus('Error: ' + data.message);
@@ -1924,16 +6606,31 @@ PHONE_HTML = """
                 setCookie('session_id', sessionId, 1); // Store for 1 day
                 
                 console.log('Starting IVR session:', sessionId);
-                socket.emit('start_session', { session_id: sessionId });
+                socket.emit('start_session', {
+                    session_id: sessionId,
+                    binary_audio: true,
+                    codecs: supportedCodecs()
+                });
+            }
+            
+            // Codecs this browser can play, so the server can pick the smallest
+            function supportedCodecs() {
+                const probe = document.createElement('audio');
+                return Object.keys(AUDIO_MIME_TYPES).filter(function(codec) {
+                    return probe.canPlayType(AUDIO_MIME_TYPES[codec]) !== '';
+                });
             }
             
             // Handle IVR response from server
             function handleIVRResponse(data) {
                 console.log('Received IVR response:', data);
+                responseId = data.response_id;
                 
-                // Play audio response if available
+                // Play audio response if available; streamed responses send
+                // their audio afterwards as ivr_audio_chunk events
+                stopAudio();
                 if (data.audio) {
-                    playAudioResponse(data.audio);
+                    enqueueAudio(data.audio, data.audio_format);
                 }
                 
                 // Update status with text response
@@ -1960,15 +6657,52 @@ PHONE_HTML = """
                 lastTranscript.textContent = text || '-';
             }
             
-            // Play audio response
-            function playAudioResponse(audioBase64) {
+            // Queue audio so streamed sentences play back to back
+            function enqueueAudio(audio, format) {
+                audioQueue.push({ audio: audio, format: format });
+                if (!audioPlaying) {
+                    playNextAudio();
+                }
+            }
+            
+            // Play the next queued audio clip, if any
+            function playNextAudio() {
+                const next = audioQueue.shift();
+                if (!next) {
+                    audioPlaying = false;
+                    return;
+                }
+                
+                audioPlaying = true;
+                playAudioResponse(next.audio, next.format);
+                responseAudio.onended = playNextAudio;
+                responseAudio.onerror = function() {
+                    console.error('Error loading audio');
+                    playNextAudio();
+                };
+            }
+            
+            // Play audio response (raw bytes from a binary frame, or base64 text)
+            function playAudioResponse(audio, format) {
                 try {
-                    const audioSrc = `data:audio/wav;base64,${audioBase64}`;
-                    responseAudio.src = audioSrc;
+                    if (audioObjectUrl) {
+                        URL.revokeObjectURL(audioObjectUrl);
+                        audioObjectUrl = null;
+                    }
+                    
+                    const mimeType = AUDIO_MIME_TYPES[format] || 'audio/wav';
+                    if (typeof audio === 'string') {
+                        responseAudio.src = `data:${mimeType};base64,${audio}`;
+                    } else {
+                        audioObjectUrl = URL.createObjectURL(new Blob([audio], { type: mimeType }));
+                        responseAudio.src = audioObjectUrl;
+                    }
                     
                     responseAudio.oncanplaythrough = function() {
                         responseAudio.play().catch(error => {
+                            // A rejected play (e.g. autoplay blocked) never ends; move on
                             console.error('Error playing audio:', error);
+                            playNextAudio();
                         });
                     };
                     
@@ -1977,9 +6711,17 @@ PHONE_HTML = """
                     };
                 } catch (error) {
                     console.error('Error setting up audio:', error);
+                    playNextAudio();
                 }
             }
             
+            // Drop queued audio and stop whatever is playing
+            function stopAudio() {
+                audioQueue = [];
+                audioPlaying = false;
+                responseAudio.pause();
+            }
+            
             // Handle DTMF key press
             function handleDTMFKeyPress(key) {
                 console.log('DTMF key pressed:', key);
@@ -2067,23 +6809,11 @@ PHONE_HTML = """
                 try {
                     const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
                     
-                    mediaRecorder = new MediaRecorder(stream);
-                    audioChunks = [];
-                    
-                    mediaRecorder.ondataavailable = event => {
-                        audioChunks.push(event.data);
-                    };
-                    
-                    mediaRecorder.onstop = async () => {
-                        const audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
-                        await sendAudioToServer(audioBlob);
-                        
-                        // Release microphone
-                        stream.getTracks().forEach(track => track.stop());
-                    };
-                    
-                    // Start recording
-                    mediaRecorder.start();
+                    // Stream audio while recording so transcription starts immediately,
+                    // or record the whole utterance where the browser cannot stream
+                    if (!streamingSupported || !(await startStreaming(stream))) {
+                        startMediaRecorder(stream);
+                    }
                     isRecording = true;
                     
                     // Update UI
@@ -2106,10 +6836,111 @@ PHONE_HTML = """
                 }
             }
             
+            // Record the whole utterance and upload it once recording stops
+            function startMediaRecorder(stream) {
+                mediaRecorder = new MediaRecorder(stream);
+                audioChunks = [];
+                
+                mediaRecorder.ondataavailable = event => {
+                    audioChunks.push(event.data);
+                };
+                
+                mediaRecorder.onstop = async () => {
+                    const audioBlob = new Blob(audioChunks, { type: 'audio/wav' });
+                    await sendAudioToServer(audioBlob);
+                    
+                    // Release microphone
+                    stream.getTracks().forEach(track => track.stop());
+                };
+                
+                // Start recording
+                mediaRecorder.start();
+            }
+            
+            // Stream microphone audio to the server as 16-bit PCM chunks
+            //
+            // The context runs at the device's own rate, since Firefox cannot
+            // connect a microphone to a context at any other; the server
+            // resamples. Resolves to false if streaming could not start, so
+            // the caller can record instead.
+            async function startStreaming(stream) {
+                const AudioContextClass = window.AudioContext || window.webkitAudioContext;
+                const sendChunk = samples => {
+                    socket.emit('voice_chunk', {
+                        session_id: sessionId,
+                        audio: floatTo16BitPCM(samples)
+                    });
+                };
+                
+                try {
+                    audioContext = new AudioContextClass();
+                    const source = audioContext.createMediaStreamSource(stream);
+                    
+                    if (audioContext.audioWorklet) {
+                        const moduleUrl = URL.createObjectURL(new Blob([PCM_WORKLET_SOURCE], { type: 'application/javascript' }));
+                        try {
+                            await audioContext.audioWorklet.addModule(moduleUrl);
+                        } finally {
+                            URL.revokeObjectURL(moduleUrl);
+                        }
+                        streamProcessor = new AudioWorkletNode(audioContext, 'pcm-forwarder');
+                        streamProcessor.port.onmessage = event => sendChunk(event.data);
+                    } else {
+                        // No AudioWorklet (older browsers, insecure origins)
+                        streamProcessor = audioContext.createScriptProcessor(PCM_CHUNK_SAMPLES, 1, 1);
+                        streamProcessor.onaudioprocess = event => sendChunk(event.inputBuffer.getChannelData(0));
+                    }
+                    
+                    micStream = stream;
+                    socket.emit('voice_stream_start', {
+                        session_id: sessionId,
+                        sample_rate: audioContext.sampleRate
+                    });
+                    source.connect(streamProcessor);
+                    streamProcessor.connect(audioContext.destination);
+                    return true;
+                } catch (error) {
+                    console.warn('Audio streaming unavailable, recording instead:', error);
+                    if (audioContext) {
+                        audioContext.close();
+                    }
+                    audioContext = null;
+                    streamProcessor = null;
+                    micStream = null;
+                    return false;
+                }
+            }
+            
+            // Stop streaming and ask the server for the final transcript
+            function stopStreaming() {
+                streamProcessor.disconnect();
+                audioContext.close();
+                micStream.getTracks().forEach(track => track.stop());
+                streamProcessor = null;
+                audioContext = null;
+                micStream = null;
+                
+                socket.emit('voice_stream_end', { session_id: sessionId });
+            }
+            
+            // Convert Web Audio float samples to a 16-bit PCM buffer (sent as a binary frame)
+            function floatTo16BitPCM(samples) {
+                const pcm = new Int16Array(samples.length);
+                for (let i = 0; i < samples.length; i++) {
+                    const sample = Math.max(-1, Math.min(1, samples[i]));
+                    pcm[i] = sample < 0 ? sample * 0x8000 : sample * 0x7FFF;
+                }
+                return pcm.buffer;
+            }
+            
             // Stop recording audio
             function stopRecording() {
-                if (mediaRecorder && isRecording) {
-                    mediaRecorder.stop();
+                if (isRecording) {
+                    if (audioContext) {
+                        stopStreaming();
+                    } else if (mediaRecorder) {
+                        mediaRecorder.stop();
+                    }
                     isRecording = false;
                     
                     // Update UI
@@ -2125,19 +6956,12 @@ PHONE_HTML = """
             // Send recorded audio to server
             async function sendAudioToServer(audioBlob) {
                 try {
-                    // Convert Blob to base64
-                    const reader = new FileReader();
-                    reader.readAsDataURL(audioBlob);
-                    
-                    reader.onloadend = function() {
-                        const base64Audio = reader.result;
-                        
-                        // Send to server
-                        socket.emit('voice_input', {
-                            session_id: sessionId,
-                            audio: base64Audio
-                        });
-                    };
+                    // Send the recording as a binary frame
+                    const audioBuffer = await audioBlob.arrayBuffer();
+                    socket.emit('voice_input', {
+                        session_id: sessionId,
+                        audio: audioBuffer
+                    });
                 } catch (error) {
                     console.error('Error sending audio to server:', error);
                     updateVoiceStatus('Error sending audio. Please try again.');
@@ -2244,7 +7068,7 @@ if __name__ == '__main__':
     except:
         print("LLM: Using rule-based responses (Ollama not available)")
     
-    print("Open http://localhost:5000 in your browser")
+    print(f"Open http://localhost:{SERVER_PORT} in your browser")
     
     # Run the application with WebSocket support
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    socketio.run(app, host=SERVER_HOST, port=SERVER_PORT, debug=FLASK_DEBUG, allow_unsafe_werkzeug=True)
\ No newline at end of file
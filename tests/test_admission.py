@@ -0,0 +1,66 @@
+"""
+Admission control must not lock a stage out after one slow request
+
+Run with: python -m pytest tests
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from _ivr import load_ivr  # noqa: E402
+
+ivr = load_ivr()
+
+SLO = 0.3
+
+
+def controller(**options):
+    executor = ivr.TurnExecutor({'llm': 2}, mode="inline")
+    return ivr.AdmissionController(executor, {'llm': (2, 4)}, max_active=10, slo=SLO, **options)
+
+
+def call(admission, seconds):
+    """Run one llm stage of a fresh turn; return True if it was admitted"""
+    trace = ivr.TurnTrace(None, "test", "text", False)
+    trace.deadline = trace.started + SLO
+    try:
+        asyncio.run(admission.run_stage('llm', trace, time.sleep, seconds))
+    except ivr.StageOverloaded:
+        return False
+    return True
+
+
+def test_probe_recovers_after_slow_outlier():
+    # Without decay, only the half-open probes can bring the estimate back down
+    admission = controller(probe_interval=0.2, half_life=float('inf'))
+    assert call(admission, 0.5)
+
+    results = []
+    for _ in range(10):
+        results.append(call(admission, 0.01))
+        time.sleep(0.1)
+
+    assert admission.gates['llm'].probes >= 1
+    assert results[-1], results
+    assert admission.gates['llm'].service_estimate() < SLO
+
+
+def test_estimate_decays_while_idle():
+    # Probes effectively disabled, so recovery comes from decay alone
+    admission = controller(probe_interval=float('inf'), half_life=0.2)
+    assert call(admission, 0.5)
+    assert not call(admission, 0.01)
+
+    time.sleep(0.5)
+    assert call(admission, 0.01)
+
+
+def test_deadline_sheds_between_probes():
+    admission = controller(probe_interval=60.0, half_life=float('inf'))
+    assert call(admission, 0.5)
+    assert not any(call(admission, 0.01) for _ in range(10))
+    assert admission.shed[('llm', 'deadline')] == 10
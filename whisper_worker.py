@@ -0,0 +1,122 @@
+"""
+Whisper decoding shared by the IVR server and its process-mode replicas
+
+main.py.py imports the decoding functions from here. A process-mode replica
+runs this file as a script in a fresh interpreter. The script imports nothing
+from the server, so the replica starts none of its threads or services and
+inherits none of its locks.
+
+Usage (started by ProcessReplica in main.py.py):
+    python whisper_worker.py <connection fd> <model size> <cpu threads> <device> <compute type>
+"""
+
+import logging
+import sys
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:
+    WhisperModel = None
+
+logger = logging.getLogger(__name__)
+
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_CHUNK_SAMPLES = 30 * WHISPER_SAMPLE_RATE
+
+def transcribe_batch(model, items):
+    """Transcribe several clips on one WhisperModel
+    
+    Clips of up to 30 seconds without custom options share a single batched
+    encoder/decoder pass. Everything else, or a batch that fails, is
+    transcribed clip by clip.
+    
+    Args:
+        model: Loaded WhisperModel
+        items: List of (audio, options) pairs, audio as 16 kHz float32 arrays
+        
+    Returns:
+        list: One list of (start, end, text) segments per item, in order
+    """
+    results = [None] * len(items)
+    batchable = [
+        index for index, (audio, options) in enumerate(items)
+        if not options and len(audio) <= WHISPER_CHUNK_SAMPLES
+    ]
+    
+    if len(batchable) > 1:
+        try:
+            texts = _batched_decode(model, [items[index][0] for index in batchable])
+            for index, text in zip(batchable, texts):
+                duration = len(items[index][0]) / WHISPER_SAMPLE_RATE
+                results[index] = [(0.0, duration, text)] if text else []
+        except Exception as e:
+            logger.warning(f"Batched decode failed, decoding clips one by one: {str(e)}")
+    
+    for index, (audio, options) in enumerate(items):
+        if results[index] is None:
+            segments, info = model.transcribe(audio, language="en", **options)
+            results[index] = [(segment.start, segment.end, segment.text) for segment in segments]
+    
+    return results
+
+def _batched_decode(model, clips):
+    """Decode short clips together in one CTranslate2 generate call"""
+    from faster_whisper.audio import pad_or_trim
+    from faster_whisper.tokenizer import Tokenizer
+    
+    tokenizer = Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language="en")
+    features = np.stack([pad_or_trim(model.feature_extractor(clip)) for clip in clips])
+    encoder_output = model.encode(features)
+    
+    prompt = model.get_prompt(tokenizer, [], without_timestamps=True)
+    results = model.model.generate(
+        encoder_output,
+        [list(prompt) for _ in clips],
+        beam_size=5,
+        max_length=model.max_length,
+        suppress_blank=True,
+        suppress_tokens=[-1],
+        return_no_speech_prob=True
+    )
+    
+    texts = []
+    for result in results:
+        # Same silence threshold WhisperModel.transcribe uses by default
+        if result.no_speech_prob > 0.6:
+            texts.append("")
+        else:
+            texts.append(tokenizer.decode(result.sequences_ids[0]).strip())
+    return texts
+
+def load_whisper_model(model_size, cpu_threads, device="cpu", compute_type="int8"):
+    """Load a WhisperModel"""
+    logger.info(f"Loading Whisper model {model_size} on {device} with {cpu_threads} threads...")
+    return WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+def serve_replica(connection, model_size, cpu_threads, device, compute_type):
+    """Entry point of a process-mode replica: load a model and serve batches"""
+    try:
+        model = load_whisper_model(model_size, cpu_threads, device, compute_type)
+    except Exception as e:
+        connection.send(("error", str(e)))
+        return
+    connection.send(("ready", None))
+    
+    while True:
+        try:
+            items = connection.recv()
+        except EOFError:
+            return
+        try:
+            connection.send(("ok", transcribe_batch(model, items)))
+        except Exception as e:
+            connection.send(("error", str(e)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    fd, model_size, cpu_threads, device, compute_type = sys.argv[1:6]
+    serve_replica(Connection(int(fd)), model_size, int(cpu_threads), device, compute_type)